@@ -1,4 +1,6 @@
 import os
+import engine
+import level_pack
 
 
 # Ký tự đại diện
@@ -19,45 +21,48 @@ def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
 def load_level(filename):
-    # Đọc Map
+    # Đọc Map (giữ ký tự gốc cho engine, chỉ đổi ký tự khi in ra)
     maze = []
-    try:
-        with open(os.path.join(map_path, filename), "r") as f:
-            for line in f:
-                row = []
-                for char in line.strip():
-                    if char == "%": row.append(CHAR_WALL)
-                    elif char == ".": row.append(CHAR_FLOOR)
-                    elif char == "S": row.append(CHAR_GOAL)
-                    elif char == "K": row.append(CHAR_KEY)
-                    elif char == "G": row.append(CHAR_GATE_CLOSED)
-                    else: row.append(char)
-                maze.append(row)
-    except FileNotFoundError:
-        print(f"Error: Map {filename} not found.")
-        return None, None, None
-
-    # Đọc Vị trí (Giả lập đơn giản: Chỉ lấy Player và 1 Mummy đầu tiên)
+    # Level trong file pack ("<file pack>:<tên level>"): các dòng maze + agents đọc sẵn từ pack
+    pack_lines = level_pack.load_level_lines(filename, map_path)
+    if pack_lines is not None:
+        maze = [list(line) for line in pack_lines[0]]
+    else:
+        try:
+            with open(os.path.join(map_path, filename), "r") as f:
+                for line in f:
+                    maze.append([c for c in line if c != '\n'])
+        except FileNotFoundError:
+            print(f"Error: Map {filename} not found.")
+            return None, None, None
+
+    # Đọc Vị trí: người chơi + mọi quái theo loại
     player_pos = [2, 2]
-    mummy_pos = []
-    
+    enemies = {"MW": [], "MR": [], "SW": [], "SR": []}
+
     agent_file = filename  # Tên file agent thường trùng tên file map
     try:
-        with open(os.path.join(agent_path, agent_file), "r") as f:
-            for line in f:
-                parts = line.split()
-                if not parts: continue
-                if parts[0] == "E":
-                    player_pos = [int(parts[1]), int(parts[2])]
-                elif parts[0] in ["MW", "MR", "SW", "SR"]:
-                    mummy_pos.append([int(parts[1]), int(parts[2])])
+        if pack_lines is not None:
+            agent_lines = pack_lines[1]
+        else:
+            with open(os.path.join(agent_path, agent_file), "r") as f:
+                agent_lines = f.readlines()
+        for line in agent_lines:
+            parts = line.split()
+            if not parts: continue
+            if parts[0] == "E":
+                player_pos = [int(parts[1]), int(parts[2])]
+            elif parts[0] in enemies:
+                enemies[parts[0]].append([int(parts[1]), int(parts[2])])
     except: pass
 
-    return maze, player_pos, mummy_pos
+    return maze, player_pos, enemies
 
-def print_board(maze, p_pos, m_list):
+def print_board(maze, p_pos, m_list, gate_closed):
     # Tạo bản sao để vẽ đè nhân vật lên
-    display_maze = [row[:] for row in maze]
+    symbols = {"%": CHAR_WALL, ".": CHAR_FLOOR, "S": CHAR_GOAL, "K": CHAR_KEY,
+               "G": CHAR_GATE_CLOSED if gate_closed else CHAR_GATE_OPEN}
+    display_maze = [[symbols.get(c, c) for c in row] for row in maze]
     
     # Vẽ Mummy
     for m in m_list:
@@ -70,63 +75,60 @@ def print_board(maze, p_pos, m_list):
 
     print("\n" * 2)
     print(f"  --- ASCII MODE: {CHAR_PLAYER}=You, {CHAR_MUMMY}=Enemy, {CHAR_GOAL}=Exit ---")
-    print("  Controls: W (Up), S (Down), A (Left), D (Right) + Enter")
+    print("  Controls: W (Up), S (Down), A (Left), D (Right), X (Wait) + Enter")
     print("  Type 'q' to Quit.\n")
     
     for row in display_maze:
         print("  " + "".join(row))
 
-def run_ascii_level(filename):
-    maze, player, mummies = load_level(filename)
+def run_ascii_level(filename, difficulty=1):
+    maze, player, enemies = load_level(filename)
     if not maze: return
 
+    # Cùng luật với bản đồ họa và solver (engine.PackedLevel)
+    traps, key_pos, gate_pos = [], (), ()
+    for i in range(len(maze)):
+        for j in range(len(maze[i])):
+            if maze[i][j] == 'T': traps.append((i, j))
+            if maze[i][j] == 'K': key_pos = (i, j)
+            if maze[i][j] == 'G': gate_pos = (i, j)
+    level = engine.PackedLevel(maze, key_pos, traps, difficulty, engine.level_patrol_seed(filename))
+    state = level.encode(level.cell(*player), *[[level.cell(*p) for p in enemies[t]] for t in ("MW", "MR", "SW", "SR")],
+                         bool(gate_pos))
+    actions = {'w': engine.UP, 's': engine.DOWN, 'a': engine.LEFT, 'd': engine.RIGHT, 'x': None}
+    outcome = engine.PLAYING
+
     while True:
+        explorer, mw, mr, sw, sr, closed = level.decode(state)
         clear_screen()
-        print_board(maze, player, mummies)
-        
+        print_board(maze, level.position(explorer), [level.position(c) for c in mw + mr + sw + sr], closed)
+
         # Check Win
-        if maze[player[0]][player[1]] == CHAR_GOAL:
+        if outcome == engine.WIN:
             print("\n  *** YOU ESCAPED! ***")
             input("  Press Enter to continue...")
             return
 
         # Check Lose
-        for m in mummies:
-            if player == m:
-                print("\n  *** CAUGHT BY MUMMY! GAME OVER ***")
-                input("  Press Enter to continue...")
-                return
+        if outcome == engine.LOSE:
+            print("\n  *** CAUGHT BY MUMMY! GAME OVER ***")
+            input("  Press Enter to continue...")
+            return
 
         move = input("\n  Your Move: ").lower().strip()
         if move == 'q': return
-        
-        # Logic di chuyển đơn giản cho Player
-        new_p = player[:]
-        if move == 'w': new_p[0] -= 2 # Bước nhảy là 2 do map có tường xen kẽ
-        elif move == 's': new_p[0] += 2
-        elif move == 'a': new_p[1] -= 2
-        elif move == 'd': new_p[1] += 2
-        
-        # Check tường (đơn giản hoá)
-        if 0 <= new_p[0] < len(maze) and 0 <= new_p[1] < len(maze[0]):
-            # Kiểm tra xem ô giữa có phải tường không
-            mid_r, mid_c = (player[0]+new_p[0])//2, (player[1]+new_p[1])//2
-            if maze[mid_r][mid_c] != CHAR_WALL and maze[mid_r][mid_c] != CHAR_GATE_CLOSED:
-                player = new_p
-
-        # Logic di chuyển đơn giản cho Mummy (Luôn bám theo Player)
-        # Đây là AI "ngu" hơn bản đồ họa để demo thôi
-        for m in mummies:
-            step = 2
-            # Di chuyển theo chiều dọc trước
-            if m[0] < player[0]: m[0] += step
-            elif m[0] > player[0]: m[0] -= step
-            # Nếu bằng chiều dọc thì đi chiều ngang
-            elif m[1] < player[1]: m[1] += step
-            elif m[1] > player[1]: m[1] -= step
+        if move not in actions: continue
+
+        # Đi vào tường / cổng đóng -> BLOCKED, không mất lượt
+        next_state, next_outcome = level.step(state, actions[move])
+        if next_outcome != engine.BLOCKED:
+            state, outcome = next_state, next_outcome
 
 def run_ascii_game():
     levels = sorted([f for f in os.listdir(map_path) if f.endswith(".txt")])
+    for f in sorted(os.listdir(map_path)):
+        if f.endswith(level_pack.PACK_EXTS):
+            levels.extend(level_pack.pack_level_names(os.path.join(map_path, f)))
     while True:
         clear_screen()
         print("=== MUMMY MAZE DELUXE (ASCII VERSION) ===")
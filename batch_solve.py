@@ -0,0 +1,266 @@
+"""
+Giải hàng loạt level song song bằng multiprocessing (không cần pygame), in ra 1 dòng JSON
+cho mỗi level ngay khi giải xong (thứ tự hoàn thành, không phải thứ tự đầu vào).
+
+Cách chạy:
+    python batch_solve.py                            # Mọi level trong map/maze (+ map/agents)
+    python batch_solve.py map/maze gen/maze x.txt    # Thư mục hoặc file maze; agents nằm ở thư mục agents bên cạnh
+    python batch_solve.py gen --agents gen_agents    # Chỉ định thư mục agents
+    python batch_solve.py --workers 8 --timeout 10 --memory-mb 512 --solver astar --difficulty 3
+    python batch_solve.py --out results.jsonl        # Ghi ra file thay vì stdout
+    python batch_solve.py --solver ida --memory-mb 256  # IDA* ít bộ nhớ cho máy yếu
+    python batch_solve.py gen --solver layers        # BFS vector hóa bằng NumPy, nhanh cho pack level lớn
+    python batch_solve.py --progress 1               # Mỗi giây in tiến độ của level đang giải ra stderr (JSON)
+    python batch_solve.py gen --dedup                # Level tương đương (lật đối xứng...) chỉ giải 1 lần
+    python batch_solve.py --no-cache                 # Giải lại cả level đã có lời giải trong solution_cache.json
+
+Mỗi dòng: {"level", "status", "solvable", "length", "nodes", "elapsed", "peak_rss_kb"}
+    status: solved / unsolvable / timeout / memory / error
+    length: số bước của lời giải (không tính ô xuất phát)
+    Với --solver ida có thêm "table_bytes" / "memory_cap_bytes": bộ nhớ bảng transposition đã dùng / được cấp
+    Với --solver layers có thêm "layers", "layers_per_sec", "states_per_sec"
+    Với --dedup, level trùng (cùng level_index.canonical_key) không được giải: dòng của nó chép kết quả
+    của level đầu tiên trong nhóm, thêm "duplicate_of" và "nodes" = 0
+    Level đã có lời giải trong solution_cache.json không được giải lại: dòng của nó có "cached": true,
+    "nodes" = 0; lời giải / kết luận "unsolvable" mới được lưu vào cache (trừ khi --no-cache)
+Với --progress, mỗi bản ghi tiến độ là 1 dòng JSON trên stderr:
+    {"level", "solver", "depth", "frontier", "visited", "expanded", "elapsed", "nodes_per_sec", "done"}
+Giới hạn thời gian (SIGALRM) và bộ nhớ (RLIMIT_AS) chỉ có trên Unix; nơi khác sẽ bị bỏ qua.
+Exit code 1 nếu có level không được giải.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import multiprocessing
+
+try:
+    import resource  # Chỉ có trên Unix
+except ImportError:
+    resource = None
+
+import engine
+import search
+import level_index
+import solution_cache
+
+project_path = os.path.dirname(os.path.abspath(__file__))
+maze_path = os.path.join(project_path, "map", "maze")
+
+SOLVERS = search.SOLVERS
+# Số liệu riêng của từng solver được chép thêm vào dòng JSON nếu có
+EXTRA_STATS = ("table_bytes", "memory_cap_bytes", "layers", "layers_per_sec", "states_per_sec")
+
+
+class SolveTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise SolveTimeout()
+
+
+def collect_levels(paths, agents_dir=None):
+    """[(file maze, file agents)] từ danh sách file / thư mục (mọi *.txt, sắp theo tên)."""
+    levels = []
+    for path in paths:
+        if os.path.isdir(path):
+            files = [os.path.join(path, f) for f in sorted(os.listdir(path)) if f.endswith(".txt")]
+        else:
+            files = [path]
+        for maze_file in files:
+            agent_file = os.path.join(agents_dir, os.path.basename(maze_file)) if agents_dir else None
+            levels.append((maze_file, agent_file))
+    return levels
+
+
+def level_key(maze_file, agent_file=None, difficulty=1):
+    """
+    level_index.canonical_key của level trong file (agents mặc định như engine.read_level), kèm patrol seed
+    theo tên file như engine.compile_level: ở độ khó 2 / 3 level khác tên không bao giờ là trùng.
+    """
+    if agent_file is None:
+        maze_dir, name = os.path.split(maze_file)
+        agent_file = os.path.join(os.path.dirname(maze_dir), "agents", name)
+    with open(maze_file, "r") as f:
+        maze = f.read().splitlines()
+    agents = []
+    if os.path.exists(agent_file):
+        with open(agent_file, "r") as f:
+            agents = f.read().splitlines()
+    return level_index.canonical_key(maze, agents, difficulty, engine.level_patrol_seed(maze_file))
+
+
+def _max_rss_kb():
+    if resource is None: return None
+    # Linux trả về KB, macOS trả về byte
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _limit_memory(memory_mb):
+    if resource is None or not memory_mb: return
+    limit = memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY: limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def solve_level(task):
+    # Chạy trong process con riêng (maxtasksperchild=1): peak RSS và giới hạn bộ nhớ tính riêng cho từng level.
+    # Trả về (dòng kết quả, đường đi hoặc None, True nếu kết quả chắc chắn) để process chính lưu vào cache:
+    # hết bộ nhớ / thời gian, hay IDA* bỏ cuộc, không chứng minh level không giải được.
+    maze_file, agent_file, solver, difficulty, timeout, memory_mb, progress_interval = task
+    result = {"level": maze_file, "status": "error", "solvable": None, "length": None, "nodes": 0,
+              "elapsed": 0.0, "peak_rss_kb": None}
+    path = None
+    stats = {}  # Solver điền vào trong finally nên vẫn có số node khi bị ngắt giữa chừng
+    start_time = time.perf_counter()
+
+    last_progress = [0.0]
+
+    def progress(record):
+        # Solver gửi mỗi search.PROGRESS_INTERVAL giây; chỉ in mỗi progress_interval giây (và bản ghi cuối)
+        if record["done"] or record["elapsed"] - last_progress[0] >= progress_interval:
+            last_progress[0] = record["elapsed"]
+            sys.stderr.write(json.dumps(dict(record, level=maze_file)) + "\n")
+            sys.stderr.flush()
+
+    try:
+        level = engine.read_level(maze_file, agent_file)
+        if level["explorer"] is None:
+            raise ValueError("no explorer (E) in agents file")
+        packed, start = engine.compile_level(level, difficulty)
+        _limit_memory(memory_mb)
+        if timeout and hasattr(signal, "setitimer"):
+            signal.signal(signal.SIGALRM, _on_alarm)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        kwargs = {}
+        if progress_interval:
+            kwargs["progress"] = progress
+        if solver == "ida" and memory_mb:
+            # Bảng transposition lấy 1/2 giới hạn, phần còn lại cho interpreter + đường đi hiện tại
+            kwargs["memory_mb"] = memory_mb / 2
+        try:
+            path = SOLVERS[solver](packed, start, stats=stats, **kwargs)
+        finally:
+            if timeout and hasattr(signal, "setitimer"):
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        result["status"] = "solved" if path else "unsolvable"
+        result["solvable"] = bool(path)
+        result["length"] = len(path) - 1 if path else None
+    except SolveTimeout:
+        result["status"] = "timeout"
+    except MemoryError:
+        result["status"] = "memory"
+    except Exception as e:
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+    result["elapsed"] = round(time.perf_counter() - start_time, 6)
+    result["nodes"] = stats.get("expanded", 0)
+    result["peak_rss_kb"] = _max_rss_kb()
+    for key in EXTRA_STATS:
+        if key in stats:
+            result[key] = round(stats[key], 1) if isinstance(stats[key], float) else stats[key]
+    return result, path, bool(path) or bool(stats.get("unsolvable"))
+
+
+def cached_result(maze_file, path):
+    """Dòng kết quả của level lấy từ cache (path: lời giải đã lưu, None = không giải được)."""
+    return {"level": maze_file, "status": "solved" if path else "unsolvable", "solvable": bool(path),
+            "length": len(path) - 1 if path else None, "nodes": 0, "elapsed": 0.0, "peak_rss_kb": None,
+            "cached": True}
+
+
+def run_batch(levels, workers=None, solver="bfs", difficulty=1, timeout=60.0, memory_mb=2048, out=sys.stdout,
+              progress_interval=0, dedup=False, cache=None):
+    """
+    Giải song song, ghi mỗi kết quả thành 1 dòng JSON ngay khi có; trả về số level theo từng status.
+    progress_interval > 0: mỗi process in tiến độ của level đang giải ra stderr mỗi chừng ấy giây.
+    dedup: chỉ giải level đầu tiên của mỗi nhóm level tương đương, các level còn lại chép kết quả của nó.
+    cache: solution_cache.SolutionCache; level đã có trong cache không được giải lại, kết quả chắc chắn
+    (solved / unsolvable) mới được lưu vào.
+    """
+    duplicates = {}  # file maze được giải -> các file maze tương đương với nó
+    if dedup:
+        first = {}
+        unique = []
+        for maze_file, agent_file in levels:
+            try:
+                key = level_key(maze_file, agent_file, difficulty)
+            except (IOError, ValueError):
+                key = None  # Lỗi đọc file: để solve_level báo lỗi
+            if key is not None and key in first:
+                duplicates[first[key]].append(maze_file)
+                continue
+            if key is not None: first[key] = maze_file
+            duplicates[maze_file] = []
+            unique.append((maze_file, agent_file))
+        levels = unique
+    counts = {}
+
+    def emit(result):
+        copies = [dict(result, level=maze_file, duplicate_of=result["level"], nodes=0, elapsed=0.0)
+                  for maze_file in duplicates.get(result["level"], ())]
+        for line in [result] + copies:
+            out.write(json.dumps(line) + "\n")
+            counts[line["status"]] = counts.get(line["status"], 0) + 1
+        out.flush()
+
+    keys = {}  # file maze -> khóa cache, cho level chưa có trong cache
+    tasks = []
+    for maze_file, agent_file in levels:
+        if cache is not None:
+            try:
+                key = solution_cache.level_dict_key(engine.read_level(maze_file, agent_file), difficulty)
+            except (IOError, ValueError, TypeError, IndexError):
+                key = None  # Lỗi đọc file / không có explorer: để solve_level báo lỗi
+            if key is not None:
+                hit, path = cache.get(key)
+                if hit:
+                    emit(cached_result(maze_file, path))
+                    continue
+                keys[maze_file] = key
+        tasks.append((maze_file, agent_file, solver, difficulty, timeout, memory_mb, progress_interval))
+    try:
+        with multiprocessing.Pool(processes=workers, maxtasksperchild=1) as pool:
+            for result, path, proven in pool.imap_unordered(solve_level, tasks):
+                if result["level"] in keys and proven:
+                    cache.put(keys[result["level"]], path, os.path.basename(result["level"]))
+                emit(result)
+    finally:
+        if cache is not None: cache.flush()
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Giải song song nhiều level, mỗi level 1 dòng JSON")
+    parser.add_argument("paths", nargs="*", help="File maze hoặc thư mục chứa maze (mặc định: map/maze)")
+    parser.add_argument("--agents", help="Thư mục chứa file agents (mặc định: thư mục agents cạnh thư mục maze)")
+    parser.add_argument("--workers", type=int, default=None, help="Số process (mặc định: số CPU)")
+    parser.add_argument("--solver", choices=sorted(SOLVERS), default="bfs")
+    parser.add_argument("--difficulty", type=int, default=1, choices=(1, 2, 3),
+                        help="AI của quái mà solver mô phỏng (1 Greedy, 2 Chase, 3 Zone + đi tuần)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Giây tối đa cho mỗi level (0 = không giới hạn)")
+    parser.add_argument("--memory-mb", type=int, default=2048,
+                        help="Bộ nhớ ảo tối đa của process giải mỗi level, MB (0 = không giới hạn)")
+    parser.add_argument("--out", help="Ghi kết quả vào file này thay vì stdout")
+    parser.add_argument("--progress", type=float, default=0, metavar="SECONDS",
+                        help="In tiến độ của solver ra stderr (1 dòng JSON) mỗi SECONDS giây (0 = tắt)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Không giải lại level tương đương với level đã có trong batch (xem level_index.py)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Không dùng / không ghi solution_cache.json (vd. khi đo thời gian giải)")
+    args = parser.parse_args()
+
+    levels = collect_levels(args.paths or [maze_path], args.agents)
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        counts = run_batch(levels, args.workers, args.solver, args.difficulty, args.timeout, args.memory_mb, out,
+                           args.progress, args.dedup, None if args.no_cache else solution_cache.default_cache())
+    finally:
+        if args.out: out.close()
+    print("{} levels: {}".format(len(levels), ", ".join("{} {}".format(n, s) for s, n in sorted(counts.items()))),
+          file=sys.stderr)
+    sys.exit(0 if counts.get("solved", 0) == len(levels) else 1)
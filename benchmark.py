@@ -0,0 +1,583 @@
+"""
+Benchmark cho solver trong search.py (chạy headless, không cần cửa sổ pygame).
+
+Cách chạy:
+    python benchmark.py                 # Peak RSS cho mỗi lần giải, mọi level trong map/maze
+    python benchmark.py map6_1.txt ...  # Chỉ đo các level được chỉ định
+    python benchmark.py --progress      # Như trên, kèm tiến độ của solver (độ sâu, frontier, nodes/s) ra stderr
+    python benchmark.py --alloc         # Số allocation mỗi node mở rộng (tracemalloc), map 10x10
+    python benchmark.py --compare       # So sánh BFS và A*: số node mở rộng + thời gian
+    python benchmark.py --compare --difficulty 3  # Như trên, quái dùng AI Hard (Zone + đi tuần có seed)
+    python benchmark.py --turns 20000   # Số lượt/giây của engine.PackedLevel.step (random walk có seed)
+    python benchmark.py --large 12 20 30 --enemies 40  # Mê cung lớn sinh ngẫu nhiên: thời gian sinh / giải và
+                                                       # độ trễ mỗi lượt; exit 1 nếu 1 lượt chậm hơn 1 frame (30 fps)
+
+Bộ benchmark có ngưỡng hồi quy (mọi level x độ khó 1, 2, 3 x BFS / A*):
+    python benchmark.py --suite --save-baseline              # Chạy và lưu benchmark_baseline.json
+    python benchmark.py --suite --baseline --threshold 15    # So với baseline, exit 1 nếu chậm / tốn hơn > 15%
+    python benchmark.py --suite --json suite.json            # Lưu kết quả lần chạy này
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import json
+import platform
+import tracemalloc
+import multiprocessing
+
+try:
+    import resource  # Chỉ có trên Unix
+except ImportError:
+    resource = None
+
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")  # characters import pygame; giữ stdout sạch
+import characters
+import engine
+import search
+import maze_generator
+
+project_path = os.path.dirname(os.path.abspath(__file__))
+maze_path = os.path.join(project_path, "map", "maze")
+object_path = os.path.join(project_path, "map", "agents")
+baseline_path = os.path.join(project_path, "benchmark_baseline.json")
+
+SUITE_SOLVERS = search.SOLVERS
+
+
+def list_levels():
+    try:
+        return sorted(f for f in os.listdir(maze_path) if f.endswith(".txt"))
+    except FileNotFoundError:
+        return []
+
+
+def load_level(name):
+    """Đọc maze + agents giống GameState nhưng không cần pygame."""
+    return engine.read_level(os.path.join(maze_path, name), os.path.join(object_path, name))
+
+
+def build_search_input(level, difficulty=1):
+    """Tạo tham số cho search.BFS từ level đã đọc (cổng đóng sẵn như trong rungame, cùng patrol seed)."""
+    explorer = characters.Explorer(level["explorer"][0], level["explorer"][1])
+
+    def make(pos_list, CharClass):
+        chars = []
+        for p in pos_list:
+            c = CharClass(p[0], p[1])
+            c.set_difficulty(difficulty)
+            c.set_patrol_seed(engine.level_patrol_seed(level["name"]))
+            chars.append(c)
+        return chars
+
+    mw = make(level["mw"], characters.mummy_white)
+    mr = make(level["mr"], characters.mummy_red)
+    sw = make(level["sw"], characters.scorpion_white)
+    sr = make(level["sr"], characters.scorpion_red)
+    gate = {"isClosed": bool(level["gate_position"])}
+    # check_explorer_is_killed (mốc --alloc bên dưới) nhận 1 vị trí bẫy
+    trap = level["trap_position"][0] if level["trap_position"] else ()
+    return explorer, mw, mr, sw, sr, gate, trap, level["key_position"], level["maze"]
+
+
+def _max_rss_kb():
+    if resource is None: return None
+    # Linux trả về KB, macOS trả về byte
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def print_progress(record):
+    """In 1 bản ghi tiến độ của solver (search.ProgressReporter) ra stderr."""
+    print("  [{solver}] depth={depth} frontier={frontier} visited={visited} expanded={expanded} "
+          "{elapsed:.1f}s {nodes_per_sec:.0f} nodes/s{}".format(" done" if record["done"] else "", **record),
+          file=sys.stderr, flush=True)
+
+
+def _solve_and_measure(task):
+    # Chạy trong process con riêng để peak RSS không bị cộng dồn giữa các level
+    name, progress = task
+    level = load_level(name)
+    args = build_search_input(level)
+    rss_before = _max_rss_kb()
+    start = time.perf_counter()
+    path = search.BFS(*args, progress=print_progress if progress else None)
+    elapsed = time.perf_counter() - start
+    return {"level": name, "solvable": path is not None, "length": len(path) if path else 0,
+            "elapsed": elapsed, "rss_before_kb": rss_before, "peak_rss_kb": _max_rss_kb()}
+
+
+def peak_rss_benchmark(levels, progress=False):
+    results = []
+    with multiprocessing.Pool(processes=1, maxtasksperchild=1) as pool:
+        for result in pool.imap(_solve_and_measure, [(name, progress) for name in levels]):
+            results.append(result)
+            peak = result["peak_rss_kb"]
+            if peak is None:
+                rss_text = "n/a"
+            else:
+                rss_text = "{:.1f} MB (+{:.1f} MB)".format(peak / 1024, (peak - result["rss_before_kb"]) / 1024)
+            print("{:<22} len={:<4} time={:>8.3f}s  peak RSS={}".format(
+                result["level"], result["length"], result["elapsed"], rss_text))
+    return results
+
+
+def _first_states(packed, start, count):
+    # Lấy `count` state đầu tiên theo thứ tự BFS để đo cùng một tập node
+    queue = search.Queue()
+    queue.push(start)
+    states = []
+    while not queue.is_empty() and len(states) < count:
+        state = queue.pop()
+        states.append(state)
+        for _, next_state in packed.successors(state):
+            if next_state not in queue:
+                queue.push(next_state)
+    return states
+
+
+# ---------------------------------------------------------------------------------------------------------
+# MỐC SO SÁNH ALLOCATION (đóng băng) — KHÔNG phải luật chơi.
+# Bản sao luật cũ dựa trên object characters mà search.py dùng trước khi có engine, chỉ để --alloc đo số
+# block / node của cách mở rộng cũ. Luật chơi duy nhất nằm trong engine.py; đừng sửa / gọi các hàm này ở nơi khác.
+# ---------------------------------------------------------------------------------------------------------
+
+def check_key_position(character, gate, key_position):
+    if key_position and character.get_x() == key_position[0] and character.get_y() == key_position[1]:
+        if gate["isClosed"]:
+            gate["isClosed"] = False
+        else:
+            gate["isClosed"] = True
+    return gate
+
+def update_list_character(list_character):
+    i = 0
+    while i < len(list_character):
+        j = 0
+        while j < len(list_character):
+            if j != i and list_character[i].check_same_position(list_character[j]):
+                del list_character[j]
+            j += 1
+        i += 1
+    return list_character
+
+def update_lists_character(list_strong_scharacter, list_week_scharacter):
+    for i in range(len(list_strong_scharacter)):
+        j = 0
+        while j < len(list_week_scharacter):
+            if list_strong_scharacter[i].check_same_position(list_week_scharacter[j]):
+                del list_week_scharacter[j]
+            j += 1
+    return list_week_scharacter
+
+def check_explorer_is_killed(explorer_character, mummy_white_character, mummy_red_character, scorpion_white_character,
+                            scorpion_red_character, trap_position):
+    if trap_position and explorer_character.get_x() == trap_position[0] and explorer_character.get_y() == trap_position[1]:
+        return True
+    if mummy_white_character:
+        for i in range(len(mummy_white_character)):
+            if explorer_character.get_x() == mummy_white_character[i].get_x() and explorer_character.get_y() == mummy_white_character[i].get_y():
+                return True
+    if mummy_red_character:
+        for i in range(len(mummy_red_character)):
+            if explorer_character.get_x() == mummy_red_character[i].get_x() and explorer_character.get_y() == mummy_red_character[i].get_y():
+                return True
+    if scorpion_white_character:
+        for i in range(len(scorpion_white_character)):
+            if explorer_character.get_x() == scorpion_white_character[i].get_x() and explorer_character.get_y() == scorpion_white_character[i].get_y():
+                return True
+    if scorpion_red_character:
+        for i in range(len(scorpion_red_character)):
+            if explorer_character.get_x() == scorpion_red_character[i].get_x() and explorer_character.get_y() == scorpion_red_character[i].get_y():
+                return True
+    return False
+
+def attempt_move(explorer_x, explorer_y, explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp,
+                 current_gate_tmp, key_position, trap_position, maze):
+    explorer_is_killed = False
+    explorer_tmp.move_xy(explorer_x, explorer_y)
+    if key_position:
+        current_gate_tmp = check_key_position(explorer_tmp, current_gate_tmp, key_position)
+    # FIRST MOVE
+    # Mummy White
+    for i in range(len(mummy_white_tmp)):
+        mummy_white_tmp[i] = mummy_white_tmp[i].white_move(maze, current_gate_tmp, explorer_tmp)
+    if key_position:
+        for i in range(len(mummy_white_tmp)):
+            current_gate_tmp = check_key_position(mummy_white_tmp[i], current_gate_tmp, key_position)
+    # Mummy Red
+    for i in range(len(mummy_red_tmp)):
+        mummy_red_tmp[i] = mummy_red_tmp[i].red_move(maze, current_gate_tmp, explorer_tmp)
+    if key_position:
+        for i in range(len(mummy_red_tmp)):
+            current_gate_tmp = check_key_position(mummy_red_tmp[i], current_gate_tmp, key_position)
+    # Scorpion White
+    for i in range(len(scorpion_white_tmp)):
+        scorpion_white_tmp[i] = scorpion_white_tmp[i].white_move(maze, current_gate_tmp, explorer_tmp)
+    if key_position:
+        for i in range(len(scorpion_white_tmp)):
+            current_gate_tmp = check_key_position(scorpion_white_tmp[i], current_gate_tmp, key_position)
+    # Scorpion Red
+    for i in range(len(scorpion_red_tmp)):
+        scorpion_red_tmp[i] = scorpion_red_tmp[i].red_move(maze, current_gate_tmp, explorer_tmp)
+    if key_position:
+        for i in range(len(scorpion_red_tmp)):
+            current_gate_tmp = check_key_position(scorpion_red_tmp[i], current_gate_tmp, key_position)
+
+    explorer_is_killed = check_explorer_is_killed(explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp,
+                                                  scorpion_red_tmp, trap_position)
+
+    if not explorer_is_killed:
+        # Delete mummy white have same position
+        mummy_white_tmp = update_list_character(mummy_white_tmp)
+        # Delete mummy red have same position
+        mummy_red_tmp = update_list_character(mummy_red_tmp)
+        # Delete scorpion white have same position
+        scorpion_white_tmp = update_list_character(scorpion_white_tmp)
+        # Delete scorpion red have same position
+        scorpion_red_tmp = update_list_character(scorpion_red_tmp)
+        # Delete mummy red, scropion white, scorpion red if mummy white have the same position
+        if mummy_red_tmp:
+            mummy_red_tmp = update_lists_character(mummy_white_tmp, mummy_red_tmp)
+        if scorpion_white_tmp:
+            scorpion_white_tmp = update_lists_character(mummy_white_tmp, scorpion_white_tmp)
+        if scorpion_red_tmp:
+            scorpion_red_tmp = update_lists_character(mummy_white_tmp, scorpion_red_tmp)
+        # Delete scropion white, scorpion red if mummy red have the same position
+        if scorpion_white_tmp:
+            scorpion_white_tmp = update_lists_character(mummy_red_tmp, scorpion_white_tmp)
+        if scorpion_red_tmp:
+            scorpion_red_tmp = update_lists_character(mummy_red_tmp, scorpion_red_tmp)
+        # Delete scorpion red if scorpion white have the same position
+        if scorpion_red_tmp:
+            scorpion_red_tmp = update_lists_character(scorpion_white_tmp, scorpion_red_tmp)
+
+    # SECOND MOVE
+        # Mummy White
+        for i in range(len(mummy_white_tmp)):
+            mummy_white_tmp[i] = mummy_white_tmp[i].white_move(maze, current_gate_tmp, explorer_tmp)
+        if key_position:
+            for i in range(len(mummy_white_tmp)):
+                current_gate_tmp = check_key_position(mummy_white_tmp[i], current_gate_tmp, key_position)
+        # Mummy Red
+        for i in range(len(mummy_red_tmp)):
+            mummy_red_tmp[i] = mummy_red_tmp[i].red_move(maze, current_gate_tmp, explorer_tmp)
+        if key_position:
+            for i in range(len(mummy_red_tmp)):
+                current_gate_tmp = check_key_position(mummy_red_tmp[i], current_gate_tmp, key_position)
+        # Delete mummy white have same position
+        mummy_white_tmp = update_list_character(mummy_white_tmp)
+        # Delete mummy red have same position
+        mummy_red_tmp = update_list_character(mummy_red_tmp)
+        # Delete mummy red, scropion white, scorpion red if mummy white have the same position
+        if mummy_red_tmp:
+            mummy_red_tmp = update_lists_character(mummy_white_tmp, mummy_red_tmp)
+        if scorpion_white_tmp:
+            scorpion_white_tmp = update_lists_character(mummy_white_tmp, scorpion_white_tmp)
+        if scorpion_red_tmp:
+            scorpion_red_tmp = update_lists_character(mummy_white_tmp, scorpion_red_tmp)
+        # Delete scropion white, scorpion red if mummy red have the same position
+        if scorpion_white_tmp:
+            scorpion_white_tmp = update_lists_character(mummy_red_tmp, scorpion_white_tmp)
+        if scorpion_red_tmp:
+            scorpion_red_tmp = update_lists_character(mummy_red_tmp, scorpion_red_tmp)
+        explorer_is_killed = check_explorer_is_killed(explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp,
+                                                      scorpion_red_tmp, trap_position)
+
+    return explorer_is_killed
+
+
+
+def _expand_with_characters(packed, decoded, trap, key, maze):
+    # Cách search.BFS cũ mở rộng node (luật cũ đóng băng ở trên): copy Explorer + 4 list quái + gate cho từng hướng đi
+    classes = (characters.mummy_white, characters.mummy_red, characters.scorpion_white, characters.scorpion_red)
+    ex, ey = packed.position(decoded[0])
+    children = []
+    for action in engine.ACTIONS:
+        explorer_tmp = characters.Explorer(ex, ey)
+        groups = [[CharClass(*packed.position(c)) for c in decoded[i + 1]] for i, CharClass in enumerate(classes)]
+        gate_tmp = {"isClosed": bool(decoded[5])}
+        nx, ny = ex, ey
+        if action is not None:
+            nx, ny = ex + engine.DIRECTIONS[action][0], ey + engine.DIRECTIONS[action][1]
+            if not explorer_tmp.eligible_character_move(maze, gate_tmp, ex, ey, nx, ny):
+                continue
+        if not attempt_move(nx, ny, explorer_tmp, *groups, gate_tmp, key, trap, maze):
+            children.append([explorer_tmp] + groups + [gate_tmp])
+    return children
+
+
+def _traced_allocations(expand, states):
+    # Giữ lại mọi node con sinh ra (như khi được đẩy vào Queue) rồi đếm block còn sống
+    kept = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for state in states:
+        kept.extend(expand(state))
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, "filename")
+    return sum(stat.count_diff for stat in diff), sum(stat.size_diff for stat in diff)
+
+
+def allocation_benchmark(levels, nodes=500):
+    """So sánh số block được cấp phát / node giữa cách mở rộng bằng object cũ và PackedLevel."""
+    for name in levels:
+        level = load_level(name)
+        explorer, mw, mr, sw, sr, gate, trap, key, maze = build_search_input(level)
+        packed = engine.PackedLevel(maze, key, trap)
+        start = packed.pack(explorer, mw, mr, sw, sr, gate)
+        states = _first_states(packed, start, nodes)
+        decoded = [packed.decode(state) for state in states]
+
+        obj_blocks, obj_bytes = _traced_allocations(
+            lambda node: _expand_with_characters(packed, node, trap, key, maze), decoded)
+        packed_blocks, packed_bytes = _traced_allocations(
+            lambda state: [child for _, child in packed.successors(state)], states)
+
+        n = len(states)
+        print("{:<22} nodes={:<5} objects: {:>6.1f} blocks {:>7.0f} B/node | packed: {:>5.1f} blocks {:>6.0f} B/node"
+              " | x{:.1f} fewer blocks".format(name, n, obj_blocks / n, obj_bytes / n, packed_blocks / n,
+                                               packed_bytes / n, obj_blocks / max(packed_blocks, 1)))
+
+
+def _run_solver(solver, args, difficulty=1, patrol_seed=0):
+    stats = {}
+    start = time.perf_counter()
+    path = solver(*args, stats=stats, difficulty=difficulty, patrol_seed=patrol_seed)
+    elapsed = time.perf_counter() - start
+    return path, stats["expanded"], elapsed
+
+
+def compare_solvers(levels, difficulty=1):
+    """In số node mở rộng và thời gian của search.BFS và search.astar cho từng level."""
+    print("{:<22} {:>5} {:>9} {:>9} | {:>5} {:>9} {:>9}".format(
+        "level", "len", "BFS node", "BFS s", "len", "A* node", "A* s"))
+    totals = [0, 0.0, 0, 0.0]
+    for name in levels:
+        args = build_search_input(load_level(name), difficulty)
+        seed = engine.level_patrol_seed(name)
+        bfs_path, bfs_nodes, bfs_time = _run_solver(search.BFS, args, difficulty, seed)
+        astar_path, astar_nodes, astar_time = _run_solver(search.astar, args, difficulty, seed)
+        print("{:<22} {:>5} {:>9} {:>9.4f} | {:>5} {:>9} {:>9.4f}".format(
+            name, len(bfs_path) if bfs_path else "-", bfs_nodes, bfs_time,
+            len(astar_path) if astar_path else "-", astar_nodes, astar_time))
+        totals[0] += bfs_nodes; totals[1] += bfs_time
+        totals[2] += astar_nodes; totals[3] += astar_time
+    print("{:<22} {:>5} {:>9} {:>9.4f} | {:>5} {:>9} {:>9.4f}".format("TOTAL", "", totals[0], totals[1], "",
+                                                                     totals[2], totals[3]))
+
+
+def turn_throughput(levels, turns=20000, difficulty=1, seed=0):
+    """Lượt/giây của engine.PackedLevel.step: explorer đi ngẫu nhiên (có seed), thắng / thua thì chơi lại từ đầu."""
+    total_turns, total_time = 0, 0.0
+    for name in levels:
+        level = load_level(name)
+        explorer, mw, mr, sw, sr, gate, _, key, maze = build_search_input(level, difficulty)
+        packed = engine.PackedLevel(maze, key, level["trap_position"], difficulty, engine.level_patrol_seed(name))
+        start = packed.pack(explorer, mw, mr, sw, sr, gate)
+        rng = random.Random(seed)
+        actions = [rng.choice(engine.ACTIONS) for _ in range(turns * 2)]
+
+        state, played, games = start, 0, 1
+        begin = time.perf_counter()
+        for action in actions:
+            state, outcome = packed.step(state, action)
+            if outcome == engine.BLOCKED:
+                continue
+            played += 1
+            if outcome != engine.PLAYING:
+                state = start
+                games += 1
+            if played == turns:
+                break
+        elapsed = time.perf_counter() - begin
+        total_turns += played
+        total_time += elapsed
+        print("{:<22} turns={:<6} games={:<5} {:>9.0f} turns/s".format(name, played, games, played / elapsed))
+    print("{:<22} turns={:<6} {:>17.0f} turns/s".format("TOTAL", total_turns, total_turns / max(total_time, 1e-9)))
+    return total_turns / max(total_time, 1e-9)
+
+
+FRAME_TIME = 1.0 / 30  # rungame chạy 30 fps
+
+
+def large_maze_latency(sizes, enemies=None, turns=2000, difficulty=1, seed=0):
+    """
+    Với mỗi cỡ: sinh 1 level (maze_generator, `enemies` quái hoặc số mặc định theo cỡ), đo thời gian sinh,
+    compile (PackedLevel + bảng greedy), A* (tối đa SOLVE_NODE_BUDGET node, như khi sinh level) và độ trễ
+    mỗi lượt khi explorer đi ngẫu nhiên `turns` lượt.
+    Trả về True nếu mọi lượt nhanh hơn FRAME_TIME.
+    """
+    ok = True
+    for size in sizes:
+        count = enemies or maze_generator.enemy_count(size)
+        begin = time.perf_counter()
+        gen = maze_generator.MazeGenerator(size, 50, seed)
+        gen.generate()
+        explorer_pos, placed = gen.randomize_positions(count)
+        generate_time = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        packed, start = gen.compile(explorer_pos, placed, difficulty)
+        compile_time = time.perf_counter() - begin
+        begin = time.perf_counter()
+        stats = {}
+        path = search.astar_states(packed, start, maze_generator.SOLVE_NODE_BUDGET, stats)
+        solve_time = time.perf_counter() - begin
+
+        rng = random.Random(seed)
+        state, worst, total = start, 0.0, 0.0
+        for _ in range(turns):
+            action = rng.choice(engine.ACTIONS)
+            t = time.perf_counter()
+            next_state, outcome = packed.step(state, action)
+            elapsed = time.perf_counter() - t
+            worst, total = max(worst, elapsed), total + elapsed
+            state = start if outcome in (engine.WIN, engine.LOSE) else next_state
+        ok = ok and worst < FRAME_TIME
+        moves = len(path) - 1 if path else "unsolvable" if stats.get("unsolvable") else "over budget"
+        print("{0}x{0:<4} enemies={1:<3} generate={2:7.1f}ms compile={3:6.1f}ms astar={4:7.1f}ms ({5}) "
+              "turn avg={6:.3f}ms max={7:.3f}ms".format(size, len(placed), generate_time * 1e3, compile_time * 1e3,
+                                                        solve_time * 1e3, moves, total / turns * 1e3, worst * 1e3))
+    print("max turn {} one frame ({:.1f}ms)".format("under" if ok else "OVER", FRAME_TIME * 1e3))
+    return ok
+
+
+def _suite_measure(task):
+    # Chạy trong process con riêng (maxtasksperchild=1) để peak RSS là của riêng lần giải này
+    name, solver, difficulty, repeat = task
+    packed, start = engine.compile_level(load_level(name), difficulty)
+    best, result = None, None
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = search.solve(packed, start, solver)
+        elapsed = time.perf_counter() - begin
+        best = elapsed if best is None else min(best, elapsed)
+    stats, path = result.stats, result.path
+    return {"level": name, "solver": solver, "difficulty": difficulty, "length": len(path) - 1 if path else None,
+            "nodes": stats["expanded"], "generated": stats["generated"], "elapsed": best,
+            "nodes_per_sec": stats["expanded"] / best if best > 0 else 0.0, "peak_rss_kb": _max_rss_kb()}
+
+
+def run_suite(levels, difficulties=(1, 2, 3), solvers=("bfs", "astar"), repeat=3, workers=1):
+    """
+    Giải mọi level ở từng độ khó với từng solver; thời gian là lần nhanh nhất trong `repeat` lần.
+    Trả về dict gồm "entries" (từng lần giải) và "totals" (cộng dồn theo solver/độ khó).
+    """
+    tasks = [(name, solver, d, repeat) for solver in solvers for d in difficulties for name in levels]
+    entries = {}
+    with multiprocessing.Pool(processes=workers, maxtasksperchild=1) as pool:
+        for result in pool.imap(_suite_measure, tasks):
+            entries["{}/{}/{}".format(result["solver"], result["difficulty"], result["level"])] = result
+
+    totals = {}
+    for solver in solvers:
+        for d in difficulties:
+            group = [e for e in entries.values() if e["solver"] == solver and e["difficulty"] == d]
+            nodes, elapsed = sum(e["nodes"] for e in group), sum(e["elapsed"] for e in group)
+            totals["{}/{}".format(solver, d)] = {
+                "levels": len(group), "solved": sum(1 for e in group if e["length"] is not None),
+                "nodes": nodes, "elapsed": elapsed, "nodes_per_sec": nodes / elapsed if elapsed > 0 else 0.0,
+                "peak_rss_kb": max((e["peak_rss_kb"] or 0 for e in group), default=0)}
+    return {"python": platform.python_version(), "machine": platform.machine(), "repeat": repeat,
+            "entries": entries, "totals": totals}
+
+
+def print_suite(result):
+    print("{:<10} {:>7} {:>7} {:>10} {:>10} {:>12} {:>10}".format(
+        "solver/d", "levels", "solved", "nodes", "time s", "nodes/s", "peak MB"))
+    for key, t in result["totals"].items():
+        print("{:<10} {:>7} {:>7} {:>10} {:>10.4f} {:>12.0f} {:>10.1f}".format(
+            key, t["levels"], t["solved"], t["nodes"], t["elapsed"], t["nodes_per_sec"], t["peak_rss_kb"] / 1024))
+
+
+def find_regressions(result, baseline, threshold=10.0):
+    """
+    So kết quả với baseline; trả về danh sách hồi quy vượt quá `threshold` %.
+    Số node (tất định) so theo từng level; thời gian, nodes/s và peak RSS so theo tổng mỗi solver/độ khó
+    vì từng lần giải chỉ mất vài ms, quá nhiễu để so riêng.
+    """
+    limit = threshold / 100.0
+    regressions = []
+
+    def worse(key, metric, old, new, higher_is_worse=True):
+        if not old: return
+        change = (new - old) / old if higher_is_worse else (old - new) / old
+        if change > limit:
+            regressions.append("{} {}: {:.6g} -> {:.6g} ({:+.1f}%)".format(
+                key, metric, old, new, 100 * (new - old) / old))
+
+    for key, entry in result["entries"].items():
+        old = baseline["entries"].get(key)
+        if old is None: continue
+        if (old["length"] is None) != (entry["length"] is None) or old["length"] != entry["length"]:
+            regressions.append("{} length: {} -> {}".format(key, old["length"], entry["length"]))
+        worse(key, "nodes", old["nodes"], entry["nodes"])
+    for key, total in result["totals"].items():
+        old = baseline["totals"].get(key)
+        if old is None: continue
+        worse(key, "nodes", old["nodes"], total["nodes"])
+        worse(key, "time", old["elapsed"], total["elapsed"])
+        worse(key, "nodes/s", old["nodes_per_sec"], total["nodes_per_sec"], higher_is_worse=False)
+        worse(key, "peak RSS", old["peak_rss_kb"], total["peak_rss_kb"])
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark solver trong search.py")
+    parser.add_argument("levels", nargs="*", help="Tên file level trong map/maze (mặc định: tất cả)")
+    parser.add_argument("--alloc", action="store_true",
+                        help="Đo allocation mỗi node mở rộng bằng tracemalloc thay vì peak RSS")
+    parser.add_argument("--nodes", type=int, default=500, help="Số node mở rộng khi đo --alloc")
+    parser.add_argument("--compare", action="store_true", help="So sánh BFS và A* trên từng level")
+    parser.add_argument("--difficulty", type=int, default=1, choices=(1, 2, 3),
+                        help="AI của quái khi --compare / --turns (1 Greedy, 2 Chase, 3 Zone + đi tuần)")
+    parser.add_argument("--turns", type=int, default=0, help="Đo số lượt/giây của engine với N lượt mỗi level")
+    parser.add_argument("--large", type=int, nargs="+", metavar="SIZE",
+                        help="Đo mê cung lớn sinh ngẫu nhiên với các cỡ này (vd. 12 20 30)")
+    parser.add_argument("--enemies", type=int, help="Số quái khi đo --large (mặc định theo cỡ)")
+    parser.add_argument("--suite", action="store_true",
+                        help="Bộ benchmark: mọi level x độ khó x solver, có so sánh baseline")
+    parser.add_argument("--difficulties", type=int, nargs="+", default=[1, 2, 3], choices=(1, 2, 3),
+                        help="Các độ khó chạy trong --suite")
+    parser.add_argument("--solvers", nargs="+", default=["bfs", "astar"], choices=sorted(SUITE_SOLVERS),
+                        help="Các solver chạy trong --suite")
+    parser.add_argument("--repeat", type=int, default=3, help="Số lần giải mỗi level trong --suite (lấy lần nhanh nhất)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Số process song song trong --suite (>1 nhanh hơn nhưng thời gian nhiễu hơn)")
+    parser.add_argument("--json", help="Lưu kết quả --suite vào file JSON này")
+    parser.add_argument("--save-baseline", nargs="?", const=baseline_path, help="Lưu kết quả --suite làm baseline")
+    parser.add_argument("--baseline", nargs="?", const=baseline_path,
+                        help="So --suite với baseline (mặc định benchmark_baseline.json), exit 1 nếu hồi quy")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Ngưỡng hồi quy, %% (mặc định 10)")
+    parser.add_argument("--progress", action="store_true",
+                        help="In tiến độ của solver (độ sâu, frontier, nodes/s) ra stderr khi đo peak RSS")
+    args = parser.parse_args()
+
+    if args.suite:
+        result = run_suite(args.levels or list_levels(), args.difficulties, args.solvers, args.repeat, args.workers)
+        print_suite(result)
+        for path in (args.json, args.save_baseline):
+            if path:
+                with open(path, "w") as f: json.dump(result, f, indent=1)
+                print("Saved {}".format(path))
+        if args.baseline:
+            with open(args.baseline) as f: baseline = json.load(f)
+            regressions = find_regressions(result, baseline, args.threshold)
+            for line in regressions: print("REGRESSION " + line)
+            print("{} regression(s) over {}% vs {}".format(len(regressions), args.threshold, args.baseline))
+            sys.exit(1 if regressions else 0)
+    elif args.large:
+        sys.exit(0 if large_maze_latency(args.large, args.enemies, args.turns or 2000, args.difficulty) else 1)
+    elif args.turns:
+        turn_throughput(args.levels or list_levels(), args.turns, args.difficulty)
+    elif args.compare:
+        compare_solvers(args.levels or list_levels(), args.difficulty)
+    elif args.alloc:
+        # Mặc định chỉ đo các map 10x10 (21 dòng)
+        selected = args.levels or [f for f in list_levels() if len(load_level(f)["maze"]) == 21]
+        allocation_benchmark(selected, args.nodes)
+    else:
+        peak_rss_benchmark(args.levels or list_levels(), args.progress)
@@ -0,0 +1,275 @@
+"""
+File pack nhị phân: nhiều level trong 1 file, mở bằng mmap nên đọc 1 level bất kỳ là O(1)
+(tính vị trí bản ghi + giải mã vài bitset), không phải đọc / parse file text nào.
+
+    with BinaryPack("map/maze/levels.mzb") as pack:
+        maze, agents = pack.lines("map8_3.txt")   # các dòng như file map/maze + map/agents
+        level = pack.level("map8_3.txt")          # dict như engine.read_level
+
+Chuyển đổi qua lại với bố cục map/maze + map/agents:
+    python binary_pack.py pack map/maze/levels.mzb                       # mọi *.txt trong map/maze (+ map/agents)
+    python binary_pack.py pack out.mzb --maze gen/maze --agents gen/agents
+    python binary_pack.py unpack map/maze/levels.mzb --maze out/maze --agents out/agents
+Level trong map/maze/*.mzb hiện trong danh sách màn như level của file .pack (xem level_pack.split_level_name).
+
+Cấu trúc file (little-endian):
+    header  : magic "MZB1", version, rows, cols, max_agents, name_size, count
+              (rows x cols: lưới lớn nhất trong pack, max_agents: số nhân vật nhiều nhất của 1 level)
+    index   : count tên level, mỗi tên name_size byte UTF-8 (đệm \\0)
+    records : count bản ghi CÙNG kích thước record_size -> bản ghi i nằm ở records + i * record_size
+Mỗi bản ghi:
+    số dòng, rows byte độ dài từng dòng (file map lỗi có thể có dòng ngắn hơn),
+    5 bitset rows * cols bit (ô (r, c) là bit r * cols + c): tường '%', cầu thang 'S', chìa khóa 'K', cổng 'G', bẫy 'T'
+    (ô không thuộc bitset nào là ô trống ' '),
+    số nhân vật của từng loại (E, MW, MR, SW, SR) rồi max_agents cặp (dòng, cột) theo thứ tự đó.
+"""
+import os
+import sys
+import mmap
+import struct
+import argparse
+
+project_path = os.path.dirname(os.path.abspath(__file__))
+maze_path = os.path.join(project_path, "map", "maze")
+object_path = os.path.join(project_path, "map", "agents")
+
+PACK_EXT = ".mzb"
+MAGIC = b"MZB1"
+VERSION = 1
+HEADER = struct.Struct("<4sHHHHHI")  # magic, version, rows, cols, max_agents, name_size, count
+NAME_SIZE = 64
+# Ký tự ô -> thứ tự bitset trong bản ghi
+CELL_CHARS = "%SKGT"
+AGENT_TAGS = ("E", "MW", "MR", "SW", "SR")
+
+
+def _bitset_size(rows, cols):
+    return (rows * cols + 7) // 8
+
+
+def _record_size(rows, cols, max_agents):
+    return 1 + rows + len(CELL_CHARS) * _bitset_size(rows, cols) + len(AGENT_TAGS) + 2 * max_agents
+
+
+def _parse_agents(agent_lines):
+    groups = {tag: [] for tag in AGENT_TAGS}
+    for line in agent_lines:
+        x = line.split()
+        if x and x[0] in groups:
+            groups[x[0]].append((int(x[1]), int(x[2])))
+    return groups
+
+
+def _encode(maze, groups, rows, cols, max_agents):
+    # 1 bản ghi (bytes, đúng _record_size) của level
+    bits = [0] * len(CELL_CHARS)
+    for r, line in enumerate(maze):
+        for c, ch in enumerate(line):
+            if ch == ' ': continue
+            kind = CELL_CHARS.find(ch)
+            if kind < 0: raise ValueError("unsupported maze cell {!r} at ({}, {})".format(ch, r, c))
+            bits[kind] |= 1 << (r * cols + c)
+    size = _bitset_size(rows, cols)
+    positions = [p for tag in AGENT_TAGS for p in groups[tag]]
+    record = bytearray([len(maze)])
+    record += bytes(len(line) for line in maze).ljust(rows, b"\0")
+    for value in bits:
+        record += value.to_bytes(size, "little")
+    record += bytes(len(groups[tag]) for tag in AGENT_TAGS)
+    record += bytes(v for p in positions for v in p).ljust(2 * max_agents, b"\0")
+    return bytes(record)
+
+
+def write_pack(pack_file, levels):
+    """
+    Ghi file pack từ [(tên, các dòng maze, các dòng agents)], giữ nguyên thứ tự.
+    Ghi ra file tạm rồi đổi tên, nên BinaryPack đang mở file cũ không đọc phải file ghi dở.
+    """
+    levels = [(name, [line.rstrip("\n") for line in maze], _parse_agents(agents)) for name, maze, agents in levels]
+    rows = max([len(maze) for _, maze, _ in levels] or [0])
+    cols = max([len(line) for _, maze, _ in levels for line in maze] or [0])
+    max_agents = max([sum(len(p) for p in groups.values()) for _, _, groups in levels] or [0])
+    if rows > 255 or cols > 255:
+        raise ValueError("maze larger than 255x255")
+    header = HEADER.pack(MAGIC, VERSION, rows, cols, max_agents, NAME_SIZE, len(levels))
+    tmp_file = pack_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        f.write(header)
+        for name, _, _ in levels:
+            encoded = name.encode("utf-8")
+            if len(encoded) > NAME_SIZE or b"\0" in encoded:
+                raise ValueError("invalid level name for pack: {!r}".format(name))
+            f.write(encoded.ljust(NAME_SIZE, b"\0"))
+        for name, maze, groups in levels:
+            if any(x > 255 or y > 255 for p in groups.values() for x, y in p):
+                raise ValueError("agent outside the maze in {}".format(name))
+            f.write(_encode(maze, groups, rows, cols, max_agents))
+    os.replace(tmp_file, pack_file)
+    return len(levels)
+
+
+class BinaryPack:
+    """
+    File pack nhị phân mở bằng mmap (chỉ đọc). Level được chọn theo tên hoặc theo thứ tự trong pack.
+    Bảng tên -> thứ tự được dựng 1 lần khi mở; mỗi lần đọc level chỉ chạm tới đúng bản ghi của nó.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # File rỗng
+            self._file.close()
+            raise ValueError("empty pack file: {}".format(path))
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError("not a binary level pack: {}".format(path))
+        magic, version, self.rows, self.cols, self.max_agents, name_size, self.count = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError("not a binary level pack: {}".format(path))
+        self.record_size = _record_size(self.rows, self.cols, self.max_agents)
+        self._records = HEADER.size + self.count * name_size
+        if len(self._map) < self._records + self.count * self.record_size:
+            self.close()
+            raise ValueError("truncated pack file: {}".format(path))
+        self.names = [bytes(self._map[HEADER.size + i * name_size:HEADER.size + (i + 1) * name_size])
+                      .rstrip(b"\0").decode("utf-8") for i in range(self.count)]
+        self._index = {name: i for i, name in reversed(list(enumerate(self.names)))}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, name):
+        return name in self._index
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+            self._map = None
+
+    def _decode(self, key):
+        # (các dòng maze dạng list ký tự, {tag: [vị trí]}) của level `key` (tên hoặc thứ tự)
+        i = self._index[key] if isinstance(key, str) else key
+        if not 0 <= i < self.count: raise IndexError(key)
+        offset = self._records + i * self.record_size
+        record = self._map[offset:offset + self.record_size]
+        num_rows = record[0]
+        lengths = record[1:1 + num_rows]
+        pos = 1 + self.rows
+        size = _bitset_size(self.rows, self.cols)
+        maze = [[' '] * n for n in lengths]
+        for ch in CELL_CHARS:
+            value = int.from_bytes(record[pos:pos + size], "little")
+            pos += size
+            while value:
+                low = value & -value
+                r, c = divmod(low.bit_length() - 1, self.cols)
+                maze[r][c] = ch
+                value ^= low
+        counts = record[pos:pos + len(AGENT_TAGS)]
+        pos += len(AGENT_TAGS)
+        groups = {}
+        for tag, n in zip(AGENT_TAGS, counts):
+            groups[tag] = [(record[pos + 2 * k], record[pos + 2 * k + 1]) for k in range(n)]
+            pos += 2 * n
+        return maze, groups
+
+    def lines(self, key):
+        """(các dòng maze, các dòng agents) của level như trong map/maze + map/agents."""
+        maze, groups = self._decode(key)
+        agents = ["{} {} {}".format(tag, x, y) for tag in AGENT_TAGS for x, y in groups[tag]]
+        return ["".join(row) for row in maze], agents
+
+    def level(self, key):
+        """Level dạng dict như engine.read_level."""
+        maze, groups = self._decode(key)
+        name = key if isinstance(key, str) else self.names[key]
+        level = {"name": name, "maze": maze, "stair_position": (), "key_position": (), "gate_position": (),
+                 "trap_position": [], "explorer": groups["E"][-1] if groups["E"] else None}
+        for tag in AGENT_TAGS[1:]:
+            level[tag.lower()] = groups[tag]
+        for i, row in enumerate(maze):
+            for j, c in enumerate(row):
+                if c == 'S': level["stair_position"] = (i, j)
+                if c == 'T': level["trap_position"].append((i, j))
+                if c == 'K': level["key_position"] = (i, j)
+                if c == 'G': level["gate_position"] = (i, j)
+        return level
+
+
+# Pack đang mở, theo đường dẫn: (mtime_ns, kích thước, BinaryPack); mở lại khi file đổi
+_open_packs = {}
+
+
+def open_pack(path):
+    """BinaryPack của `path`, dùng lại bản đã mở nếu file chưa đổi từ lần trước."""
+    stat = os.stat(path)
+    cached = _open_packs.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    pack = BinaryPack(path)
+    if cached is not None: cached[2].close()
+    _open_packs[path] = (stat.st_mtime_ns, stat.st_size, pack)
+    return pack
+
+
+# --- CHUYỂN ĐỔI ---
+def pack_dirs(pack_file, maze_dir=maze_path, agents_dir=object_path, names=None):
+    """Gom mọi level *.txt (hoặc `names`) trong maze_dir + agents_dir vào 1 file pack; trả về số level."""
+    if names is None:
+        names = sorted(f for f in os.listdir(maze_dir) if f.endswith(".txt"))
+    levels = []
+    for name in names:
+        with open(os.path.join(maze_dir, name), "r") as f:
+            maze = f.read().splitlines()
+        agents = []
+        agent_file = os.path.join(agents_dir, name)
+        if os.path.exists(agent_file):
+            with open(agent_file, "r") as f:
+                agents = f.read().splitlines()
+        levels.append((name, maze, agents))
+    return write_pack(pack_file, levels)
+
+
+def unpack_dirs(pack_file, maze_dir=maze_path, agents_dir=object_path):
+    """Ghi mỗi level trong pack thành maze_dir/<tên> + agents_dir/<tên>; trả về số level."""
+    os.makedirs(maze_dir, exist_ok=True)
+    os.makedirs(agents_dir, exist_ok=True)
+    with BinaryPack(pack_file) as pack:
+        for name in pack.names:
+            maze, agents = pack.lines(name)
+            with open(os.path.join(maze_dir, name), "w") as f:
+                f.write("\n".join(maze) + "\n")
+            with open(os.path.join(agents_dir, name), "w") as f:
+                f.write("\n".join(agents) + "\n")
+        return len(pack)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chuyển level giữa map/maze + map/agents và file pack nhị phân")
+    parser.add_argument("command", choices=("pack", "unpack"))
+    parser.add_argument("pack_file", help="File pack (" + PACK_EXT + ")")
+    parser.add_argument("--maze", default=maze_path, help="Thư mục maze (mặc định: map/maze)")
+    parser.add_argument("--agents", help="Thư mục agents (mặc định: thư mục agents cạnh thư mục maze)")
+    parser.add_argument("names", nargs="*", help="pack: chỉ gom các level này (mặc định: mọi *.txt)")
+    args = parser.parse_args()
+
+    agents_dir = args.agents or os.path.join(os.path.dirname(os.path.abspath(args.maze)), "agents")
+    try:
+        if args.command == "pack":
+            count = pack_dirs(args.pack_file, args.maze, agents_dir, args.names or None)
+        else:
+            count = unpack_dirs(args.pack_file, args.maze, agents_dir)
+    except (OSError, ValueError) as e:
+        print("Error: {}".format(e), file=sys.stderr)
+        sys.exit(1)
+    print("{} {} levels: {}".format(args.command, count, args.pack_file), file=sys.stderr)
@@ -1,48 +1,8 @@
 import graphics
 import pygame
-from collections import deque
 import random
-
-# --- THUẬT TOÁN TÌM ĐƯỜNG (BFS) ---
-def bfs_find_next_step(start_pos, target_pos, maze, gate):
-    # start_pos, target_pos: tuple (row, col)
-    rows = len(maze)
-    cols = len(maze[0])
-    if start_pos == target_pos: return start_pos
-
-    queue = deque([ [start_pos] ])
-    visited = {start_pos}
-
-    while queue:
-        path = queue.popleft()
-        current_node = path[-1]
-        cx, cy = current_node
-
-        if (cx, cy) == target_pos:
-            return path[1] if len(path) > 1 else target_pos
-
-        moves = [(-2, 0), (2, 0), (0, -2), (0, 2)]
-        
-        for dx, dy in moves:
-            nx, ny = cx + dx, cy + dy
-            if 0 <= nx < rows and 0 <= ny < cols:
-                blocked = False
-                if dx == 2: # Down
-                    if maze[cx+1][cy] == "%" or (maze[cx+1][cy] == "G" and gate["isClosed"]): blocked = True
-                elif dx == -2: # Up
-                    if maze[cx-1][cy] == "%" or (maze[cx-1][cy] == "G" and gate["isClosed"]): blocked = True
-                elif dy == 2: # Right
-                    if maze[cx][cy+1] == "%": blocked = True
-                elif dy == -2: # Left
-                    if maze[cx][cy-1] == "%": blocked = True
-                
-                if not blocked and (nx, ny) not in visited:
-                    visited.add((nx, ny))
-                    new_path = list(path)
-                    new_path.append((nx, ny))
-                    queue.append(new_path)
-    
-    return start_pos 
+# Tìm đường + đi tuần nằm trong engine (không cần pygame)
+from engine import bfs_find_next_step, stair_guard_position, patrol_index
 
 # --- BASE CLASSES ---
 class character:
@@ -92,7 +52,7 @@ class Explorer(character):
         explorer_start_x = game.coordinate_screen_x + game.cell_rect * (self.y // 2)
         explorer_start_y = game.coordinate_screen_y + game.cell_rect * (self.x // 2)
         if game.maze[x - 1][y] == "%" or game.maze[x - 1][y] == "G":
-            explorer_start_y += 3
+            explorer_start_y += game.sprite_shift
         explorer["coordinates"] = [explorer_start_x, explorer_start_y]
         step_stride = game.cell_rect // 5
         coordinates = list(explorer["coordinates"])
@@ -100,10 +60,12 @@ class Explorer(character):
         for i in range(6):
             pygame.event.pump()
             if i < 5:
-                if explorer["direction"] == "UP": coordinates[1] -= step_stride
-                if explorer["direction"] == "DOWN": coordinates[1] += step_stride
-                if explorer["direction"] == "LEFT": coordinates[0] -= step_stride
-                if explorer["direction"] == "RIGHT": coordinates[0] += step_stride
+                # Bước cuối bù phần dư để 5 bước đi đúng 1 ô
+                stride = step_stride + (game.cell_rect % 5 if i == 4 else 0)
+                if explorer["direction"] == "UP": coordinates[1] -= stride
+                if explorer["direction"] == "DOWN": coordinates[1] += stride
+                if explorer["direction"] == "LEFT": coordinates[0] -= stride
+                if explorer["direction"] == "RIGHT": coordinates[0] += stride
             explorer["coordinates"] = list(coordinates)
             explorer["cellIndex"] = i % 5
             graphics.draw_screen(screen, game.maze, backdrop, floor, game.maze_size, game.cell_rect, stair, stair_position,
@@ -117,11 +79,15 @@ class enemy(character):
         self.attempt = 0
         self.step_count = 0
         self.difficulty = difficulty 
+        self.patrol_seed = None  # None = đi tuần ngẫu nhiên theo module random
         super().__init__(x, y)
 
     def set_difficulty(self, diff):
         self.difficulty = diff
 
+    def set_patrol_seed(self, seed):
+        self.patrol_seed = seed
+
     # --- LOGIC ĐIỀU KHIỂN ---
     def ai_move(self, maze, gate, explorer, is_horizontal_first):
         
@@ -135,22 +101,8 @@ class enemy(character):
 
         # HARD (ZONE DEFENSE + PATROL)
         elif self.difficulty == 3:
-            s_pos = None
-            for r in range(len(maze)):
-                for c in range(len(maze[0])):
-                    if maze[r][c] == 'S':
-                        s_pos = (r, c); break
-                if s_pos: break
-            
-            target_pos = None
-            if s_pos:
-                neighbors = [(s_pos[0]+1, s_pos[1]), (s_pos[0]-1, s_pos[1]), 
-                             (s_pos[0], s_pos[1]+1), (s_pos[0], s_pos[1]-1)]
-                for nr, nc in neighbors:
-                    if 0 <= nr < len(maze) and 0 <= nc < len(maze[0]):
-                        if maze[nr][nc] != '%': 
-                             target_pos = (nr, nc); break
-            
+            target_pos = stair_guard_position(maze)
+
             dist_to_player = abs(self.x - explorer.x) + abs(self.y - explorer.y)
             
             # Tấn công nếu người chơi gần
@@ -178,7 +130,11 @@ class enemy(character):
                     
                     # Chọn ngẫu nhiên 1 ô để bước sang (giả vờ đi tuần)
                     if valid_moves:
-                        choice = random.choice(valid_moves)
+                        if self.patrol_seed is None:
+                            choice = random.choice(valid_moves)
+                        else:
+                            choice = valid_moves[patrol_index(self.patrol_seed, self.x, self.y,
+                                                              explorer.x, explorer.y, len(valid_moves))]
                         self.move_xy(choice[0], choice[1])
                         self.step_count += 1
                         
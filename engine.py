@@ -0,0 +1,570 @@
+"""
+Luật chơi của một lượt, không phụ thuộc pygame: dùng chung cho solver (search.py),
+giao diện đồ họa (main.update_enemy_position) và chế độ ASCII (ascii_game.py).
+
+    level = engine.PackedLevel(maze, key_position, trap_positions, difficulty, patrol_seed)
+    state = level.encode(explorer, mw, mr, sw, sr, gate_closed)
+    state, outcome = level.step(state, engine.UP)   # outcome: PLAYING / WIN / LOSE / BLOCKED
+"""
+from array import array
+from collections import deque
+import os
+import zlib
+
+# --- THUẬT TOÁN TÌM ĐƯỜNG (BFS) ---
+MOVES = [(-2, 0), (2, 0), (0, -2), (0, 2)]  # LÊN, XUỐNG, TRÁI, PHẢI (thứ tự ưu tiên khi hòa)
+MAX_CACHED_MAZES = 8
+
+# id(maze) -> (maze, {(gate đóng?, ô đích): {ô: số bước tới đích}, "stair": ô canh cửa})
+# Giữ luôn tham chiếu tới maze để id không bị tái sử dụng khi còn trong cache
+_distance_fields = {}
+
+def _maze_cache(maze):
+    entry = _distance_fields.get(id(maze))
+    if entry is None or entry[0] is not maze:
+        if len(_distance_fields) >= MAX_CACHED_MAZES:
+            del _distance_fields[next(iter(_distance_fields))]
+        entry = (maze, {})
+        _distance_fields[id(maze)] = entry
+    return entry[1]
+
+def _can_step(maze, is_closed, cx, cy, dx, dy):
+    nx, ny = cx + dx, cy + dy
+    if not (0 <= nx < len(maze) and 0 <= ny < len(maze[0])): return False
+    # Dòng ngắn hơn maze[0] (map lỗi) -> coi như tường
+    row = maze[cx + dx // 2]
+    wall_y = cy + dy // 2
+    if wall_y >= len(row) or row[wall_y] == "%": return False
+    return not (dx != 0 and row[wall_y] == "G" and is_closed) # Cổng chỉ chặn LÊN / XUỐNG
+
+def distance_field(maze, target_pos, is_closed):
+    """Số bước từ mọi ô tới target_pos (BFS ngược từ đích), tính 1 lần cho mỗi (maze, cổng, đích)."""
+    cache = _maze_cache(maze)
+    key = (is_closed, target_pos)
+    dist = cache.get(key)
+    if dist is None:
+        # Đường đi giữa 2 ô kề nhau là đối xứng nên BFS từ đích cho khoảng cách từ mọi ô
+        dist = {target_pos: 0}
+        queue = deque([target_pos])
+        while queue:
+            cx, cy = queue.popleft()
+            for dx, dy in MOVES:
+                nxt = (cx + dx, cy + dy)
+                if nxt not in dist and _can_step(maze, is_closed, cx, cy, dx, dy):
+                    dist[nxt] = dist[(cx, cy)] + 1
+                    queue.append(nxt)
+        cache[key] = dist
+    return dist
+
+def stair_guard_position(maze):
+    """Ô quái canh ở độ khó HARD: ô đầu tiên không phải tường cạnh cầu thang 'S' đầu tiên (None nếu không có)."""
+    cache = _maze_cache(maze)
+    if "stair" not in cache:
+        s_pos = None
+        for r in range(len(maze)):
+            for c in range(len(maze[0])):
+                if c < len(maze[r]) and maze[r][c] == 'S':
+                    s_pos = (r, c); break
+            if s_pos: break
+
+        target_pos = None
+        if s_pos:
+            neighbors = [(s_pos[0]+1, s_pos[1]), (s_pos[0]-1, s_pos[1]),
+                         (s_pos[0], s_pos[1]+1), (s_pos[0], s_pos[1]-1)]
+            for nr, nc in neighbors:
+                if 0 <= nr < len(maze) and 0 <= nc < len(maze[0]) and nc < len(maze[nr]):
+                    if maze[nr][nc] != '%':
+                        target_pos = (nr, nc); break
+        cache["stair"] = target_pos
+    return cache["stair"]
+
+def clear_distance_fields():
+    _distance_fields.clear()
+
+def bfs_find_next_step(start_pos, target_pos, maze, gate):
+    # start_pos, target_pos: tuple (row, col)
+    if start_pos == target_pos: return start_pos
+    is_closed = bool(gate["isClosed"])
+    dist = distance_field(maze, target_pos, is_closed)
+    d = dist.get(start_pos)
+    if not d: return start_pos # Không tới được đích
+
+    # Bước đầu của đường ngắn nhất mà BFS cũ (duyệt LÊN, XUỐNG, TRÁI, PHẢI) trả về:
+    # hướng đầu tiên theo thứ tự đó dẫn tới ô gần đích hơn 1 bước
+    cx, cy = start_pos
+    for dx, dy in MOVES:
+        nxt = (cx + dx, cy + dy)
+        if dist.get(nxt) == d - 1 and _can_step(maze, is_closed, cx, cy, dx, dy):
+            return nxt
+    return start_pos
+
+# --- ĐI TUẦN CÓ SEED ---
+def patrol_index(seed, x, y, explorer_x, explorer_y, count):
+    # Chọn ô đi tuần chỉ phụ thuộc (seed, vị trí quái, vị trí người chơi) -> solver mô phỏng lại được
+    h = (seed * 1000003) ^ (x * 7919) ^ (y * 104729) ^ (explorer_x * 15485863) ^ (explorer_y * 32452843)
+    return (h & 0x7FFFFFFF) % count
+
+def level_patrol_seed(layout):
+    # Seed cố định theo tên level (không phụ thuộc thư mục) -> cùng level thì quái đi tuần giống nhau
+    return zlib.crc32(os.path.basename(layout).encode())
+
+# --- ĐỌC LEVEL (không cần pygame) ---
+def read_level(maze_file, agent_file=None):
+    """
+    Đọc maze + agents giống GameState: trả dict gồm maze, vị trí cầu thang / chìa khóa / cổng,
+    danh sách bẫy, vị trí explorer và 4 nhóm quái (mw, mr, sw, sr). agent_file mặc định là
+    file cùng tên trong thư mục agents cạnh thư mục maze.
+    """
+    if agent_file is None:
+        maze_dir, name = os.path.split(maze_file)
+        agent_file = os.path.join(os.path.dirname(maze_dir), "agents", name)
+    with open(maze_file, "r") as file:
+        maze_lines = file.readlines()
+    agent_lines = []
+    if os.path.exists(agent_file):
+        with open(agent_file, "r") as file:
+            agent_lines = file.readlines()
+    return parse_level(os.path.basename(maze_file), maze_lines, agent_lines)
+
+def parse_level(name, maze_lines, agent_lines):
+    """Như read_level nhưng từ các dòng đã đọc sẵn (vd. level trong file pack)."""
+    level = {"name": name, "maze": [], "stair_position": (), "key_position": (),
+             "gate_position": (), "trap_position": [], "explorer": None, "mw": [], "mr": [], "sw": [], "sr": []}
+    for line in maze_lines: level["maze"].append([c for c in line if c != '\n'])
+    for i in range(len(level["maze"])):
+        for j in range(len(level["maze"][i])):
+            c = level["maze"][i][j]
+            if c == 'S': level["stair_position"] = (i, j)
+            if c == 'T': level["trap_position"].append((i, j))
+            if c == 'K': level["key_position"] = (i, j)
+            if c == 'G': level["gate_position"] = (i, j)
+
+    for line in agent_lines:
+        x = line.split()
+        if not x: continue
+        if x[0] == 'E':
+            level["explorer"] = (int(x[1]), int(x[2]))
+        elif x[0] in ("MW", "MR", "SW", "SR"):
+            level[x[0].lower()].append((int(x[1]), int(x[2])))
+    return level
+
+def compile_level(level, difficulty=1, patrol_seed=None):
+    """(PackedLevel, trạng thái bắt đầu) cho level đọc bằng read_level; cổng đóng sẵn như trong rungame."""
+    if patrol_seed is None:
+        patrol_seed = level_patrol_seed(level["name"])
+    packed = PackedLevel(level["maze"], level["key_position"], level["trap_position"], difficulty, patrol_seed)
+    start = packed.encode(packed.cell(*level["explorer"]),
+                          *[[packed.cell(*p) for p in level[group]] for group in ("mw", "mr", "sw", "sr")],
+                          bool(level["gate_position"]))
+    return packed, start
+
+# Tăng mỗi khi luật của 1 lượt thay đổi: lời giải đã lưu (solution_cache) sẽ bị bỏ
+RULES_VERSION = 1
+
+# Các hành động của explorer theo thứ tự BFS luôn thử; None = đứng yên
+UP, DOWN, LEFT, RIGHT = 0, 1, 2, 3
+ACTIONS = (UP, DOWN, LEFT, RIGHT, None)
+DIRECTIONS = ((-2, 0), (2, 0), (0, -2), (0, 2))
+
+# Kết quả của 1 lượt (cùng chuỗi mà main.update_enemy_position vẫn trả về);
+# BLOCKED = explorer không đi được hướng đó, không có lượt nào được chơi
+PLAYING, WIN, LOSE, BLOCKED = "PLAYING", "WIN", "LOSE", "BLOCKED"
+
+# Các nhóm quái theo thứ tự di chuyển, là chỉ số trong (mw, mr, sw, sr)
+MUMMY_WHITE, MUMMY_RED, SCORPION_WHITE, SCORPION_RED = 0, 1, 2, 3
+
+# Sự kiện PackedLevel.turn(..., events) ghi lại để giao diện diễn lại 1 lượt:
+#   (GATE, closed)                 cổng đổi trạng thái vì có ai đứng lên chìa khóa
+#   (MOVE, group, before, after)   1 nhóm quái đã đi; before / after là danh sách ô
+#   (REMOVE, group, index)         group[index] bị xóa (trùng ô với quái mạnh hơn)
+#   (PHASE_END, phase)             hết lần đi thứ nhất (1) hoặc thứ hai (2) của quái
+GATE, MOVE, REMOVE, PHASE_END = "GATE", "MOVE", "REMOVE", "PHASE_END"
+
+# Quái trùng ô sau mỗi lần đi: cùng loại thì giữ 1 con, khác loại thì loại mạnh hơn thắng
+# (mummy trắng > mummy đỏ > bọ cạp trắng > bọ cạp đỏ). Lần đi thứ hai chỉ có mummy đi,
+# nên không xét lại bọ cạp với nhau.
+FIRST_COLLISIONS = ((MUMMY_WHITE, MUMMY_RED, SCORPION_WHITE, SCORPION_RED),
+                    ((0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)))
+SECOND_COLLISIONS = ((MUMMY_WHITE, MUMMY_RED),
+                     ((0, 1), (0, 2), (0, 3), (1, 2), (1, 3)))
+
+def positions_list(positions):
+    # Nhận 1 vị trí (x, y), danh sách (x, y) hoặc giá trị rỗng
+    if not positions:
+        return []
+    if isinstance(positions[0], int):
+        return [tuple(positions)]
+    return [tuple(p) for p in positions]
+
+def _remove_same_cells(group, removed=None):
+    # Cùng thứ tự xóa như update_list_character cũ (mốc --alloc trong benchmark.py), trên ô đã pack
+    # (dừng thay vì IndexError khi 1 lần xóa làm group[i] bị dời đi);
+    # chỉ số của mỗi lần xóa được thêm vào `removed` nếu có
+    i = 0
+    while i < len(group):
+        j = 0
+        while j < len(group) and i < len(group):
+            if j != i and group[i] == group[j]:
+                del group[j]
+                if removed is not None: removed.append(j)
+            j += 1
+        i += 1
+
+def _remove_overlap(strong_group, weak_group, removed=None):
+    # Cùng thứ tự xóa như update_lists_character cũ (mốc --alloc trong benchmark.py), trên ô đã pack
+    for i in range(len(strong_group)):
+        j = 0
+        while j < len(weak_group):
+            if strong_group[i] == weak_group[j]:
+                del weak_group[j]
+                if removed is not None: removed.append(j)
+            j += 1
+
+class PackedLevel:
+    """
+    Maze được compile 1 lần cho mỗi level để chơi các lượt mà không cần object characters.
+
+    1 ô là số nguyên x * cols + y. 1 state là 1 số nguyên gồm, từ bit thấp lên:
+    gate_closed (1 bit), ô của explorer, rồi với mummy_white, mummy_red, scorpion_white
+    và scorpion_red: số quái trong nhóm, tiếp theo là các ô của nhóm theo thứ tự danh sách.
+    """
+    COUNT_BITS = 6
+
+    def __init__(self, maze, key_position, trap_position, difficulty=1, patrol_seed=0):
+        self.maze = maze
+        self.difficulty = difficulty
+        self.patrol_seed = patrol_seed
+        self.rows = len(maze)
+        self.cols = len(maze[0])
+        size = self.rows * self.cols
+        self.bits = size.bit_length()
+        self.mask = (1 << self.bits) - 1
+        self.row = [c // self.cols for c in range(size)]
+        self.col = [c % self.cols for c in range(size)]
+        # Nhân vật chỉ đứng ở phòng (x lẻ, y lẻ); room[ô] đánh số các phòng theo từng hàng
+        self.room_rows, self.room_cols = self.rows // 2, self.cols // 2
+        self.rooms = self.room_rows * self.room_cols
+        self.room = [(r // 2) * self.room_cols + c // 2 if r % 2 and c % 2 else -1
+                     for r, c in zip(self.row, self.col)]
+
+        # moves[gate_closed][ô * 4 + hướng] -> ô kế tiếp, hoặc -1 nếu bị chặn
+        # (cùng luật với character.eligible_character_move)
+        self.moves = ([-1] * (size * 4), [-1] * (size * 4))
+        for closed in (0, 1):
+            table = self.moves[closed]
+            for x in range(1, self.rows, 2):
+                for y in range(1, self.cols, 2):
+                    for d, (dx, dy) in enumerate(DIRECTIONS):
+                        if _can_step(maze, closed, x, y, dx, dy):
+                            table[(x * self.cols + y) * 4 + d] = (x + dx) * self.cols + y + dy
+
+        # Tới ô cạnh cầu thang là qua màn
+        self.is_exit = [False] * size
+        for x in range(1, self.rows - 1, 2):
+            for y in range(1, self.cols - 1, 2):
+                for dx, dy in DIRECTIONS:
+                    if y + dy // 2 < len(maze[x + dx // 2]) and maze[x + dx // 2][y + dy // 2] == "S":
+                        self.is_exit[x * self.cols + y] = True
+
+        self.key = self.cell(*key_position) if key_position else -1
+        self.traps = frozenset(self.cell(x, y) for x, y in positions_list(trap_position))
+        self._exit_distance = None
+        self._distance_fields = ({}, {})
+        # Ô mà enemy.ai_move (độ khó 3) canh giữ
+        stair = stair_guard_position(maze)
+        self.stair_target = self.cell(*stair) if stair else -1
+        self.enemy_move = {1: self.greedy_move, 2: self.chase_move, 3: self.zone_move}.get(difficulty, self.stay)
+        # greedy_tables[gate_closed][horizontal_first]: xem greedy_table()
+        self.greedy_tables = None
+        if difficulty == 1:
+            self.greedy_tables = tuple((self.greedy_table(closed, False), self.greedy_table(closed, True))
+                                       for closed in (0, 1))
+
+    def distance_field(self, target, closed):
+        """Số bước từ mọi ô tới `target` với cổng ở trạng thái đã cho (-1 nếu không tới được), có cache."""
+        fields = self._distance_fields[closed]
+        dist = fields.get(target)
+        if dist is None:
+            moves = self.moves[closed]
+            dist = [-1] * len(self.row)
+            dist[target] = 0
+            frontier = [target]
+            for c in frontier:
+                for d in (UP, DOWN, LEFT, RIGHT):
+                    nxt = moves[c * 4 + d]
+                    if nxt >= 0 and dist[nxt] < 0:
+                        dist[nxt] = dist[c] + 1
+                        frontier.append(nxt)
+            fields[target] = dist
+        return dist
+
+    def exit_distance(self):
+        """
+        Số bước của explorer từ mọi ô tới ô cạnh cầu thang gần nhất (-1 nếu không tới được),
+        bỏ qua quái và coi cổng luôn mở, nên không bao giờ đánh giá quá.
+        Tính ở lần dùng đầu tiên và giữ suốt đời của level.
+        """
+        if self._exit_distance is None:
+            moves = self.moves[0]
+            dist = [-1] * len(self.is_exit)
+            frontier = [c for c in range(len(self.is_exit)) if self.is_exit[c]]
+            for c in frontier:
+                dist[c] = 0
+            for c in frontier:
+                for d in (UP, DOWN, LEFT, RIGHT):
+                    nxt = moves[c * 4 + d]
+                    if nxt >= 0 and dist[nxt] < 0:
+                        dist[nxt] = dist[c] + 1
+                        frontier.append(nxt)
+            self._exit_distance = dist
+        return self._exit_distance
+
+    def cell(self, x, y):
+        return x * self.cols + y
+
+    def position(self, cell):
+        return [self.row[cell], self.col[cell]]
+
+    def encode(self, explorer, mw, mr, sw, sr, closed):
+        bits, count_bits = self.bits, PackedLevel.COUNT_BITS
+        state = (1 if closed else 0) | (explorer << 1)
+        shift = 1 + bits
+        for group in (mw, mr, sw, sr):
+            if len(group) >> count_bits:
+                raise ValueError("Too many enemies of one type to pack: {}".format(len(group)))
+            state |= len(group) << shift
+            shift += count_bits
+            for c in group:
+                state |= c << shift
+                shift += bits
+        return state
+
+    def decode(self, state):
+        """Trả về (explorer, mw, mr, sw, sr, gate_closed), mỗi nhóm quái là 1 list mới."""
+        bits, mask = self.bits, self.mask
+        count_bits, count_mask = PackedLevel.COUNT_BITS, (1 << PackedLevel.COUNT_BITS) - 1
+        closed = state & 1
+        state >>= 1
+        explorer = state & mask
+        state >>= bits
+        groups = []
+        for _ in range(4):
+            n = state & count_mask
+            state >>= count_bits
+            group = []
+            for _ in range(n):
+                group.append(state & mask)
+                state >>= bits
+            groups.append(group)
+        return explorer, groups[0], groups[1], groups[2], groups[3], closed
+
+    def explorer_cell(self, state):
+        return (state >> 1) & self.mask
+
+    def explorer_position(self, state):
+        return self.position((state >> 1) & self.mask)
+
+    def pack(self, explorer, mummy_white, mummy_red, scorpion_white, scorpion_red, gate):
+        """State đã pack từ các object characters và dict gate."""
+        return self.encode(self.cell(explorer.get_x(), explorer.get_y()),
+                           [self.cell(c.get_x(), c.get_y()) for c in mummy_white],
+                           [self.cell(c.get_x(), c.get_y()) for c in mummy_red],
+                           [self.cell(c.get_x(), c.get_y()) for c in scorpion_white],
+                           [self.cell(c.get_x(), c.get_y()) for c in scorpion_red],
+                           gate["isClosed"])
+
+    def greedy_move(self, cell, target, closed, horizontal_first):
+        # enemy.move_greedy (độ khó 1) trên ô đã pack
+        row, col = self.row, self.col
+        return self._greedy_step(cell, (row[target] > row[cell]) - (row[target] < row[cell]),
+                                 (col[target] > col[cell]) - (col[target] < col[cell]), closed, horizontal_first)
+
+    def _greedy_step(self, cell, row_sign, col_sign, closed, horizontal_first):
+        # Bước greedy chỉ phụ thuộc explorer ở phía nào của quái (dấu của hiệu hàng / cột)
+        moves = self.moves[closed]
+        vertical = (DOWN if row_sign > 0 else UP) if row_sign else None
+        horizontal = (RIGHT if col_sign > 0 else LEFT) if col_sign else None
+        for direction in ((horizontal, vertical) if horizontal_first else (vertical, horizontal)):
+            if direction is not None:
+                nxt = moves[cell * 4 + direction]
+                if nxt >= 0: return nxt
+        return cell
+
+    def greedy_table(self, closed, horizontal_first):
+        """
+        greedy_move cho mọi cặp (phòng của quái, phòng của explorer) trong 1 mảng phẳng:
+        table[room[quái] * rooms + room[explorer]] là ô kế tiếp của quái.
+        Dựng theo từng dải: trong 1 hàng phòng ở trên / ngang / dưới quái, phía của explorer so với
+        quái, và do đó bước đi, chỉ đổi tại cột của quái.
+        """
+        typecode = "H" if self.rows * self.cols <= 0xFFFF else "I"
+        table = array(typecode)
+        room_rows, room_cols = self.room_rows, self.room_cols
+        for enemy_row in range(room_rows):
+            for enemy_col in range(room_cols):
+                cell = self.cell(2 * enemy_row + 1, 2 * enemy_col + 1)
+
+                def band(row_sign):
+                    left, same, right = (self._greedy_step(cell, row_sign, col_sign, closed, horizontal_first)
+                                         for col_sign in (-1, 0, 1))
+                    return (array(typecode, (left,)) * enemy_col + array(typecode, (same,))
+                            + array(typecode, (right,)) * (room_cols - enemy_col - 1))
+
+                table.extend(band(-1) * enemy_row)
+                table.extend(band(0))
+                table.extend(band(1) * (room_rows - enemy_row - 1))
+        return table
+
+    def chase_move(self, cell, target, closed, horizontal_first=None):
+        """
+        enemy.move_smart_bfs (độ khó 2) trên ô đã pack. bfs_find_next_step trả về bước đầu của
+        đường ngắn nhất có các hướng (UP, DOWN, LEFT, RIGHT) xếp trước, tức là ô kề đầu tiên,
+        theo thứ tự đó, gần đích hơn 1 bước.
+        """
+        if cell == target:
+            return cell
+        dist = self.distance_field(target, closed)
+        d = dist[cell]
+        if d <= 0:
+            return cell
+        moves = self.moves[closed]
+        for direction in (UP, DOWN, LEFT, RIGHT):
+            nxt = moves[cell * 4 + direction]
+            if nxt >= 0 and dist[nxt] == d - 1:
+                return nxt
+        return cell
+
+    def zone_move(self, cell, target, closed, horizontal_first=None):
+        # enemy.ai_move độ khó 3 trên ô đã pack: ở gần thì đuổi, không thì canh cầu thang, không nữa thì đi tuần
+        if cell == target:
+            return cell
+        row, col = self.row, self.col
+        if self.stair_target < 0 or abs(row[cell] - row[target]) + abs(col[cell] - col[target]) <= 6:
+            return self.chase_move(cell, target, closed)
+        nxt = self.chase_move(cell, self.stair_target, closed)
+        if nxt != cell:
+            return nxt
+        moves = self.moves[closed]
+        valid_moves = [moves[cell * 4 + d] for d in (UP, DOWN, LEFT, RIGHT) if moves[cell * 4 + d] >= 0]
+        if valid_moves:
+            return valid_moves[patrol_index(self.patrol_seed, row[cell], col[cell], row[target], col[target],
+                                            len(valid_moves))]
+        return cell
+
+    def stay(self, cell, target, closed, horizontal_first=None):
+        # enemy.ai_move không di chuyển với độ khó không xác định
+        return cell
+
+    def _move_group(self, groups, index, explorer, closed, events):
+        # Quái trắng (mw, sw) thử đi ngang trước, quái đỏ (mr, sr) thử đi dọc trước
+        group = groups[index]
+        before = group[:] if events is not None else None
+        horizontal_first = index % 2 == 0
+        if self.greedy_tables is not None:
+            # Độ khó 1: mỗi quái chỉ đọc 1 lần từ bảng đã tính sẵn
+            table, room, rooms, target = self.greedy_tables[closed][horizontal_first], self.room, self.rooms, \
+                self.room[explorer]
+            for i in range(len(group)):
+                group[i] = table[room[group[i]] * rooms + target]
+        else:
+            move = self.enemy_move
+            for i in range(len(group)):
+                group[i] = move(group[i], explorer, closed, horizontal_first)
+        if events is not None:
+            events.append((MOVE, index, before, group[:]))
+        if self.key >= 0:
+            for c in group:
+                if c == self.key:
+                    closed = 1 - closed
+                    if events is not None: events.append((GATE, closed))
+        return closed
+
+    def _remove_collisions(self, groups, collisions, events):
+        same_type, overlaps = collisions
+        removed = [] if events is not None else None
+        for index in same_type:
+            _remove_same_cells(groups[index], removed)
+            if removed:
+                events.extend((REMOVE, index, j) for j in removed)
+                del removed[:]
+        for strong, weak in overlaps:
+            _remove_overlap(groups[strong], groups[weak], removed)
+            if removed:
+                events.extend((REMOVE, weak, j) for j in removed)
+                del removed[:]
+
+    def _is_killed(self, explorer, mw, mr, sw, sr):
+        return explorer in self.traps or explorer in mw or explorer in mr or explorer in sw or explorer in sr
+
+    def turn(self, explorer, mw, mr, sw, sr, closed, events=None):
+        """
+        Chơi nửa lượt của quái khi explorer đứng ở ô `explorer`.
+        Các list nhóm quái bị sửa tại chỗ; trả về (bit cổng, explorer còn sống).
+        Nếu `events` là list, mọi lần đổi cổng, nhóm quái đi và quái bị xóa được thêm vào (xem GATE, MOVE, ...).
+        """
+        groups = (mw, mr, sw, sr)
+        if explorer == self.key:
+            closed = 1 - closed
+            if events is not None: events.append((GATE, closed))
+        # Đi vào quái hoặc bẫy: quái đứng trên ô của explorer không bao giờ đi, nên các quái khác
+        # làm gì cũng không đổi được kết quả
+        if self._is_killed(explorer, mw, mr, sw, sr):
+            return closed, False
+        # FIRST MOVE
+        for index in (MUMMY_WHITE, MUMMY_RED, SCORPION_WHITE, SCORPION_RED):
+            closed = self._move_group(groups, index, explorer, closed, events)
+        if events is not None: events.append((PHASE_END, 1))
+        if self._is_killed(explorer, mw, mr, sw, sr):
+            return closed, False
+        self._remove_collisions(groups, FIRST_COLLISIONS, events)
+        # SECOND MOVE (bọ cạp chỉ đi 1 lần)
+        closed = self._move_group(groups, MUMMY_WHITE, explorer, closed, events)
+        closed = self._move_group(groups, MUMMY_RED, explorer, closed, events)
+        if events is not None: events.append((PHASE_END, 2))
+        if self._is_killed(explorer, mw, mr, sw, sr):
+            return closed, False
+        self._remove_collisions(groups, SECOND_COLLISIONS, events)
+        return closed, True
+
+    def target_cell(self, explorer, closed, action):
+        """Ô explorer tới sau `action` (None = đứng chờ), hoặc -1 nếu bị tường / cổng đóng chặn."""
+        if action is None:
+            return explorer
+        return self.moves[closed][explorer * 4 + action]
+
+    def step(self, state, action):
+        """
+        Chơi trọn 1 lượt: explorer thực hiện `action` (UP, DOWN, LEFT, RIGHT hoặc None để đứng chờ),
+        rồi quái di chuyển. Trả về (next_state, outcome) với outcome PLAYING, WIN hoặc LOSE;
+        hành động bị chặn trả về (state, BLOCKED) và không chơi gì.
+        """
+        explorer, mw, mr, sw, sr, closed = self.decode(state)
+        target = self.target_cell(explorer, closed, action)
+        if target < 0:
+            return state, BLOCKED
+        closed, alive = self.turn(target, mw, mr, sw, sr, closed)
+        next_state = self.encode(target, mw, mr, sw, sr, closed)
+        if not alive:
+            return next_state, LOSE
+        return next_state, WIN if self.is_exit[target] else PLAYING
+
+    def successors(self, state, allow_wait=True):
+        """
+        Sinh (action, next_state) cho mọi hành động không làm explorer chết
+        (allow_wait=False: bỏ hành động đứng chờ).
+        """
+        explorer, mw, mr, sw, sr, closed = self.decode(state)
+        moves = self.moves[closed]
+        for action in ACTIONS:
+            if action is None:
+                if not allow_wait:
+                    continue
+                target = explorer
+            else:
+                target = moves[explorer * 4 + action]
+                if target < 0:
+                    continue
+            mw_tmp, mr_tmp, sw_tmp, sr_tmp = mw[:], mr[:], sw[:], sr[:]
+            closed_tmp, alive = self.turn(target, mw_tmp, mr_tmp, sw_tmp, sr_tmp, closed)
+            if alive:
+                yield action, self.encode(target, mw_tmp, mr_tmp, sw_tmp, sr_tmp, closed_tmp)
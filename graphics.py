@@ -1,9 +1,87 @@
 import pygame
 
+# Ảnh gốc trong thư mục image chỉ có cho các cỡ mê cung này; cỡ khác dùng ảnh của cỡ gần nhất (art_size),
+# phóng / thu theo sprite_scale 1 lần rồi giữ trong cache
+ART_SIZES = (6, 8, 10)
+MAZE_RECT = 360  # Cạnh vùng vẽ mê cung (pixel)
+SPRITE_SHIFT = 3  # Nhân vật đứng dưới tường ngang được vẽ thấp xuống chừng này pixel (ở tỉ lệ ảnh gốc)
+
+# Vùng cắt trong walls{size}.png: tường trái, tường phải, tường ngang, tường ngang không bóng,
+# và độ lệch (x, y) của ảnh tường so với góc ô
+WALL_RECTS = {
+    6: ([0, 0, 12, 78], [84, 0, 12, 78], [12, 0, 72, 18], [12, 0, 66, 18], (6, 12)),
+    8: ([0, 0, 12, 63], [69, 0, 12, 63], [12, 0, 57, 18], [12, 0, 51, 18], (6, 12)),
+    10: ([0, 0, 8, 48], [52, 0, 8, 48], [8, 0, 44, 12], [8, 0, 38, 12], (3, 9)),
+}
+
+_image_cache = {}
+
+
+def art_size(maze_size):
+    """Cỡ mê cung có ảnh gốc gần maze_size nhất (hòa thì lấy cỡ lớn hơn: thu nhỏ ảnh đẹp hơn phóng to)."""
+    return min(ART_SIZES, key=lambda s: (abs(s - maze_size), -s))
+
+
+def sprite_scale(maze_size, cell_rect):
+    """Tỉ lệ phóng ảnh của art_size(maze_size) để 1 ô ảnh gốc vừa 1 ô cell_rect."""
+    return cell_rect / (MAZE_RECT // art_size(maze_size))
+
+
+def _scale_surface(surface, size):
+    try:
+        return pygame.transform.smoothscale(surface, size)
+    except ValueError:  # smoothscale chỉ nhận ảnh 24 / 32 bit
+        return pygame.transform.scale(surface, size)
+
+
+def load_image(path, scale=1.0, frames=(1, 1)):
+    """
+    Ảnh `path` phóng theo `scale`, đọc từ đĩa và phóng 1 lần rồi cache. frames = (số cột, số hàng) khung hình:
+    mỗi khung được làm tròn đều nhau để các ô cắt trong sprite sheet vẫn khít.
+    """
+    key = (path, scale, frames)
+    image = _image_cache.get(key)
+    if image is None:
+        image = pygame.image.load(path)
+        if scale != 1.0:
+            cols, rows = frames
+            frame_w = max(1, round(image.get_width() / cols * scale))
+            frame_h = max(1, round(image.get_height() / rows * scale))
+            image = _scale_surface(image, (frame_w * cols, frame_h * rows))
+        _image_cache[key] = image
+    return image
+
+
+def load_floor(path, maze_size, cell_rect):
+    """
+    Sàn cho mê cung maze_size x maze_size từ floor{art_size}.jpg: ô thứ (r, c) lấy ô (r, c) của ảnh gốc
+    (lặp lại khi mê cung lớn hơn), phóng vừa cell_rect. Ghép 1 lần cho mỗi (ảnh, cỡ) rồi cache.
+    """
+    art = art_size(maze_size)
+    if maze_size == art:
+        return load_image(path)
+    key = (path, maze_size, cell_rect)
+    floor = _image_cache.get(key)
+    if floor is None:
+        source = load_image(path)
+        art_cell = MAZE_RECT // art
+        tiles = {}
+        floor = pygame.Surface((cell_rect * maze_size, cell_rect * maze_size))
+        for r in range(maze_size):
+            for c in range(maze_size):
+                tile = (r % art, c % art)
+                if tile not in tiles:
+                    area = source.subsurface((tile[1] * art_cell, tile[0] * art_cell, art_cell, art_cell))
+                    tiles[tile] = _scale_surface(area, (cell_rect, cell_rect))
+                floor.blit(tiles[tile], (c * cell_rect, r * cell_rect))
+        _image_cache[key] = floor
+    return floor
+
+
 # CLASS XỬ LÝ SPRITE NHÂN VẬT
 class character_spritesheet:
-    def __init__(self, image_spritesheet_path):
-        self.sheet = pygame.image.load(image_spritesheet_path)
+    def __init__(self, image_spritesheet_path, scale=1.0):
+        self.sheet = load_image(image_spritesheet_path, scale, (5, 4))
         self.rows = 4
         self.cols = 5
         self.totalCell = self.rows * self.cols
@@ -30,26 +108,15 @@ class character_spritesheet:
 
 # CLASS XỬ LÝ TƯỜNG (WALL)
 class wall_spritesheet:
-    def __init__(self, image_spritesheet_path, maze_size):
-        self.sheet = pygame.image.load(image_spritesheet_path)
-        self.left_wall = []
-        self.right_wall =[]
-        self.up_wall = []
-        if maze_size == 6:
-            self.left_wall = [0, 0, 12, 78]
-            self.right_wall = [84, 0, 12, 78]
-            self.up_wall = [12, 0, 72, 18]
-            self.up_wall_no_shadow = [12, 0, 66, 18]
-        elif maze_size == 8:
-            self.left_wall = [0, 0, 12, 63]
-            self.right_wall = [69, 0, 12, 63]
-            self.up_wall = [12, 0, 57, 18]
-            self.up_wall_no_shadow = [12, 0, 51, 18]
-        elif maze_size == 10:
-            self.left_wall = [0, 0, 8, 48]
-            self.right_wall = [52, 0, 8, 48]
-            self.up_wall = [8, 0, 44, 12]
-            self.up_wall_no_shadow = [8, 0, 38, 12]
+    def __init__(self, image_spritesheet_path, maze_size, scale=1.0):
+        # image_spritesheet_path: walls{art_size(maze_size)}.png; vùng cắt và độ lệch phóng theo scale
+        self.sheet = load_image(image_spritesheet_path, scale)
+        left, right, up, up_no_shadow, offset = WALL_RECTS[art_size(maze_size)]
+        self.left_wall = [round(v * scale) for v in left]
+        self.right_wall = [round(v * scale) for v in right]
+        self.up_wall = [round(v * scale) for v in up]
+        self.up_wall_no_shadow = [round(v * scale) for v in up_no_shadow]
+        self.offset_x, self.offset_y = round(offset[0] * scale), round(offset[1] * scale)
 
     def draw_left_wall(self, surface, x, y):
         surface.blit(self.sheet, (x, y), self.left_wall)
@@ -65,8 +132,8 @@ class wall_spritesheet:
 
 # CLASS XỬ LÝ CHÌA KHÓA
 class key_spritesheet:
-    def __init__(self, image_spritesheet_path):
-        self.sheet = pygame.image.load(image_spritesheet_path)
+    def __init__(self, image_spritesheet_path, scale=1.0):
+        self.sheet = load_image(image_spritesheet_path, scale)
         self.rect = self.sheet.get_rect()
         self.cell = [0, 0, self.rect.width, self.rect.height]
 
@@ -75,8 +142,8 @@ class key_spritesheet:
 
 # CLASS XỬ LÝ CỔNG (GATE)
 class gate_spritesheet:
-    def __init__(self, image_spritesheet_path):
-        self.sheet = pygame.image.load(image_spritesheet_path)
+    def __init__(self, image_spritesheet_path, scale=1.0):
+        self.sheet = load_image(image_spritesheet_path, scale, (8, 1))
         self.rect = self.sheet.get_rect()
         w = self.rect.width / 8    # 8 là số sheet trong ảnh
         h = self.rect.height
@@ -89,8 +156,8 @@ class gate_spritesheet:
 
 # CLASS XỬ LÝ BẪY
 class trap_spritesheet:
-    def __init__(self, image_spritesheet_path):
-        self.sheet = pygame.image.load(image_spritesheet_path)
+    def __init__(self, image_spritesheet_path, scale=1.0):
+        self.sheet = load_image(image_spritesheet_path, scale)
         self.rect = self.sheet.get_rect()
         self.cell = [0, 0, self.rect.width, self.rect.height]
 
@@ -99,8 +166,8 @@ class trap_spritesheet:
 
 # CLASS XỬ LÝ CẦU THANG
 class stairs_spritesheet:
-    def __init__(self, image_spritesheet_path):
-        self.sheet = pygame.image.load(image_spritesheet_path)
+    def __init__(self, image_spritesheet_path, scale=1.0):
+        self.sheet = load_image(image_spritesheet_path, scale, (4, 1))
         self.rect = self.sheet.get_rect()
         self.cell_w = self.rect.width // 4
         self.cell_h = self.rect.height
@@ -185,51 +252,27 @@ def draw_screen(screen, input_maze, backdrop, floor, maze_size, cell_rect, stair
 
     # VẼ GATE
     if gate:
-        gate_x = coordinate_X + cell_rect * (gate["gate_position"][1] // 2)
-        gate_y = coordinate_Y + cell_rect * (gate["gate_position"][0] // 2)
-        if maze_size == 6 or maze_size == 8:
-            gate_x -= 6
-            gate_y -= 12
-        elif maze_size == 10:
-            gate_x -= 3
-            gate_y -= 9
+        gate_x = coordinate_X + cell_rect * (gate["gate_position"][1] // 2) - wall.offset_x
+        gate_y = coordinate_Y + cell_rect * (gate["gate_position"][0] // 2) - wall.offset_y
         gate_sheet.draw(screen, gate_x, gate_y, gate["cellIndex"])
     # VẼ TƯỜNG
     # Tường ngang
     for i in range(2, len(input_maze)-1, 2):
         for j in range(1, len(input_maze[i]), 2):
             if input_maze[i][j] == "%":
-                wall_x = coordinate_X + cell_rect * (j // 2)
-                wall_y = coordinate_Y + cell_rect * (i // 2)
-                if maze_size == 6 or maze_size == 8:
-                    wall_x -= 6
-                    wall_y -= 12
-                if maze_size == 10:
-                    wall_x -= 3
-                    wall_y -= 9
+                wall_x = coordinate_X + cell_rect * (j // 2) - wall.offset_x
+                wall_y = coordinate_Y + cell_rect * (i // 2) - wall.offset_y
                 wall.draw_up_wall(screen, wall_x, wall_y)
     # Tường dọc
     for j in range(2, len(input_maze)-1, 2):
         for i in range(1, len(input_maze[j]), 2):
             if input_maze[i][j] == "%":
-                wall_x = coordinate_X + cell_rect * (j // 2)
-                wall_y = coordinate_Y + cell_rect * (i // 2)
-                if maze_size == 6 or maze_size == 8:
-                    wall_x -= 6
-                    wall_y -= 12
-                elif maze_size == 10:
-                    wall_x -= 3
-                    wall_y -= 9
+                wall_x = coordinate_X + cell_rect * (j // 2) - wall.offset_x
+                wall_y = coordinate_Y + cell_rect * (i // 2) - wall.offset_y
                 if (input_maze[i+1][j+1] == "%"):
                     wall.draw_right_wall(screen, wall_x, wall_y)
-                    redraw_x = coordinate_X + cell_rect * ((j+1) // 2)
-                    redraw_y = coordinate_Y + cell_rect * ((i+1) // 2)
-                    if maze_size == 6 or maze_size == 8:
-                        redraw_x -= 6
-                        redraw_y -= 12
-                    if maze_size == 10:
-                        redraw_x -= 3
-                        redraw_y -= 9
+                    redraw_x = coordinate_X + cell_rect * ((j+1) // 2) - wall.offset_x
+                    redraw_y = coordinate_Y + cell_rect * ((i+1) // 2) - wall.offset_y
                     if (i + 1 < maze_size * 2 and j + 1 < maze_size * 2):
                         wall.draw_up_wall_no_shadow(screen, redraw_x, redraw_y)
                 else:
@@ -281,7 +324,7 @@ def enemy_move_animation(mw_past_position, mw_new_position, mr_past_position, mr
         mummy_white_start_x = game.coordinate_screen_x + game.cell_rect * (mw_past_position[i][1] // 2)
         mummy_white_start_y = game.coordinate_screen_y + game.cell_rect * (mw_past_position[i][0] // 2)
         if game.maze[mw_new_position[i][0] - 1][mw_new_position[i][1]] == "%" or game.maze[mw_new_position[i][0] - 1][mw_new_position[i][1]] == "G":
-            mummy_white_start_y += 3
+            mummy_white_start_y += game.sprite_shift
         mummy_white_start_coordinate.append([mummy_white_start_x, mummy_white_start_y])
         if mw_past_position[i][0] != mw_new_position[i][0] or mw_past_position[i][1] != mw_new_position[i][1]:
             mw_check_movement[i] = True
@@ -294,7 +337,7 @@ def enemy_move_animation(mw_past_position, mw_new_position, mr_past_position, mr
         mummy_red_start_x = game.coordinate_screen_x + game.cell_rect * (mr_past_position[i][1] // 2)
         mummy_red_start_y = game.coordinate_screen_y + game.cell_rect * (mr_past_position[i][0] // 2)
         if game.maze[mr_new_position[i][0] - 1][mr_new_position[i][1]] == "%" or game.maze[mr_new_position[i][0] - 1][mr_new_position[i][1]] == "G":
-            mummy_red_start_y += 3
+            mummy_red_start_y += game.sprite_shift
         mummy_red_start_coordinate.append([mummy_red_start_x, mummy_red_start_y])
         if mr_past_position[i][0] != mr_new_position[i][0] or mr_past_position[i][1] != mr_new_position[i][1]:
             mr_check_movement[i] = True
@@ -307,7 +350,7 @@ def enemy_move_animation(mw_past_position, mw_new_position, mr_past_position, mr
         scorpion_white_start_x = game.coordinate_screen_x + game.cell_rect * (sw_past_position[i][1] // 2)
         scorpion_white_start_y = game.coordinate_screen_y + game.cell_rect * (sw_past_position[i][0] // 2)
         if game.maze[sw_new_position[i][0] - 1][sw_new_position[i][1]] == "%" or game.maze[sw_new_position[i][0] - 1][sw_new_position[i][1]] == "G":
-            scorpion_white_start_y += 3
+            scorpion_white_start_y += game.sprite_shift
         scorpion_white_start_coordinate.append([scorpion_white_start_x, scorpion_white_start_y])
         if sw_past_position[i][0] != sw_new_position[i][0] or sw_past_position[i][1] != sw_new_position[i][1]:
             sw_check_movement[i] = True
@@ -320,7 +363,7 @@ def enemy_move_animation(mw_past_position, mw_new_position, mr_past_position, mr
         scorpion_red_start_x = game.coordinate_screen_x + game.cell_rect * (sr_past_position[i][1] // 2)
         scorpion_red_start_y = game.coordinate_screen_y + game.cell_rect * (sr_past_position[i][0] // 2)
         if game.maze[sr_new_position[i][0] - 1][sr_new_position[i][1]] == "%" or game.maze[sr_new_position[i][0] - 1][sr_new_position[i][1]] == "G":
-            scorpion_red_start_y += 3
+            scorpion_red_start_y += game.sprite_shift
         scorpion_red_start_coordinate.append([scorpion_red_start_x, scorpion_red_start_y])
         if sr_past_position[i][0] != sr_new_position[i][0] or sr_past_position[i][1] != sr_new_position[i][1]:
             sr_check_movement[i] = True
@@ -339,55 +382,57 @@ def enemy_move_animation(mw_past_position, mw_new_position, mr_past_position, mr
 
     for i in range(6):
         pygame.event.pump()
+        # Bước cuối bù phần dư để 5 bước đi đúng 1 ô
+        stride = step_stride + (game.cell_rect % 5 if i == 4 else 0)
         for j in range(len(mummy_white)):
             if i < 5:
                 if mummy_white[j]["direction"] == "UP" and mw_check_movement[j]:
-                    mummy_white[j]["coordinates"][1] -= step_stride
+                    mummy_white[j]["coordinates"][1] -= stride
                 if mummy_white[j]["direction"] == "DOWN" and mw_check_movement[j]:
-                    mummy_white[j]["coordinates"][1] += step_stride
+                    mummy_white[j]["coordinates"][1] += stride
                 if mummy_white[j]["direction"] == "LEFT" and mw_check_movement[j]:
-                    mummy_white[j]["coordinates"][0] -= step_stride
+                    mummy_white[j]["coordinates"][0] -= stride
                 if mummy_white[j]["direction"] == "RIGHT" and mw_check_movement[j]:
-                    mummy_white[j]["coordinates"][0] += step_stride
+                    mummy_white[j]["coordinates"][0] += stride
             if mw_check_movement[j]:
                 mummy_white[j]["cellIndex"] = i % 5
 
         for j in range(len(mummy_red)):
             if i < 5:
                 if mummy_red[j]["direction"] == "UP" and mr_check_movement[j]:
-                    mummy_red[j]["coordinates"][1] -= step_stride
+                    mummy_red[j]["coordinates"][1] -= stride
                 if mummy_red[j]["direction"] == "DOWN" and mr_check_movement[j]:
-                    mummy_red[j]["coordinates"][1] += step_stride
+                    mummy_red[j]["coordinates"][1] += stride
                 if mummy_red[j]["direction"] == "LEFT" and mr_check_movement[j]:
-                    mummy_red[j]["coordinates"][0] -= step_stride
+                    mummy_red[j]["coordinates"][0] -= stride
                 if mummy_red[j]["direction"] == "RIGHT" and mr_check_movement[j]:
-                    mummy_red[j]["coordinates"][0] += step_stride
+                    mummy_red[j]["coordinates"][0] += stride
             if mr_check_movement[j]:
                 mummy_red[j]["cellIndex"] = i % 5
 
         for j in range(len(scorpion_white)):
             if i < 5:
                 if scorpion_white[j]["direction"] == "UP" and sw_check_movement[j]:
-                    scorpion_white[j]["coordinates"][1] -= step_stride
+                    scorpion_white[j]["coordinates"][1] -= stride
                 if scorpion_white[j]["direction"] == "DOWN" and sw_check_movement[j]:
-                    scorpion_white[j]["coordinates"][1] += step_stride
+                    scorpion_white[j]["coordinates"][1] += stride
                 if scorpion_white[j]["direction"] == "LEFT" and sw_check_movement[j]:
-                    scorpion_white[j]["coordinates"][0] -= step_stride
+                    scorpion_white[j]["coordinates"][0] -= stride
                 if scorpion_white[j]["direction"] == "RIGHT" and sw_check_movement[j]:
-                    scorpion_white[j]["coordinates"][0] += step_stride
+                    scorpion_white[j]["coordinates"][0] += stride
             if sw_check_movement[j]:
                 scorpion_white[j]["cellIndex"] = i % 5
 
         for j in range(len(scorpion_red)):
             if i < 5:
                 if scorpion_red[j]["direction"] == "UP" and sr_check_movement[j]:
-                    scorpion_red[j]["coordinates"][1] -= step_stride
+                    scorpion_red[j]["coordinates"][1] -= stride
                 if scorpion_red[j]["direction"] == "DOWN" and sr_check_movement[j]:
-                    scorpion_red[j]["coordinates"][1] += step_stride
+                    scorpion_red[j]["coordinates"][1] += stride
                 if scorpion_red[j]["direction"] == "LEFT" and sr_check_movement[j]:
-                    scorpion_red[j]["coordinates"][0] -= step_stride
+                    scorpion_red[j]["coordinates"][0] -= stride
                 if scorpion_red[j]["direction"] == "RIGHT" and sr_check_movement[j]:
-                    scorpion_red[j]["coordinates"][0] += step_stride
+                    scorpion_red[j]["coordinates"][0] += stride
             if sr_check_movement[j]:
                 scorpion_red[j]["cellIndex"] = i % 5
 
@@ -0,0 +1,130 @@
+"""
+Gợi ý nước đi / tự chơi: chạy solver trên thread riêng để vòng lặp 30 fps của rungame không bị đứng.
+
+    hints = HintSolver(level, notify)   # notify(result) được gọi từ thread solver khi có kết quả
+    hints.request(state)                # state: trạng thái packed hiện tại (PackedLevel.pack)
+    known, action = hints.next_action(state)
+
+Lời giải được nhớ theo từng trạng thái trên đường đi, nên khi người chơi làm theo gợi ý
+thì bước tiếp theo có ngay, không phải giải lại. Với cache (solution_cache.SolutionCache), lời giải
+còn được lưu theo nội dung level + trạng thái, nên chơi lại level cũng không phải giải lại.
+"""
+import threading
+import time
+
+import engine
+import search
+import solution_cache
+
+ACTION_NAMES = {engine.UP: "UP", engine.DOWN: "DOWN", engine.LEFT: "LEFT", engine.RIGHT: "RIGHT", None: "WAIT"}
+
+SOLVED, UNSOLVABLE, TIMEOUT = "SOLVED", "UNSOLVABLE", "TIMEOUT"
+
+
+def path_to_actions(path):
+    """Đường đi định dạng trace_back (đích -> xuất phát) -> danh sách action từ ô xuất phát."""
+    steps = path[::-1]
+    actions = []
+    for (x, y), (nx, ny) in zip(steps, steps[1:]):
+        if (nx, ny) == (x, y):
+            actions.append(None)
+        else:
+            actions.append(engine.DIRECTIONS.index((nx - x, ny - y)))
+    return actions
+
+
+class HintSolver:
+    def __init__(self, level, notify, time_budget=3.0, cache=None):
+        self.level = level
+        self.notify = notify
+        self.time_budget = time_budget
+        self.cache = cache
+        self.plan = {}  # trạng thái packed -> action tối ưu từ trạng thái đó
+        self.unsolvable = set()  # trạng thái đã chứng minh là không thắng được
+        self.progress = None  # bản ghi tiến độ mới nhất của lần giải đang chạy (search.ProgressReporter)
+        self._lock = threading.Lock()
+        self._job = None  # (trạng thái đang giải, threading.Event để hủy)
+
+    def next_action(self, state):
+        """(True, action) nếu đã biết nước đi cho `state`, (True, None) nếu không thắng được, (False, None) nếu chưa biết."""
+        with self._lock:
+            if state in self.plan: return True, self.plan[state]
+            if state in self.unsolvable: return True, None
+        return False, None
+
+    def is_busy(self):
+        return self._job is not None
+
+    def request(self, state):
+        """Bắt đầu giải từ `state` (nếu chưa biết lời giải); kết quả được gửi qua notify."""
+        known, action = self.next_action(state)
+        if known:
+            self.notify(self._result(state, SOLVED if state in self.plan else UNSOLVABLE, action))
+            return
+        if self._job is not None and self._job[0] == state: return
+        self.cancel()
+        cancel = threading.Event()
+        self._job = (state, cancel)
+        self.progress = None
+        threading.Thread(target=self._run, args=(state, cancel), daemon=True).start()
+
+    def cancel(self):
+        """Hủy lần giải đang chạy (vd. người chơi vừa đi nước khác); kết quả của nó sẽ bị bỏ."""
+        if self._job is not None:
+            self._job[1].set()
+            self._job = None
+
+    def _result(self, state, status, action, stats=None):
+        return {"state": state, "status": status, "action": action, "name": ACTION_NAMES.get(action),
+                "moves": self._moves_left(state), "nodes": (stats or {}).get("expanded", 0)}
+
+    def _moves_left(self, state):
+        moves = 0
+        with self._lock:
+            while state in self.plan and moves < 10000:
+                state, outcome = self.level.step(state, self.plan[state])
+                moves += 1
+                if outcome != engine.PLAYING: break
+        return moves
+
+    def _record(self, state, path):
+        # Đi lại lời giải bằng engine để nhớ action cho từng trạng thái trên đường
+        with self._lock:
+            for action in path_to_actions(path):
+                self.plan[state] = action
+                state, outcome = self.level.step(state, action)
+                if outcome != engine.PLAYING: break
+
+    def _run(self, state, cancel):
+        if self.cache is not None:
+            key = solution_cache.state_key(self.level, state)
+            hit, path = self.cache.get(key)
+            if hit:
+                if cancel.is_set(): return
+                self._finish(state, search.SolveResult(path, {"expanded": 0, "unsolvable": path is None}))
+                return
+        deadline = time.perf_counter() + self.time_budget
+
+        def progress(record):
+            if not cancel.is_set(): self.progress = record
+
+        result = search.solve(self.level, state, "astar", progress=progress,
+                              should_stop=lambda: cancel.is_set() or time.perf_counter() > deadline)
+        if cancel.is_set(): return
+        # Hết giờ / bị hủy không chứng minh được gì: chỉ lưu kết quả chắc chắn
+        if self.cache is not None and (result.solved or result.unsolvable):
+            self.cache.put(key, result.path)
+        self._finish(state, result)
+
+    def _finish(self, state, result):
+        if result.solved:
+            self._record(state, result.path)
+            status = SOLVED
+        elif result.unsolvable:
+            with self._lock: self.unsolvable.add(state)
+            status = UNSOLVABLE
+        else:
+            status = TIMEOUT
+        if self._job is not None and self._job[0] == state:
+            self._job = None
+        self.notify(self._result(state, status, self.plan.get(state) if result.solved else None, result.stats))
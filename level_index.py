@@ -0,0 +1,176 @@
+"""
+Bỏ trùng level theo dạng chuẩn (canonical form): 2 level chỉ khác nhau bởi phép lật, hoặc bởi tường
+ở chỗ không nhân vật nào tới được, có cùng canonical_key.
+
+    key = canonical_key(maze, agent_lines)   # maze: các dòng file maze, agent_lines: các dòng file agents
+    with LevelIndex() as index:              # map/level_index.db (SQLite), dùng chung giữa các lần chạy
+        if index.add(key, "gen10_3.txt"): ...   # True = level mới, False = đã có level tương đương
+
+Phép đối xứng giữ nguyên luật chơi (độ khó 1, quái Greedy):
+    - Lật trên / dưới, lật trái / phải và xoay 180 độ. Quái Greedy chỉ xét explorer ở phía nào
+      nên đi đối xứng theo; cổng vẫn chỉ chặn LÊN / XUỐNG.
+    - Không xoay 90 độ / chuyển vị: đổi cổng chặn LÊN / XUỐNG thành chặn TRÁI / PHẢI và đổi quái
+      ưu tiên đi ngang (trắng) thành ưu tiên đi dọc (đỏ), mà thứ tự di chuyển trắng trước đỏ là cố định.
+    - Độ khó 2 / 3: hòa thì quái chọn hướng theo thứ tự LÊN, XUỐNG, TRÁI, PHẢI và đi tuần theo hash
+      vị trí với seed lấy từ tên level (engine.level_patrol_seed), nên không có phép đối xứng nào; chỉ
+      level giống hệt và cùng patrol seed mới là trùng (canonical_key(..., patrol_seed=...)).
+Phần không ảnh hưởng luật (độ khó 1): ô / tường không tới được từ explorer hay quái nào, cột tường
+ở góc ô, lỗ trên viền (trừ cầu thang 'S'), cổng trên tường dọc (không bao giờ chặn) và cổng khi
+không ai tới được chìa khóa (luôn đóng = tường).
+
+Index lưu trên đĩa bằng sqlite3 (có sẵn trong Python), mỗi level 1 dòng (key 16 byte, tên level),
+nên tra / thêm chỉ đọc vài trang của B-tree, không phải nạp hàng triệu key vào bộ nhớ.
+"""
+import os
+import sqlite3
+import hashlib
+
+project_path = os.path.dirname(os.path.abspath(__file__))
+INDEX_PATH = os.path.join(project_path, "map", "level_index.db")
+
+AGENT_TAGS = ("MW", "MR", "SW", "SR")
+# Độ khó có luật đối xứng qua phép lật (xem docstring đầu file)
+SYMMETRIC_DIFFICULTIES = (1,)
+# Số level thêm vào giữa 2 lần commit
+COMMIT_INTERVAL = 1000
+
+
+def parse_agents(agent_lines):
+    """(vị trí explorer hoặc None, {tag: [vị trí]}) từ các dòng file agents."""
+    explorer, groups = None, {tag: [] for tag in AGENT_TAGS}
+    for line in agent_lines:
+        x = line.split()
+        if not x: continue
+        if x[0] == 'E':
+            explorer = (int(x[1]), int(x[2]))
+        elif x[0] in groups:
+            groups[x[0]].append((int(x[1]), int(x[2])))
+    return explorer, groups
+
+
+def _reachable(maze, starts):
+    # Mọi ô tới được từ `starts` khi cổng mở (cổng mở chỉ chặn ít hơn cổng đóng)
+    rows, cols = len(maze), len(maze[0])
+    seen = set(p for p in starts if 0 < p[0] < rows and 0 < p[1] < cols)
+    frontier = list(seen)
+    for x, y in frontier:
+        for dx, dy in ((-2, 0), (2, 0), (0, -2), (0, 2)):
+            nxt = (x + dx, y + dy)
+            if 0 < nxt[0] < rows and 0 < nxt[1] < cols and nxt not in seen and maze[x + dx // 2][y + dy // 2] != '%':
+                seen.add(nxt)
+                frontier.append(nxt)
+    return seen
+
+
+def _normalize(maze, explorer, groups):
+    # Maze mới chỉ giữ những gì ảnh hưởng tới lượt chơi (xem docstring đầu file)
+    rows, cols = len(maze), len(maze[0])
+    starts = ([explorer] if explorer else []) + [p for tag in AGENT_TAGS for p in groups[tag]]
+    rooms = _reachable(maze, starts)
+    has_key = any(maze[x][y] == 'K' for x, y in rooms)
+    grid = [['%'] * cols for _ in range(rows)]
+    for x, y in rooms:
+        if maze[x][y] in "TK": grid[x][y] = maze[x][y]
+        for dx, dy in ((-1, 0), (1, 0), (0, -1), (0, 1)):
+            wx, wy = x + dx, y + dy
+            c = maze[wx][wy]
+            if c == 'S':
+                grid[wx][wy] = 'S'
+            elif c == '%' or (wx + dx, wy + dy) not in rooms:
+                continue  # Tường, hoặc lỗ trên viền
+            elif c == 'G' and dx != 0:
+                grid[wx][wy] = 'G' if has_key else '%'
+            else:
+                grid[wx][wy] = ' '
+    return grid
+
+
+def canonical_level(maze, agent_lines, difficulty=1):
+    """
+    (các dòng maze, các dòng agents) dạng chuẩn: nhỏ nhất (theo thứ tự chữ) trong các ảnh của level
+    qua những phép đối xứng giữ luật ở độ khó `difficulty`. Quái cùng loại được sắp theo vị trí.
+    """
+    rows = max(len(maze), 1)
+    cols = max(len(row) for row in maze) if maze else 1
+    # Dòng ngắn hơn (map lỗi) -> coi phần thiếu là tường, như engine
+    maze = [list(row) + ['%'] * (cols - len(row)) for row in maze]
+    explorer, groups = parse_agents(agent_lines)
+    if difficulty in SYMMETRIC_DIFFICULTIES:
+        maze = _normalize(maze, explorer, groups)
+        flips = ((False, False), (True, False), (False, True), (True, True))
+    else:
+        flips = ((False, False),)
+
+    best = None
+    for flip_rows, flip_cols in flips:
+        def at(p):
+            return (rows - 1 - p[0] if flip_rows else p[0], cols - 1 - p[1] if flip_cols else p[1])
+        grid = maze[::-1] if flip_rows else maze
+        lines = ["".join(row[::-1] if flip_cols else row) for row in grid]
+        agents = ["E {} {}".format(*at(explorer))] if explorer else []
+        for tag in AGENT_TAGS:
+            agents.extend("{} {} {}".format(tag, *p) for p in sorted(at(p) for p in groups[tag]))
+        if best is None or (lines, agents) < best:
+            best = (lines, agents)
+    return best
+
+
+def canonical_key(maze, agent_lines, difficulty=1, patrol_seed=None):
+    """
+    Hash 16 byte của canonical_level: 2 level tương đương (cùng độ khó) <=> cùng key.
+    patrol_seed: seed đi tuần của level (engine.level_patrol_seed(tên level)); ở độ khó không có trong
+    SYMMETRIC_DIFFICULTIES nó là một phần của key. None = chỉ so bố cục (level giống hệt nhưng khác tên
+    vẫn là trùng), như khi bỏ trùng level mới sinh chưa có tên.
+    """
+    lines, agents = canonical_level(maze, agent_lines, difficulty)
+    text = "{}\n{}\n#\n{}".format(difficulty, "\n".join(lines), "\n".join(agents))
+    if difficulty not in SYMMETRIC_DIFFICULTIES and patrol_seed is not None:
+        text += "\n#seed {}".format(patrol_seed)
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+class LevelIndex:
+    """
+    Tập canonical_key của các level đã có, lưu trong 1 file SQLite; mỗi key nhớ kèm tên level đầu tiên.
+    Thay đổi được commit mỗi COMMIT_INTERVAL lần add, khi gọi commit() và khi đóng.
+    """
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS levels (key BLOB PRIMARY KEY, name TEXT) WITHOUT ROWID")
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM levels").fetchone()[0]
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def get(self, key):
+        """Tên level đã có cùng key ("" nếu không lưu tên), hoặc None."""
+        row = self._db.execute("SELECT name FROM levels WHERE key = ?", (key,)).fetchone()
+        return None if row is None else (row[0] or "")
+
+    def add(self, key, name=None):
+        """Thêm key; True nếu là level mới, False nếu đã có level tương đương."""
+        added = self._db.execute("INSERT OR IGNORE INTO levels VALUES (?, ?)", (key, name)).rowcount == 1
+        self._pending += 1
+        if self._pending >= COMMIT_INTERVAL: self.commit()
+        return added
+
+    def commit(self):
+        self._db.commit()
+        self._pending = 0
+
+    def close(self):
+        if self._db is not None:
+            self.commit()
+            self._db.close()
+            self._db = None
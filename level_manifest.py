@@ -0,0 +1,299 @@
+"""
+Manifest các level trong map/maze: dựng 1 lần rồi lưu ở map/level_manifest.json, nên menu chọn màn
+và GameState không phải listdir + đọc + quét lại từng file mỗi lần.
+
+    manifest = default_manifest()
+    manifest.levels("hard")        # tên level loại "hard", đã sắp theo thứ tự chơi
+    manifest.get("map8_3.txt")     # thông tin 1 level (xem describe_level) hoặc None
+
+Mỗi level nhớ (mtime, kích thước) của file nguồn: file maze + file agents, hoặc file pack chứa nó
+(level_pack.py / binary_pack.py). Manifest cũng nhớ mtime của thư mục maze / agents và (mtime, kích thước)
+của các file pack: levels() chỉ stat những thứ đó, và chỉ listdir + stat lại từng level khi chúng đổi
+(thêm / xóa / đổi tên file, ghi lại pack). File level sửa tại chỗ không đổi mtime thư mục; get() (khi vào
+chơi level) stat riêng file của level đó và đọc lại nếu đổi. Số liệu solver (tùy chọn, thêm bằng
+`python level_manifest.py --solve`) bị bỏ cùng lúc khi level đổi.
+
+Cách chạy:
+    python level_manifest.py                  # Cập nhật manifest, in danh sách level
+    python level_manifest.py --rebuild        # Dựng lại từ đầu
+    python level_manifest.py --solve --difficulty 3   # Thêm số bước / số state A* cho level chưa có
+"""
+import os
+import re
+import sys
+import json
+import argparse
+
+import engine
+import search
+import binary_pack
+import level_pack
+
+project_path = os.path.dirname(os.path.abspath(__file__))
+maze_path = os.path.join(project_path, "map", "maze")
+object_path = os.path.join(project_path, "map", "agents")
+MANIFEST_PATH = os.path.join(project_path, "map", "level_manifest.json")
+
+# Đổi khi nội dung 1 mục thay đổi: manifest cũ bị dựng lại
+MANIFEST_VERSION = 1
+LEVEL_CLASSES = ("easy", "hard")
+# Số state tối đa A* mở rộng cho mỗi level khi --solve (vượt quá -> không có số liệu)
+SOLVE_NODE_BUDGET = 2000000
+
+
+def level_class(name):
+    """"hard" nếu tên level có chữ "hard" (danh sách Medium / Hard), "easy" nếu không."""
+    return "hard" if "hard" in name.lower() else "easy"
+
+
+def sort_order(name):
+    """Thứ tự chơi: 2 số đầu trong tên level (vd. map8_3.txt -> [8, 3]); tên không có số xếp cuối."""
+    numbers = re.findall(r'\d+', level_pack.split_level_name(name)[1])
+    if len(numbers) >= 2:
+        return [int(numbers[0]), int(numbers[1])]
+    elif len(numbers) == 1:
+        return [int(numbers[0]), 0]
+    return [999, 999]
+
+
+def describe_level(level):
+    """Mục manifest của level (dict như engine.parse_level)."""
+    maze = level["maze"]
+    return {"class": level_class(level["name"]), "order": sort_order(level["name"]),
+            "rows": len(maze), "cols": max([len(row) for row in maze] or [0]), "size": len(maze) // 2,
+            "stair": level["stair_position"] or None, "key": level["key_position"] or None,
+            "gate": level["gate_position"] or None, "traps": level["trap_position"],
+            "explorer": level["explorer"],
+            "enemies": {tag: len(level[tag.lower()]) for tag in ("MW", "MR", "SW", "SR")}}
+
+
+def _stamp(path):
+    # (mtime, kích thước) của file, None nếu không có
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class LevelManifest:
+    """
+    Mục manifest theo tên level (tên file, hoặc "<file pack>:<tên level>" như main.get_sorted_levels).
+    File manifest chỉ được ghi lại khi có mục đổi.
+    """
+    def __init__(self, path=MANIFEST_PATH, maze_dir=maze_path, agents_dir=object_path):
+        self.path = path
+        self.maze_dir = maze_dir
+        self.agents_dir = agents_dir
+        self._entries = {}  # tên level -> mục (kèm "stamp": nguồn của nó lúc đọc)
+        self._listing = None  # _listing_stamp() lúc refresh() lần cuối, None = phải listdir lại
+        self._dirty = False
+        self.load()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def load(self):
+        self._entries = {}
+        self._listing = None
+        if not os.path.exists(self.path): return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return
+        if data.get("version") != MANIFEST_VERSION: return
+        self._entries = data.get("levels", {})
+        self._listing = data.get("listing")
+
+    def save(self):
+        if not self._dirty: return
+        data = {"version": MANIFEST_VERSION, "listing": self._listing, "levels": self._entries}
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except IOError as e:
+            print(f"Error saving level manifest: {e}")
+
+    def clear(self):
+        self._entries = {}
+        self._listing = None
+        self._dirty = True
+
+    def _dir_stamps(self):
+        return [_stamp(self.maze_dir), _stamp(self.agents_dir)]
+
+    def _listing_stamp(self):
+        # mtime thư mục maze / agents + (mtime, kích thước) hiện tại của từng file pack đã biết
+        packs = (self._listing or {}).get("packs", {})
+        return {"dirs": self._dir_stamps(), "packs": {pack: _stamp(os.path.join(self.maze_dir, pack)) for pack in packs}}
+
+    def _sources(self, name):
+        # Các file mà level `name` được đọc từ đó
+        pack, entry_name = level_pack.split_level_name(name)
+        if pack is not None: return [os.path.join(self.maze_dir, pack)]
+        return [os.path.join(self.maze_dir, name), os.path.join(self.agents_dir, name)]
+
+    def _add(self, name, maze_lines, agent_lines, stamp):
+        entry = describe_level(engine.parse_level(name, maze_lines, agent_lines))
+        entry["stamp"] = stamp
+        self._entries[name] = entry
+        self._dirty = True
+
+    def _read_file_level(self, name, stamp):
+        with open(os.path.join(self.maze_dir, name), 'r') as f:
+            maze_lines = f.read().splitlines()
+        agent_lines = []
+        agent_file = os.path.join(self.agents_dir, name)
+        if os.path.exists(agent_file):
+            with open(agent_file, 'r') as f:
+                agent_lines = f.read().splitlines()
+        self._add(name, maze_lines, agent_lines, stamp)
+
+    def _read_pack(self, pack, stamp):
+        pack_file = os.path.join(self.maze_dir, pack)
+        if pack.endswith(binary_pack.PACK_EXT):
+            try:
+                levels = binary_pack.open_pack(pack_file)
+            except (OSError, ValueError):
+                return
+            for entry_name in levels.names:
+                self._add(pack + level_pack.PACK_SEPARATOR + entry_name, *levels.lines(entry_name), stamp)
+        else:
+            for entry in level_pack.read_pack(pack_file):
+                self._add(pack + level_pack.PACK_SEPARATOR + entry["name"], entry["maze"], entry["agents"], stamp)
+
+    def refresh(self):
+        """Đọc lại level có file nguồn đổi / mới, bỏ level có file đã xóa; ghi manifest nếu có thay đổi."""
+        dirs = self._dir_stamps()  # Trước listdir: file thêm trong lúc refresh sẽ làm lần sau refresh lại
+        packs = {}
+        try:
+            files = sorted(os.listdir(self.maze_dir))
+        except FileNotFoundError:
+            files = []
+        seen = set()
+        for f in files:
+            if f.endswith(".txt"):
+                seen.add(f)
+                stamp = [_stamp(path) for path in self._sources(f)]
+                entry = self._entries.get(f)
+                if entry is None or entry["stamp"] != stamp:
+                    try:
+                        self._read_file_level(f, stamp)
+                    except (IOError, ValueError, IndexError):
+                        seen.discard(f)  # File lỗi: không liệt kê
+            elif f.endswith(level_pack.PACK_EXTS):
+                stamp = [_stamp(os.path.join(self.maze_dir, f))]
+                prefix = f + level_pack.PACK_SEPARATOR
+                names = [name for name in self._entries if name.startswith(prefix)]
+                if not names or any(self._entries[name]["stamp"] != stamp for name in names):
+                    for name in names: del self._entries[name]
+                    if names: self._dirty = True
+                    self._read_pack(f, stamp)
+                    names = [name for name in self._entries if name.startswith(prefix)]
+                seen.update(names)
+                packs[f] = stamp[0]
+        for name in [name for name in self._entries if name not in seen]:
+            del self._entries[name]
+            self._dirty = True
+        listing = {"dirs": dirs, "packs": packs}
+        if listing != self._listing:
+            self._listing = listing
+            self._dirty = True
+        self.save()
+
+    def levels(self, kind=None):
+        """
+        Tên các level (chỉ loại `kind` trong LEVEL_CLASSES nếu có) theo thứ tự chơi.
+        Chỉ refresh() khi thư mục level hoặc file pack đổi từ lần refresh trước.
+        """
+        if self._listing is None or self._listing != self._listing_stamp():
+            self.refresh()
+        names = [name for name, entry in self._entries.items() if kind is None or entry["class"] == kind]
+        names.sort(key=lambda name: (self._entries[name]["order"], name))
+        return names
+
+    def get(self, name):
+        """Mục manifest của level `name` (đọc lại nếu file nguồn đã đổi), None nếu không có level này."""
+        entry = self._entries.get(name)
+        stamp = [_stamp(path) for path in self._sources(name)]
+        if entry is not None and entry["stamp"] == stamp: return entry
+        if level_pack.split_level_name(name)[0] is not None:
+            self.refresh()
+            return self._entries.get(name)
+        try:
+            if stamp[0] is None: raise IOError(name)
+            self._read_file_level(name, stamp)
+        except (IOError, ValueError, IndexError):
+            if self._entries.pop(name, None) is not None: self._dirty = True
+            entry = None
+        else:
+            entry = self._entries[name]
+        self.save()
+        return entry
+
+    def set_solver_stats(self, name, stats):
+        """Lưu số liệu solver của level (bị bỏ khi level đổi)."""
+        self._entries[name]["solver"] = stats
+        self._dirty = True
+
+
+_default_manifest = None
+
+
+def default_manifest():
+    """Manifest dùng chung cho cả chương trình (map/level_manifest.json)."""
+    global _default_manifest
+    if _default_manifest is None:
+        _default_manifest = LevelManifest()
+    return _default_manifest
+
+
+def solve_stats(manifest, name, difficulty=1, node_budget=SOLVE_NODE_BUDGET):
+    """
+    Giải level bằng A*: {"difficulty", "moves" (None nếu không giải được / vượt node_budget), "expanded",
+    "unsolvable"}.
+    """
+    lines = level_pack.load_level_lines(name, manifest.maze_dir)
+    if lines is None:
+        level = engine.read_level(os.path.join(manifest.maze_dir, name), os.path.join(manifest.agents_dir, name))
+    else:
+        level = engine.parse_level(name, *lines)
+    packed, start = engine.compile_level(level, difficulty)
+    result = search.solve(packed, start, "astar", node_budget=node_budget)
+    return {"difficulty": difficulty, "moves": len(result.path) - 1 if result.solved else None,
+            "expanded": result.stats.get("expanded", 0), "unsolvable": result.unsolvable}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cập nhật manifest level (map/level_manifest.json)")
+    parser.add_argument("--rebuild", action="store_true", help="Bỏ manifest cũ, đọc lại mọi level")
+    parser.add_argument("--solve", action="store_true", help="Thêm số liệu A* cho level chưa có")
+    parser.add_argument("--difficulty", type=int, default=1, choices=(1, 2, 3),
+                        help="AI của quái khi --solve (1 Greedy, 2 Chase, 3 Zone + đi tuần)")
+    args = parser.parse_args()
+
+    manifest = LevelManifest()
+    if args.rebuild: manifest.clear()
+    names = manifest.levels()
+    for name in names:
+        entry = manifest.get(name)
+        if args.solve and (entry.get("solver") or {}).get("difficulty") != args.difficulty:
+            try:
+                manifest.set_solver_stats(name, solve_stats(manifest, name, args.difficulty))
+            except (IOError, ValueError, IndexError) as e:
+                print("{}: {}: {}".format(name, type(e).__name__, e), file=sys.stderr)
+            entry = manifest.get(name)
+        enemies = " ".join("{}{}".format(tag, n) for tag, n in entry["enemies"].items() if n)
+        solver = entry.get("solver")
+        moves = "" if solver is None else "  moves {} (d{}, {} states)".format(
+            solver["moves"], solver["difficulty"], solver["expanded"])
+        print("{:<32} {:<4} {}x{}  {}{}".format(name, entry["class"], entry["size"], entry["size"], enemies, moves))
+    manifest.save()
+    print("{} levels in {}".format(len(names), manifest.path), file=sys.stderr)
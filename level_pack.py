@@ -0,0 +1,431 @@
+"""
+Sinh hàng loạt level theo dây chuyền (không cần pygame), ghi thành nhiều file đánh số
+hoặc 1 file pack mà main.get_sorted_levels liệt kê được.
+
+    sinh (seed) -> bỏ trùng -> lọc trước -> giải -> ghi
+
+Mỗi tầng là 1 thread (tầng giải: nhiều thread, mỗi thread đợi 1 process giải), nối với nhau bằng
+queue có giới hạn nên tầng sinh không chạy quá xa tầng giải. Ứng viên gửi sang process giải chỉ là
+1 seed (maze_generator.generate_level(size, density, seed)) nên rất nhẹ.
+Bỏ trùng theo level_index.canonical_key (level lật đối xứng cũng là trùng) trước khi giải, tra trong
+index trên đĩa (mặc định map/level_index.db) nên các lần chạy sau / pack khác cũng không ghi lại level đã có.
+
+Cách chạy:
+    python level_pack.py --count 50 --size 10                  # map/maze/gen10_1.txt ... (+ map/agents)
+    python level_pack.py --count 200 --size 8 --pack gen8.pack  # 1 file map/maze/gen8.pack
+    python level_pack.py --count 50 --size 10 --moves 25 40     # Chỉ giữ level có lời giải tối ưu 25-40 bước
+    python level_pack.py --count 50 --prefix hard_gen           # Tên có "hard" -> vào danh sách Medium / Hard
+
+Chạy lại cùng lệnh sau khi bị ngắt sẽ chạy tiếp từ checkpoint (file .checkpoint.json cạnh đầu ra):
+seed đã xét xong được bỏ qua, level đã ghi được đọc lại và thêm vào index (nếu chưa có).
+
+File pack: mỗi dòng 1 level dạng JSON
+    {"name", "maze": [dòng maze], "agents": [dòng agents], "size", "density", "seed", "fingerprint", "metrics"}
+Level trong pack có tên "<file pack>:<name>", vd. "gen8.pack:gen8_3.txt" (xem split_level_name).
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+
+import binary_pack
+import level_index
+import maze_generator
+
+project_path = os.path.dirname(os.path.abspath(__file__))
+maze_path = os.path.join(project_path, "map", "maze")
+object_path = os.path.join(project_path, "map", "agents")
+
+PACK_EXT = ".pack"
+# Đuôi file được liệt kê như pack: pack JSON của file này + pack nhị phân (binary_pack.py)
+PACK_EXTS = (PACK_EXT, binary_pack.PACK_EXT)
+PACK_SEPARATOR = ":"
+# Số phần tử tối đa chờ giữa 2 tầng liền nhau
+QUEUE_SIZE = 64
+
+
+# --- ĐỌC PACK ---
+def split_level_name(name):
+    """("gen8.pack", "gen8_3.txt") cho level nằm trong pack, (None, name) cho file level thường."""
+    pack, sep, entry = name.partition(PACK_SEPARATOR)
+    if sep and pack.endswith(PACK_EXTS):
+        return pack, entry
+    return None, name
+
+
+def read_pack(pack_file):
+    """Danh sách level (dict) trong file pack; dòng cuối ghi dở (run bị ngắt) được bỏ qua."""
+    entries = []
+    try:
+        with open(pack_file, "r") as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def _valid_pack_length(pack_file):
+    # Số byte đầu file gồm các dòng JSON trọn vẹn
+    valid = 0
+    with open(pack_file, "rb") as f:
+        for line in f:
+            if not line.endswith(b"\n"): break
+            try:
+                json.loads(line)
+            except ValueError:
+                break
+            valid += len(line)
+    return valid
+
+
+def pack_level_names(pack_file):
+    pack = os.path.basename(pack_file)
+    if pack.endswith(binary_pack.PACK_EXT):
+        try:
+            names = binary_pack.open_pack(pack_file).names
+        except (OSError, ValueError):
+            names = []  # File hỏng / ghi dở: bỏ qua như dòng JSON ghi dở
+    else:
+        names = [entry["name"] for entry in read_pack(pack_file)]
+    return [pack + PACK_SEPARATOR + name for name in names]
+
+
+def load_level_lines(name, maze_dir=maze_path):
+    """(các dòng maze, các dòng agents) của level `name` trong pack, hoặc None nếu không có."""
+    pack, entry_name = split_level_name(name)
+    if pack is None: return None
+    if pack.endswith(binary_pack.PACK_EXT):
+        # Pack nhị phân: đọc thẳng bản ghi của level qua mmap
+        try:
+            pack = binary_pack.open_pack(os.path.join(maze_dir, pack))
+        except (OSError, ValueError):
+            return None
+        return pack.lines(entry_name) if entry_name in pack else None
+    for entry in read_pack(os.path.join(maze_dir, pack)):
+        if entry["name"] == entry_name:
+            return entry["maze"], entry["agents"]
+    return None
+
+
+# --- TẦNG GIẢI (chạy trong process con) ---
+def _solve_candidate(task):
+    # (True, số liệu hoặc None khi không có mục tiêu) nếu ứng viên đạt, (False, None) nếu không
+    size, density, seed, target = task
+    gen, ex_pos, enemies = maze_generator.generate_level(size, density, seed)
+    if target is None:
+        return gen.is_solvable(ex_pos, enemies, maze_generator.SOLVE_NODE_BUDGET), None
+    metrics = gen.measure(ex_pos, enemies, maze_generator.SOLVE_NODE_BUDGET, target.difficulty)
+    if metrics is None: return False, None
+    if metrics["forced_wait"] is None and target.forced_wait and target.matches(dict(metrics, forced_wait=True)):
+        metrics["forced_wait"] = gen.wait_is_forced(ex_pos, enemies, maze_generator.SOLVE_NODE_BUDGET,
+                                                    target.difficulty)
+    return target.matches(metrics), metrics
+
+
+class PackPipeline:
+    """
+    Sinh đủ `count` level (tính cả level đã ghi trước khi bị ngắt; size, density; target: maze_generator.LevelTarget hoặc None = chỉ cần giải được)
+    rồi ghi thành file đánh số <prefix><size>_<n>.txt trong out_dir (maze) + agents_dir, hoặc vào `pack`
+    (tên file trong out_dir) nếu có. run() chặn cho đến khi đủ level hoặc stop() được gọi.
+    index: đường dẫn file level_index.LevelIndex dùng để bỏ trùng.
+    """
+    def __init__(self, size, density, count, prefix="gen", pack=None, seed=None, target=None, workers=None,
+                 out_dir=maze_path, agents_dir=object_path, checkpoint=None, queue_size=QUEUE_SIZE,
+                 index=level_index.INDEX_PATH):
+        self.size, self.density, self.count = size, density, count
+        self.prefix, self.pack, self.target = prefix, pack, target
+        self.difficulty = target.difficulty if target is not None else 1
+        self.workers = workers or maze_generator.GENERATION_WORKERS
+        self.out_dir, self.agents_dir = out_dir, agents_dir
+        self.queue_size = queue_size
+        stem = pack if pack else "{}{}".format(prefix, size)
+        self.checkpoint = checkpoint or os.path.join(out_dir, stem + ".checkpoint.json")
+        self.config = {"size": size, "density": density, "prefix": prefix, "pack": pack,
+                       "target": vars(target) if target is not None else None}
+
+        # Chạy tiếp: seed gốc, mốc (mọi index < watermark đã xét xong) và số level có sẵn trong đầu ra lúc
+        # bắt đầu lần chạy đầu tiên lấy từ checkpoint nếu cấu hình khớp
+        self.seed, self.watermark, existing, saved_written = seed, 0, None, 0
+        state = self._load_checkpoint()
+        if state is not None and state["config"] == self.config and seed in (None, state["seed"]):
+            self.seed, self.watermark = state["seed"], state["watermark"]
+            existing, saved_written = state.get("existing"), state.get("written", 0)
+        if self.seed is None:
+            self.seed = int.from_bytes(os.urandom(4), "little")
+
+        # Level đã có trong đầu ra: thêm vào index (nếu run trước bị ngắt trước khi kịp commit) và đánh số tiếp
+        self.index = level_index.LevelIndex(index)
+        self.numbers = set()
+        self._scan_output()
+        self.index.commit()
+        # Số level đã ghi đếm từ đầu ra thật, không từ checkpoint: level ghi xong ngay trước khi bị ngắt
+        # (checkpoint chưa kịp lưu) vẫn được tính
+        if existing is None:
+            existing = len(self.numbers) - saved_written  # Checkpoint cũ (chưa có "existing") hoặc chạy mới
+        self.existing = existing
+        self.written = max(len(self.numbers) - existing, 0)
+        # canonical_key của ứng viên đang xét / đã bị loại trong lần chạy này (chỉ level được ghi mới vào index)
+        self._seen = set()
+        self.counts = {"generated": 0, "prefiltered": 0, "solved": 0, "rejected": 0, "duplicates": 0}
+        self._done = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    # --- checkpoint ---
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint, "r") as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def _save_checkpoint(self):
+        data = {"config": self.config, "seed": self.seed, "watermark": self.watermark, "existing": self.existing,
+                "written": self.written}
+        tmp_path = self.checkpoint + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.checkpoint)
+
+    def _mark_done(self, index):
+        # Mốc chỉ tiến qua các index liên tiếp đã xong, vì các tầng song song hoàn thành không theo thứ tự
+        with self._lock:
+            self._done.add(index)
+            while self.watermark in self._done:
+                self._done.discard(self.watermark)
+                self.watermark += 1
+
+    # --- đầu ra ---
+    def _level_name(self, number):
+        return "{}{}_{}.txt".format(self.prefix, self.size, number)
+
+    def _scan_output(self):
+        if self.pack:
+            pack_file = os.path.join(self.out_dir, self.pack)
+            open(pack_file, "a").close()
+            # Bỏ dòng ghi dở ở cuối file (run trước bị ngắt giữa lúc ghi) trước khi ghi tiếp
+            valid = _valid_pack_length(pack_file)
+            if os.path.getsize(pack_file) != valid:
+                with open(pack_file, "rb+") as f:
+                    f.truncate(valid)
+            for entry in read_pack(pack_file):
+                self.index.add(level_index.canonical_key(entry["maze"], entry["agents"], self.difficulty),
+                               self.pack + PACK_SEPARATOR + entry["name"])
+                self.numbers.add(entry["name"])
+            return
+        head = "{}{}_".format(self.prefix, self.size)
+        for folder in (self.out_dir, self.agents_dir):
+            # File .tmp còn lại khi run trước bị ngắt giữa lúc ghi (xem MazeGenerator.save_to_files)
+            for f in os.listdir(folder) if os.path.isdir(folder) else []:
+                if f.startswith(head) and f.endswith(".txt.tmp"):
+                    os.remove(os.path.join(folder, f))
+        for f in os.listdir(self.out_dir) if os.path.isdir(self.out_dir) else []:
+            if f.startswith(head) and f.endswith(".txt") and f[len(head):-4].isdigit():
+                agent_file = os.path.join(self.agents_dir, f)
+                if not os.path.exists(agent_file):
+                    # Level ghi dở: bỏ file maze để không bị liệt kê (get_sorted_levels) và ghi lại số này
+                    os.remove(os.path.join(self.out_dir, f))
+                    continue
+                with open(os.path.join(self.out_dir, f), "r") as maze_file:
+                    maze = maze_file.read().splitlines()
+                with open(agent_file, "r") as agent_file:
+                    agents = agent_file.read().splitlines()
+                self.index.add(level_index.canonical_key(maze, agents, self.difficulty), f)
+                self.numbers.add(f)
+
+    def _write(self, seed, level, metrics):
+        gen, ex_pos, enemies = level
+        number = len(self.numbers) + 1
+        while self._level_name(number) in self.numbers: number += 1
+        name = self._level_name(number)
+        if self.pack:
+            entry = {"name": name, "maze": ["".join(row) for row in gen.grid],
+                     "agents": gen.agent_lines(ex_pos, enemies), "size": self.size, "density": self.density,
+                     "seed": seed, "fingerprint": gen.fingerprint(ex_pos, enemies), "metrics": metrics}
+            with open(os.path.join(self.out_dir, self.pack), "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        else:
+            gen.save_to_files(os.path.join(self.out_dir, name), os.path.join(self.agents_dir, name), ex_pos, enemies)
+        self.numbers.add(name)
+        return name
+
+    # --- các tầng ---
+    def _get(self, source):
+        # Lấy 1 phần tử, trả về None khi dây chuyền đã dừng
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return None
+
+    def _put(self, target, item):
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _generate_stage(self, out):
+        index = self.watermark
+        while not self._stop.is_set():
+            seed = self.seed + index
+            self._put(out, (index, seed, maze_generator.generate_level(self.size, self.density, seed)))
+            with self._lock: self.counts["generated"] += 1
+            index += 1
+
+    def _dedup_stage(self, source, out):
+        while True:
+            item = self._get(source)
+            if item is None: return
+            index, seed, (gen, ex_pos, enemies) = item
+            # Level chưa có tên (patrol seed) -> so theo bố cục: không ghi 2 level giống hệt nhau
+            key = level_index.canonical_key(gen.grid, gen.agent_lines(ex_pos, enemies), self.difficulty)
+            with self._lock:
+                duplicate = key in self._seen or key in self.index
+                self._seen.add(key)
+                if duplicate: self.counts["duplicates"] += 1
+            if duplicate:
+                self._mark_done(index)
+            else:
+                self._put(out, item + (key,))
+
+    def _prefilter_stage(self, source, to_solve, to_write):
+        while True:
+            item = self._get(source)
+            if item is None: return
+            gen, ex_pos, enemies = item[2]
+            level, start = gen.compile(ex_pos, enemies, self.difficulty)
+            route = maze_generator.explorer_route(level, start)
+            verdict = maze_generator.static_filter(level, start, route)
+            if verdict is None and self.target is None:
+                verdict = maze_generator.probe_filter(level, start, route)
+            if verdict is not None:
+                with self._lock: self.counts["prefiltered"] += 1
+            if verdict is False:
+                self._mark_done(item[0])
+            elif verdict is True and self.target is None:
+                # Chắc chắn giải được: không cần tầng giải
+                self._put(to_write, item + (None,))
+            else:
+                self._put(to_solve, item)
+
+    def _solve_stage(self, pool, source, out):
+        while True:
+            item = self._get(source)
+            if item is None: return
+            index, seed = item[:2]
+            pending = pool.apply_async(_solve_candidate, ((self.size, self.density, seed, self.target),))
+            while True:
+                if self._stop.is_set(): return
+                try:
+                    result = pending.get(timeout=0.1)
+                    break
+                except multiprocessing.TimeoutError:
+                    continue
+            accepted, metrics = result
+            with self._lock:
+                self.counts["solved" if accepted else "rejected"] += 1
+            if accepted:
+                self._put(out, item + (metrics,))
+            else:
+                self._mark_done(index)
+
+    def _write_stage(self, source, progress):
+        while self.written < self.count:
+            item = self._get(source)
+            if item is None: return
+            index, seed, level, key, metrics = item
+            name = self._write(seed, level, metrics)
+            self.written += 1
+            self._mark_done(index)
+            with self._lock:
+                self.index.add(key, self.pack + PACK_SEPARATOR + name if self.pack else name)
+                self.index.commit()
+                self._save_checkpoint()
+            if progress is not None:
+                progress(dict(self.counts, written=self.written, name=name, elapsed=time.perf_counter() - self.begin))
+        self._stop.set()
+
+    def run(self, progress=None):
+        """
+        Chạy đến khi ghi đủ `count` level; progress(record) được gọi sau mỗi level ghi được.
+        Trả về bộ đếm: generated / prefiltered / solved / rejected / duplicates / written / elapsed.
+        """
+        self.begin = time.perf_counter()
+        generated, unique, to_solve, to_write = (queue.Queue(self.queue_size) for _ in range(4))
+        pool = multiprocessing.Pool(self.workers)
+        threads = [threading.Thread(target=self._generate_stage, args=(generated,)),
+                   threading.Thread(target=self._dedup_stage, args=(generated, unique)),
+                   threading.Thread(target=self._prefilter_stage, args=(unique, to_solve, to_write))]
+        # Mỗi thread giải đợi 1 process -> tối đa `workers` ứng viên đang giải cùng lúc
+        threads += [threading.Thread(target=self._solve_stage, args=(pool, to_solve, to_write))
+                    for _ in range(self.workers)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        try:
+            self._write_stage(to_write, progress)
+        finally:
+            self._stop.set()
+            pool.terminate()
+            pool.join()
+            for thread in threads:
+                thread.join()
+            with self._lock: self._save_checkpoint()
+            self.index.close()
+        return dict(self.counts, written=self.written, elapsed=time.perf_counter() - self.begin)
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sinh nhiều level giải được, ghi thành file đánh số hoặc 1 pack")
+    parser.add_argument("--count", type=int, default=10, help="Số level cần ghi (tính cả level đã ghi trước khi bị ngắt)")
+    parser.add_argument("--size", type=int, default=10, help="Số ô mỗi cạnh (mặc định 10)")
+    parser.add_argument("--density", type=int, default=50, help="Mật độ tường, %% (mặc định 50)")
+    parser.add_argument("--prefix", default="gen", help="Tên level: <prefix><size>_<n>.txt (mặc định gen)")
+    parser.add_argument("--pack", help="Ghi vào 1 file pack (tên file trong map/maze, vd. gen10.pack)")
+    parser.add_argument("--seed", type=int, help="Seed gốc (mặc định: từ checkpoint, hoặc ngẫu nhiên)")
+    parser.add_argument("--workers", type=int, help="Số process giải (mặc định: số CPU - 1)")
+    parser.add_argument("--index", default=level_index.INDEX_PATH,
+                        help="File index bỏ trùng (mặc định map/level_index.db)")
+    parser.add_argument("--moves", type=int, nargs=2, metavar=("MIN", "MAX"), help="Số bước của lời giải tối ưu")
+    parser.add_argument("--forced-wait", action="store_true", help="Không thắng được nếu không đứng chờ")
+    parser.add_argument("--difficulty", type=int, default=1, choices=(1, 2, 3),
+                        help="AI của quái khi đo --moves / --forced-wait")
+    args = parser.parse_args()
+
+    target = None
+    if args.moves or args.forced_wait:
+        min_moves, max_moves = args.moves or (0, None)
+        target = maze_generator.LevelTarget(min_moves, max_moves, forced_wait=args.forced_wait,
+                                            difficulty=args.difficulty)
+    pipeline = PackPipeline(args.size, args.density, args.count, args.prefix, args.pack, args.seed, target,
+                            args.workers, index=args.index)
+    if pipeline.watermark:
+        print("Resuming from {} (seed {}, {} candidates done, {} levels written)".format(
+            pipeline.checkpoint, pipeline.seed, pipeline.watermark, pipeline.written), file=sys.stderr)
+
+    def report(record):
+        print("{name}: {written}/{count} written, {generated} generated, {prefiltered} prefiltered, "
+              "{solved} solved, {rejected} rejected, {duplicates} duplicates, {elapsed:.1f}s".format(
+                  count=args.count, **record), file=sys.stderr)
+
+    try:
+        counts = pipeline.run(report)
+    except KeyboardInterrupt:
+        print("Interrupted, progress saved in {}".format(pipeline.checkpoint), file=sys.stderr)
+        sys.exit(1)
+    print("{written} levels in {elapsed:.1f}s ({rate:.1f} candidates/s)".format(
+        rate=counts["generated"] / max(counts["elapsed"], 1e-9), **counts), file=sys.stderr)
@@ -1,12 +1,17 @@
 import pygame
 import os
 import sys
-import re
 import json
+import time
 import graphics
 import characters
+import engine
+import hint_solver
+import solution_cache
 import ascii_game
 import maze_generator  
+import level_pack
+import level_manifest
 
 # --- IMPORT DATABASE ---
 try:
@@ -59,6 +64,9 @@ COLOR_BUTTON_HOVER = (150, 250, 150)
 COLOR_UNDO = (255, 165, 0);
 COLOR_RESET = (255, 69, 0)
 WINDOW_WIDTH, WINDOW_HEIGHT = 494, 480
+# Các cỡ mê cung chọn được ở màn hình Generate Maze (cỡ > 10 dùng ảnh 10x10 thu nhỏ)
+GENERATE_SIZES = [6, 8, 10, 12, 16, 20, 25, 30]
+HINT_EVENT = pygame.USEREVENT + 1  # Kết quả từ thread solver gợi ý (hint_solver.HintSolver)
 
 # --- GLOBAL VARIABLES ---
 game_sounds = {}
@@ -158,34 +166,10 @@ def get_sorted_levels(difficulty=1):
     """
     difficulty = 1 (Easy): Lấy map DỄ (không có chữ 'hard' trong tên).
     difficulty = 2 (Medium) hoặc 3 (Hard): Lấy map KHÓ (có chữ 'hard' trong tên).
+    Danh sách lấy từ manifest (level_manifest.py): chỉ đọc lại file level đã đổi từ lần trước.
+    Level trong file pack (level_pack.py, binary_pack.py) có tên "<file pack>:<tên level>".
     """
-    try:
-        all_files = [f for f in os.listdir(maze_path) if f.endswith('.txt')]
-    except FileNotFoundError:
-        return []
-
-    filtered_files = []
-
-    # Lọc file dựa trên độ khó
-    for f in all_files:
-        is_hard_map = "hard" in f.lower()
-
-        if difficulty == 1:  # Chế độ Easy -> Lấy map gốc
-            if not is_hard_map: filtered_files.append(f)
-
-        else:  # Chế độ Medium (2) hoặc Hard (3) -> Lấy map khó
-            if is_hard_map: filtered_files.append(f)
-
-    def sort_key(filename):
-        numbers = re.findall(r'\d+', filename)
-        if len(numbers) >= 2:
-            return int(numbers[0]), int(numbers[1])
-        elif len(numbers) == 1:
-            return int(numbers[0]), 0
-        return 999, 999
-
-    filtered_files.sort(key=sort_key)
-    return filtered_files
+    return level_manifest.default_manifest().levels("easy" if difficulty == 1 else "hard")
 
 
 def save_game_process(layout_file, explorer, mw, mr, sw, sr, gate, current_idx, difficulty):
@@ -266,8 +250,10 @@ class GameState:
         self.maze_rect = 360
         self.coordinate_screen_x = 67
         self.coordinate_screen_y = 80
-        self.get_input_maze(file_name)
-        self.get_input_object(file_name)
+        pack_lines = level_pack.load_level_lines(file_name, maze_path)
+        # Vị trí cầu thang / bẫy / chìa khóa / cổng lấy từ manifest thay vì quét lại từng ô
+        self.get_input_maze(file_name, pack_lines and pack_lines[0], level_manifest.default_manifest().get(file_name))
+        self.get_input_object(file_name, pack_lines and pack_lines[1])
         if self.gate_position:
             self.gate = {"gate_position": self.gate_position, "isClosed": True, "cellIndex": 0}
         else:
@@ -278,7 +264,7 @@ class GameState:
         self.scorpion_white_direction = ["DOWN"] * len(self.scorpion_white_position)
         self.scorpion_red_direction = ["DOWN"] * len(self.scorpion_red_position)
 
-    def get_input_maze(self, name):
+    def get_input_maze(self, name, lines=None, entry=None):
         self.maze = []
         self.stair_position = ()
         self.key_position = ()
@@ -286,7 +272,10 @@ class GameState:
         self.trap_position = []
         # Tự động tìm đường dẫn
         full_maze_path = os.path.join(maze_path, name)
-        if not os.path.exists(full_maze_path):
+        if lines is not None:
+            # Level trong pack: các dòng đã đọc sẵn
+            self.maze = [list(line) for line in lines]
+        elif not os.path.exists(full_maze_path):
             print(f"Error: Maze file not found: {full_maze_path}")
             # Tạo map rỗng để không crash
             self.maze = ["%" * 13] * 13
@@ -296,6 +285,16 @@ class GameState:
 
         self.maze_size = len(self.maze) // 2
         self.cell_rect = self.maze_rect // self.maze_size
+        # Cỡ không có ảnh riêng (vd. 12x12 -> 30x30) dùng ảnh của cỡ gần nhất, phóng theo sprite_scale
+        self.art_size = graphics.art_size(self.maze_size)
+        self.sprite_scale = graphics.sprite_scale(self.maze_size, self.cell_rect)
+        self.sprite_shift = round(graphics.SPRITE_SHIFT * self.sprite_scale)
+        if entry is not None:
+            self.stair_position = tuple(entry["stair"] or ())
+            self.trap_position = [tuple(p) for p in entry["traps"]]
+            self.key_position = tuple(entry["key"] or ())
+            self.gate_position = tuple(entry["gate"] or ())
+            return
         for i in range(len(self.maze)):
             for j in range(len(self.maze[i])):
                 if self.maze[i][j] == 'S': self.stair_position = (i, j)
@@ -303,7 +302,7 @@ class GameState:
                 if self.maze[i][j] == 'K': self.key_position = (i, j)
                 if self.maze[i][j] == 'G': self.gate_position = (i, j)
 
-    def get_input_object(self, name):
+    def get_input_object(self, name, lines=None):
         self.mummy_white_position = []
         self.mummy_red_position = []
         self.scorpion_white_position = []
@@ -311,21 +310,22 @@ class GameState:
         self.explorer_position = [2, 2]  # Default fallback
 
         full_obj_path = os.path.join(object_path, name)
-        if os.path.exists(full_obj_path):
-            with open(full_obj_path, "r") as file:
-                for line in file:
-                    x = line.split()
-                    if not x: continue
-                    if x[0] == 'E':
-                        self.explorer_position = [int(x[1]), int(x[2])]
-                    elif x[0] == 'MW':
-                        self.mummy_white_position.append([int(x[1]), int(x[2])])
-                    elif x[0] == 'MR':
-                        self.mummy_red_position.append([int(x[1]), int(x[2])])
-                    elif x[0] == 'SW':
-                        self.scorpion_white_position.append([int(x[1]), int(x[2])])
-                    elif x[0] == 'SR':
-                        self.scorpion_red_position.append([int(x[1]), int(x[2])])
+        if lines is not None or os.path.exists(full_obj_path):
+            if lines is None:
+                with open(full_obj_path, "r") as file: lines = file.readlines()
+            for line in lines:
+                x = line.split()
+                if not x: continue
+                if x[0] == 'E':
+                    self.explorer_position = [int(x[1]), int(x[2])]
+                elif x[0] == 'MW':
+                    self.mummy_white_position.append([int(x[1]), int(x[2])])
+                elif x[0] == 'MR':
+                    self.mummy_red_position.append([int(x[1]), int(x[2])])
+                elif x[0] == 'SW':
+                    self.scorpion_white_position.append([int(x[1]), int(x[2])])
+                elif x[0] == 'SR':
+                    self.scorpion_red_position.append([int(x[1]), int(x[2])])
         else:
             print(f"Warning: Agents file not found for {name}")
 
@@ -345,166 +345,67 @@ def load_image_path(size):
 def Cal_coordinates(game, position_x, position_y):
     coordinate_x = game.coordinate_screen_x + game.cell_rect * (position_y // 2)
     coordinate_y = game.coordinate_screen_y + game.cell_rect * (position_x // 2)
-    if game.maze[position_x - 1][position_y] == "%" or game.maze[position_x - 1][position_y] == "G": coordinate_y += 3
+    if game.maze[position_x - 1][position_y] == "%" or game.maze[position_x - 1][position_y] == "G":
+        coordinate_y += game.sprite_shift
     return [coordinate_x, coordinate_y]
 
 
-def character_same_place_with_key(character, key_position, gate, render, screen, game, backdrop, floor, stair,
-                                  stair_position, trap, trap_position, key, gate_sheet, wall, explorer, mummy_white,
-                                  mummy_red, scorpion_white, scorpion_red):
-    if key_position and character.get_x() == key_position[0] and character.get_y() == key_position[1]:
-        gate["isClosed"] = not gate["isClosed"]
-        if render:
-            graphics.gate_animation(screen, game, backdrop, floor, stair, stair_position, trap, trap_position,
-                                    key, key_position, gate_sheet, gate, wall, explorer, mummy_white, mummy_red,
-                                    scorpion_white, scorpion_red)
-        gate["cellIndex"] = 0 if gate["isClosed"] else -1
-    return gate
-
-
-def update_list_character(list_char, list_sheet):
-    i = 0
-    while i < len(list_char):
-        j = 0
-        while j < len(list_char):
-            if j != i and list_char[i].check_same_position(list_char[j]):
-                del list_char[j], list_sheet[j]
-            j += 1
-        i += 1
-    return list_char, list_sheet
-
-
-def update_lists_character(list_strong, list_weak, list_sheet_weak):
-    for i in range(len(list_strong)):
-        j = 0
-        while j < len(list_weak):
-            if list_strong[i].check_same_position(list_weak[j]):
-                del list_weak[j], list_sheet_weak[j]
-            j += 1
-    return list_weak, list_sheet_weak
-
-
-def check_explorer_is_killed(explorer, mw, mr, sw, sr, trap_pos_list):
-    if trap_pos_list:
-        for t in trap_pos_list:
-            if explorer.get_x() == t[0] and explorer.get_y() == t[1]: return True
-    for char_list in [mw, mr, sw, sr]:
-        if char_list:
-            for char in char_list:
-                if explorer.get_x() == char.get_x() and explorer.get_y() == char.get_y(): return True
-    return False
-
-
-def update_enemy_position(window, render, game, backdrop, floor, stair, trap, key, gate, wall, explorer,
-                          explorer_char, mw_char, mr_char, sw_char, sr_char, list_mw, list_mr, list_sw, list_sr):
-    game.gate = character_same_place_with_key(explorer_char, game.key_position, game.gate, render, window, game,
-                                              backdrop, floor, stair, game.stair_position, trap, game.trap_position,
-                                              key, gate, wall, explorer, list_mw, list_mr, list_sw, list_sr)
-
-    if check_explorer_is_killed(explorer_char, mw_char, mr_char, sw_char, sr_char, game.trap_position):
-        if render: pygame.time.delay(500)
-        return "LOSE"
-
-    def move_and_update(char_list, move_func):
-        past_pos, new_pos = [], []
-        for i in range(len(char_list)):
-            past_pos.append([char_list[i].get_x(), char_list[i].get_y()])
-            char_list[i] = move_func(char_list[i], game.maze, game.gate, explorer_char)
-            new_pos.append([char_list[i].get_x(), char_list[i].get_y()])
-        return past_pos, new_pos
-
-    # --- LƯỢT 1 ---
-    mw_past, mw_new = move_and_update(mw_char, lambda c, m, g, e: c.white_move(m, g, e))
-    for i in range(len(mw_char)): game.gate = character_same_place_with_key(mw_char[i], game.key_position, game.gate,
-                                                                            render, window, game, backdrop, floor,
-                                                                            stair, game.stair_position, trap,
-                                                                            game.trap_position, key, gate, wall,
-                                                                            explorer, list_mw, list_mr, list_sw,
-                                                                            list_sr)
-    mr_past, mr_new = move_and_update(mr_char, lambda c, m, g, e: c.red_move(m, g, e))
-    for i in range(len(mr_char)): game.gate = character_same_place_with_key(mr_char[i], game.key_position, game.gate,
-                                                                            render, window, game, backdrop, floor,
-                                                                            stair, game.stair_position, trap,
-                                                                            game.trap_position, key, gate, wall,
-                                                                            explorer, list_mw, list_mr, list_sw,
-                                                                            list_sr)
-    sw_past, sw_new = move_and_update(sw_char, lambda c, m, g, e: c.white_move(m, g, e))
-    for i in range(len(sw_char)): game.gate = character_same_place_with_key(sw_char[i], game.key_position, game.gate,
-                                                                            render, window, game, backdrop, floor,
-                                                                            stair, game.stair_position, trap,
-                                                                            game.trap_position, key, gate, wall,
-                                                                            explorer, list_mw, list_mr, list_sw,
-                                                                            list_sr)
-    sr_past, sr_new = move_and_update(sr_char, lambda c, m, g, e: c.red_move(m, g, e))
-    for i in range(len(sr_char)): game.gate = character_same_place_with_key(sr_char[i], game.key_position, game.gate,
-                                                                            render, window, game, backdrop, floor,
-                                                                            stair, game.stair_position, trap,
-                                                                            game.trap_position, key, gate, wall,
-                                                                            explorer, list_mw, list_mr, list_sw,
-                                                                            list_sr)
-
+def gate_toggled(closed, render, screen, game, backdrop, floor, stair, trap, key, gate_sheet, wall, explorer,
+                 mummy_white, mummy_red, scorpion_white, scorpion_red):
+    game.gate["isClosed"] = bool(closed)
     if render:
-        graphics.enemy_move_animation(mw_past, mw_new, mr_past, mr_new, sw_past, sw_new, sr_past, sr_new, window,
-                                      game, backdrop, floor, stair, game.stair_position, trap, game.trap_position,
-                                      key, game.key_position, gate, game.gate, wall, explorer, list_mw, list_mr,
-                                      list_sw, list_sr)
+        graphics.gate_animation(screen, game, backdrop, floor, stair, game.stair_position, trap, game.trap_position,
+                                key, game.key_position, gate_sheet, game.gate, wall, explorer, mummy_white, mummy_red,
+                                scorpion_white, scorpion_red)
+    game.gate["cellIndex"] = 0 if game.gate["isClosed"] else -1
 
-    if check_explorer_is_killed(explorer_char, mw_char, mr_char, sw_char, sr_char, game.trap_position):
-        if render: pygame.time.delay(500)
-        return "LOSE"
-
-    mw_char, list_mw = update_list_character(mw_char, list_mw)
-    mr_char, list_mr = update_list_character(mr_char, list_mr)
-    if mr_char: mr_char, list_mr = update_lists_character(mw_char, mr_char, list_mr)
-    if sw_char: sw_char, list_sw = update_lists_character(mw_char, sw_char, list_sw)
-    if sr_char: sr_char, list_sr = update_lists_character(mw_char, sr_char, list_sr)
-    if sw_char: sw_char, list_sw = update_lists_character(mr_char, sw_char, list_sw)
-    if sr_char: sr_char, list_sr = update_lists_character(mr_char, sr_char, list_sr)
-    if sr_char: sr_char, list_sr = update_lists_character(sw_char, sr_char, list_sr)
-
-    sw_past, sr_past = sw_new.copy(), sr_new.copy()
-
-    # --- LƯỢT 2 ---
-    mw_past, mw_new = move_and_update(mw_char, lambda c, m, g, e: c.white_move(m, g, e))
-    for i in range(len(mw_char)): game.gate = character_same_place_with_key(mw_char[i], game.key_position, game.gate,
-                                                                            render, window, game, backdrop, floor,
-                                                                            stair, game.stair_position, trap,
-                                                                            game.trap_position, key, gate, wall,
-                                                                            explorer, list_mw, list_mr, list_sw,
-                                                                            list_sr)
-    mr_past, mr_new = move_and_update(mr_char, lambda c, m, g, e: c.red_move(m, g, e))
-    for i in range(len(mr_char)): game.gate = character_same_place_with_key(mr_char[i], game.key_position, game.gate,
-                                                                            render, window, game, backdrop, floor,
-                                                                            stair, game.stair_position, trap,
-                                                                            game.trap_position, key, gate, wall,
-                                                                            explorer, list_mw, list_mr, list_sw,
-                                                                            list_sr)
-
-    if render:
-        graphics.enemy_move_animation(mw_past, mw_new, mr_past, mr_new, sw_past, sw_new, sr_past, sr_new, window,
-                                      game, backdrop, floor, stair, game.stair_position, trap, game.trap_position,
-                                      key, game.key_position, gate, game.gate, wall, explorer, list_mw, list_mr,
-                                      list_sw, list_sr)
 
-    if check_explorer_is_killed(explorer_char, mw_char, mr_char, sw_char, sr_char, game.trap_position):
+def update_enemy_position(window, render, game, level, backdrop, floor, stair, trap, key, gate, wall, explorer,
+                          explorer_char, mw_char, mr_char, sw_char, sr_char, list_mw, list_mr, list_sw, list_sr):
+    # Luật của lượt nằm trong engine.PackedLevel.turn (giống hệt solver); ở đây chỉ phát lại các sự kiện để vẽ
+    chars = (mw_char, mr_char, sw_char, sr_char)
+    sheets = (list_mw, list_mr, list_sw, list_sr)
+    groups = [[level.cell(c.get_x(), c.get_y()) for c in char_list] for char_list in chars]
+    events = []
+    _, alive = level.turn(level.cell(explorer_char.get_x(), explorer_char.get_y()), *groups,
+                          1 if game.gate["isClosed"] else 0, events)
+
+    def current_positions():
+        return [[[c.get_x(), c.get_y()] for c in char_list] for char_list in chars]
+
+    past_pos = current_positions()
+    new_pos = current_positions()
+    for event in events:
+        if event[0] == engine.GATE:
+            gate_toggled(event[1], render, window, game, backdrop, floor, stair, trap, key, gate, wall, explorer,
+                         list_mw, list_mr, list_sw, list_sr)
+        elif event[0] == engine.MOVE:
+            _, index, _, after = event
+            new_pos[index] = [level.position(c) for c in after]
+            for char, (x, y) in zip(chars[index], new_pos[index]):
+                char.move_xy(x, y)
+        elif event[0] == engine.PHASE_END:
+            if render:
+                graphics.enemy_move_animation(past_pos[0], new_pos[0], past_pos[1], new_pos[1], past_pos[2],
+                                              new_pos[2], past_pos[3], new_pos[3], window, game, backdrop, floor,
+                                              stair, game.stair_position, trap, game.trap_position, key,
+                                              game.key_position, gate, game.gate, wall, explorer, list_mw, list_mr,
+                                              list_sw, list_sr)
+        elif event[0] == engine.REMOVE:
+            _, index, j = event
+            del chars[index][j], sheets[index][j]
+        if event[0] in (engine.PHASE_END, engine.REMOVE):
+            past_pos = current_positions()
+            new_pos = current_positions()
+
+    if not alive:
         if render: pygame.time.delay(500)
-        return "LOSE"
-
-    mw_char, list_mw = update_list_character(mw_char, list_mw)
-    mr_char, list_mr = update_list_character(mr_char, list_mr)
-    if mr_char: mr_char, list_mr = update_lists_character(mw_char, mr_char, list_mr)
-    if sw_char: sw_char, list_sw = update_lists_character(mw_char, sw_char, list_sw)
-    if sr_char: sr_char, list_sr = update_lists_character(mw_char, sr_char, list_sr)
-    if sw_char: sw_char, list_sw = update_lists_character(mr_char, sw_char, list_sw)
-    if sr_char: sr_char, list_sr = update_lists_character(mr_char, sr_char, list_sr)
-    if sr_char: sr_char, list_sr = update_lists_character(sw_char, sr_char, list_sr)
-
-    x, y = explorer_char.get_x(), explorer_char.get_y()
-    if game.maze[x - 1][y] == "S" or game.maze[x + 1][y] == "S" or game.maze[x][y - 1] == "S" or game.maze[x][
-        y + 1] == "S":
+        return engine.LOSE
+
+    if level.is_exit[level.cell(explorer_char.get_x(), explorer_char.get_y())]:
         print("=== YOU WIN ===")
-        return "WIN"
-    return "PLAYING"
+        return engine.WIN
+    return engine.PLAYING
 
 
 def draw_text(window, text, size, x, y, color=COLOR_TEXT, center=True):
@@ -704,17 +605,45 @@ def show_score_popup(window, score):
         pygame.display.update()
 
 
-def draw_game_buttons(window, mx, my):
+def draw_game_buttons(window, mx, my, auto_play=False):
     undo_rect = pygame.Rect(WINDOW_WIDTH - 80, 10, 70, 30)
     reset_rect = pygame.Rect(WINDOW_WIDTH - 80, 50, 70, 30)
+    auto_rect = pygame.Rect(WINDOW_WIDTH - 80, 90, 70, 30)
     c_undo = (255, 200, 0) if undo_rect.collidepoint((mx, my)) else COLOR_UNDO
     c_reset = (255, 100, 100) if reset_rect.collidepoint((mx, my)) else COLOR_RESET
+    c_auto = COLOR_BUTTON_HOVER if auto_rect.collidepoint((mx, my)) or auto_play else COLOR_BUTTON
     pygame.draw.rect(window, c_undo, undo_rect, border_radius=5)
     pygame.draw.rect(window, c_reset, reset_rect, border_radius=5)
+    pygame.draw.rect(window, c_auto, auto_rect, border_radius=5)
     font = pygame.font.SysFont("arial", 15, bold=True)
     draw_text(window, "UNDO", 20, undo_rect.centerx, undo_rect.centery, (0, 0, 0))
     draw_text(window, "RESET", 20, reset_rect.centerx, reset_rect.centery, (255, 255, 255))
-    return undo_rect, reset_rect
+    draw_text(window, "STOP" if auto_play else "AUTO", 20, auto_rect.centerx, auto_rect.centery, (0, 0, 0))
+    return undo_rect, reset_rect, auto_rect
+
+
+def draw_hint(window, game, explorer_char, hint, busy, progress=None):
+    # Dòng trạng thái gợi ý (phím H) + khung quanh ô nên đi tới; progress: bản ghi tiến độ mới nhất của solver
+    if busy:
+        text = "HINT: thinking..."
+        if progress:
+            text += " {} states, depth {}".format(progress["visited"], progress["depth"])
+        draw_text(window, text, 18, 10, 10, COLOR_HOVER, center=False)
+        return
+    if not hint: return
+    if hint["status"] == hint_solver.SOLVED:
+        draw_text(window, "HINT: {} ({} moves left)".format(hint["name"], hint["moves"]), 18, 10, 10, COLOR_HOVER,
+                  center=False)
+        x, y = explorer_char.get_x(), explorer_char.get_y()
+        if hint["action"] is not None:
+            x += engine.DIRECTIONS[hint["action"]][0]
+            y += engine.DIRECTIONS[hint["action"]][1]
+        cx, cy = Cal_coordinates(game, x, y)
+        pygame.draw.rect(window, COLOR_HOVER, (cx, cy, game.cell_rect, game.cell_rect), 2)
+    elif hint["status"] == hint_solver.UNSOLVABLE:
+        draw_text(window, "HINT: no way out from here", 18, 10, 10, COLOR_RED, center=False)
+    else:
+        draw_text(window, "HINT: too hard to solve in time", 18, 10, 10, COLOR_RED, center=False)
 
 
 def capture_state(explorer, mw, mr, sw, sr, gate):
@@ -754,19 +683,21 @@ def rungame(window, layout, agent, render, difficulty=1, loaded_data=None, curre
     else:
         game.show_information()
 
-    paths = load_image_path(game.maze_size)
-    backdrop = pygame.image.load(paths[0])
-    floor = pygame.image.load(paths[1])
-    stair = graphics.stairs_spritesheet(paths[6])
-    trap = graphics.trap_spritesheet(paths[5])
-    key = graphics.key_spritesheet(paths[3])
-    gate = graphics.gate_spritesheet(paths[4])
-    wall = graphics.wall_spritesheet(paths[2], game.maze_size)
-    explorer_sheet = graphics.character_spritesheet(paths[7])
-    mummy_white_sheet = graphics.character_spritesheet(paths[8])
-    mummy_red_sheet = graphics.character_spritesheet(paths[9])
-    scorpion_white_sheet = graphics.character_spritesheet(paths[10])
-    scorpion_red_sheet = graphics.character_spritesheet(paths[11])
+    # Ảnh đọc và phóng 1 lần cho mỗi cỡ, các level sau cùng cỡ lấy lại từ cache của graphics
+    paths = load_image_path(game.art_size)
+    scale = game.sprite_scale
+    backdrop = graphics.load_image(paths[0])
+    floor = graphics.load_floor(paths[1], game.maze_size, game.cell_rect)
+    stair = graphics.stairs_spritesheet(paths[6], scale)
+    trap = graphics.trap_spritesheet(paths[5], scale)
+    key = graphics.key_spritesheet(paths[3], scale)
+    gate = graphics.gate_spritesheet(paths[4], scale)
+    wall = graphics.wall_spritesheet(paths[2], game.maze_size, scale)
+    explorer_sheet = graphics.character_spritesheet(paths[7], scale)
+    mummy_white_sheet = graphics.character_spritesheet(paths[8], scale)
+    mummy_red_sheet = graphics.character_spritesheet(paths[9], scale)
+    scorpion_white_sheet = graphics.character_spritesheet(paths[10], scale)
+    scorpion_red_sheet = graphics.character_spritesheet(paths[11], scale)
 
     start_ex = loaded_data["explorer"] if loaded_data else game.explorer_position
     explorer_char = characters.Explorer(start_ex[0], start_ex[1])
@@ -778,11 +709,13 @@ def rungame(window, layout, agent, render, difficulty=1, loaded_data=None, curre
         chars_logic = []
         chars_gfx = []
         count = len(pos_list)
+        patrol_seed = engine.level_patrol_seed(layout)
         use_pos = load_pos_list if (load_pos_list and len(load_pos_list) == count) else pos_list
         for i in range(count):
             p = use_pos[i]
             c_logic = CharClass(p[0], p[1])
             c_logic.set_difficulty(difficulty)
+            c_logic.set_patrol_seed(patrol_seed)
             chars_logic.append(c_logic)
             gfx = {"sprite_sheet": sheet, "coordinates": Cal_coordinates(game, p[0], p[1]), "direction": "DOWN",
                    "cellIndex": 0}
@@ -798,8 +731,72 @@ def rungame(window, layout, agent, render, difficulty=1, loaded_data=None, curre
     sr_char, list_sr = setup_enemies(game.scorpion_red_position, scorpion_red_sheet, characters.scorpion_red,
                                      loaded_data["sr"] if loaded_data else None)
 
+    level = engine.PackedLevel(game.maze, game.key_position, game.trap_position, difficulty,
+                               engine.level_patrol_seed(layout))
     history_stack = []
 
+    # Gợi ý (phím H) / tự chơi (nút AUTO): solver chạy trên thread riêng, kết quả gửi về qua HINT_EVENT
+    # Lời giải được lưu vào solution_cache.json: gợi ý cho trạng thái đã giải trước đó có ngay
+    hints = hint_solver.HintSolver(level, lambda result: pygame.event.post(pygame.event.Event(HINT_EVENT, result)),
+                                   cache=solution_cache.default_cache())
+    hint = None  # Kết quả gợi ý cho trạng thái hiện tại
+    hint_following = False  # Đã bấm H: còn đi theo lời giải thì tự hiện gợi ý tiếp theo
+    auto_play = False
+
+    def current_state():
+        return level.pack(explorer_char, mw_char, mr_char, sw_char, sr_char, game.gate)
+
+    def play_move(move_direction):
+        # 1 lượt: explorer đi theo move_direction ("UP"/"DOWN"/"LEFT"/"RIGHT"/"WAIT") rồi quái đi; trả về trạng thái game
+        history_stack.append(capture_state(explorer_char, mw_char, mr_char, sw_char, sr_char, game.gate))
+        ex, ey = explorer_char.get_x(), explorer_char.get_y()
+        nex, ney = ex, ey
+        moved = False
+        if move_direction == "UP" and explorer_char.eligible_character_move(game.maze, game.gate, ex, ey,
+                                                                            ex - 2, ey):
+            nex -= 2
+            explorer["direction"] = "UP"
+            moved = True
+        elif move_direction == "DOWN" and explorer_char.eligible_character_move(game.maze, game.gate, ex,
+                                                                                ey, ex + 2, ey):
+            nex += 2
+            explorer["direction"] = "DOWN"
+            moved = True
+        elif move_direction == "LEFT" and explorer_char.eligible_character_move(game.maze, game.gate, ex,
+                                                                                ey, ex, ey - 2):
+            ney -= 2
+            explorer["direction"] = "LEFT"
+            moved = True
+        elif move_direction == "RIGHT" and explorer_char.eligible_character_move(game.maze, game.gate, ex,
+                                                                                 ey, ex, ey + 2):
+            ney += 2
+            explorer["direction"] = "RIGHT"
+            moved = True
+        elif move_direction == "WAIT":
+            moved = True
+
+        if not moved: return "PLAYING"
+        if move_direction != "WAIT":
+            play_sfx("move")
+        explorer_char.move(nex, ney, render, window, game, backdrop, floor, stair, game.stair_position,
+                           trap, game.trap_position, key, game.key_position, gate, game.gate, wall,
+                           explorer, list_mw, list_mr, list_sw, list_sr)
+        return update_enemy_position(window, render, game, level, backdrop, floor, stair, trap,
+                                     key, gate, wall, explorer, explorer_char, mw_char, mr_char,
+                                     sw_char, sr_char, list_mw, list_mr, list_sw, list_sr)
+
+    def state_changed():
+        # Lời giải đang chạy cho trạng thái cũ không còn dùng được -> hủy; đã biết lời giải cho trạng thái mới thì dùng lại
+        nonlocal hint, hint_following
+        hints.cancel()
+        hint = None
+        state = current_state()
+        known, _ = hints.next_action(state)
+        if auto_play or (hint_following and known):
+            hints.request(state)
+        else:
+            hint_following = False
+
     if render:
         graphics.draw_screen(window, game.maze, backdrop, floor, game.maze_size, game.cell_rect, stair,
                              game.stair_position, trap, game.trap_position, key, game.key_position, gate, game.gate,
@@ -812,139 +809,190 @@ def rungame(window, layout, agent, render, difficulty=1, loaded_data=None, curre
     last_danger_sound_time = 0
     DANGER_SOUND_COOLDOWN = 3000
 
-    while game_status == "PLAYING":
-        clock.tick(30)
-        mx, my = pygame.mouse.get_pos()
-        if render:
-            graphics.draw_screen(window, game.maze, backdrop, floor, game.maze_size, game.cell_rect, stair,
-                                 game.stair_position, trap, game.trap_position, key, game.key_position, gate, game.gate,
-                                 wall, explorer, list_mw, list_mr, list_sw, list_sr)
-            btn_undo, btn_reset = draw_game_buttons(window, mx, my)
-            pygame.display.update()
+    try:
+        while game_status == "PLAYING":
+            clock.tick(30)
+            mx, my = pygame.mouse.get_pos()
+            if render:
+                graphics.draw_screen(window, game.maze, backdrop, floor, game.maze_size, game.cell_rect, stair,
+                                     game.stair_position, trap, game.trap_position, key, game.key_position, gate,
+                                     game.gate, wall, explorer, list_mw, list_mr, list_sw, list_sr)
+                btn_undo, btn_reset, btn_auto = draw_game_buttons(window, mx, my, auto_play)
+                draw_hint(window, game, explorer_char, hint, hints.is_busy(), hints.progress)
+                pygame.display.update()
 
-        current_time = pygame.time.get_ticks()
-        ex, ey = explorer_char.get_x(), explorer_char.get_y()
-        is_near_danger = False
-        all_enemies = mw_char + mr_char + sw_char + sr_char
-        for enemy in all_enemies:
-            dist = (abs(ex - enemy.get_x()) + abs(ey - enemy.get_y())) // 2
-            if dist <= 2: is_near_danger = True; break
+            current_time = pygame.time.get_ticks()
+            ex, ey = explorer_char.get_x(), explorer_char.get_y()
+            is_near_danger = False
+            all_enemies = mw_char + mr_char + sw_char + sr_char
+            for enemy in all_enemies:
+                dist = (abs(ex - enemy.get_x()) + abs(ey - enemy.get_y())) // 2
+                if dist <= 2: is_near_danger = True; break
+
+            if is_near_danger:
+                if current_time - last_danger_sound_time > DANGER_SOUND_COOLDOWN:
+                    play_sfx("danger")
+                    last_danger_sound_time = current_time
+
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT: return "QUIT"
+                if event.type == HINT_EVENT:
+                    # Bỏ kết quả của trạng thái cũ (người chơi đã đi tiếp / undo trong lúc solver chạy)
+                    if event.state == current_state():
+                        hint = event.dict
+                        if hint["status"] != hint_solver.SOLVED: auto_play = False
+                    continue
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+                    action = draw_save_confirm_popup(window)
+                    if action == "SAVE":
+                        save_game_process(layout, explorer_char, mw_char, mr_char, sw_char, sr_char, game.gate,
+                                          current_level_idx, difficulty)
+                        return "QUIT_TO_MENU"
+                    elif action == "NO_SAVE":
+                        return "QUIT_TO_MENU"
+                    elif action == "CANCEL":
+                        pass
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_h:
+                    hint_following = True
+                    hints.request(current_state())
+                    continue
 
-        if is_near_danger:
-            if current_time - last_danger_sound_time > DANGER_SOUND_COOLDOWN:
-                play_sfx("danger")
-                last_danger_sound_time = current_time
+                if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    if btn_reset.collidepoint((mx, my)): return "RETRY"
+                    if btn_auto.collidepoint((mx, my)):
+                        auto_play = not auto_play
+                        if auto_play:
+                            hints.request(current_state())
+                        continue
+                    if btn_undo.collidepoint((mx, my)):
+                        if history_stack:
+                            prev_state = history_stack.pop()
+                            restore_state(prev_state, explorer_char, mw_char, mr_char, sw_char, sr_char, game.gate,
+                                          game)
+                            explorer["coordinates"] = Cal_coordinates(game, explorer_char.get_x(),
+                                                                      explorer_char.get_y())
+
+                            def refresh_gfx(gfx_list, char_list):
+                                for i in range(min(len(gfx_list), len(char_list))):
+                                    gfx_list[i]["coordinates"] = Cal_coordinates(game, char_list[i].get_x(),
+                                                                                 char_list[i].get_y())
+
+                            refresh_gfx(list_mw, mw_char);
+                            refresh_gfx(list_mr, mr_char)
+                            refresh_gfx(list_sw, sw_char);
+                            refresh_gfx(list_sr, sr_char)
+                            auto_play = False
+                            state_changed()
+                            continue
+
+                if agent == "KeyboardAgent":
+                    move_direction = None
+                    if event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_UP:
+                            move_direction = "UP"
+                        elif event.key == pygame.K_DOWN:
+                            move_direction = "DOWN"
+                        elif event.key == pygame.K_LEFT:
+                            move_direction = "LEFT"
+                        elif event.key == pygame.K_RIGHT:
+                            move_direction = "RIGHT"
+                        elif event.key == pygame.K_SPACE:
+                            move_direction = "WAIT"
+
+                    elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                        if not btn_undo.collidepoint((mx, my)) and not btn_reset.collidepoint((mx, my)):
+                            char_x = explorer["coordinates"][0] + game.cell_rect // 2
+                            char_y = explorer["coordinates"][1] + game.cell_rect // 2
+                            diff_x, diff_y = mx - char_x, my - char_y
+                            if abs(diff_x) > abs(diff_y):
+                                move_direction = "RIGHT" if diff_x > 0 else "LEFT"
+                            else:
+                                move_direction = "DOWN" if diff_y > 0 else "UP"
+
+                    if move_direction:
+                        auto_play = False  # Người chơi tự đi -> dừng tự chơi
+                        game_status = play_move(move_direction)
+                        if game_status != "PLAYING": break
+                        state_changed()
+
+            # Tự chơi: mỗi frame đi 1 nước theo lời giải đã có cho trạng thái hiện tại
+            if auto_play and game_status == "PLAYING" and hint and hint["status"] == hint_solver.SOLVED:
+                game_status = play_move(hint["name"])
+                if game_status == "PLAYING": state_changed()
+
+            if game_status == "WIN":
+                play_sfx("win")
+                pygame.time.delay(1000)
+                return "NEXT_LEVEL"
+            elif game_status == "LOSE":
+                play_sfx("lose")
+                font = pygame.font.SysFont("arial", 50, bold=True)
+                text = font.render("GAME OVER", True, (255, 0, 0))
+                rect = text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
+                window.blit(text, rect);
+                pygame.display.update();
+                pygame.time.delay(2000)
+                return "RETRY"
+    finally:
+        hints.cancel()  # Không để thread solver chạy tiếp sang màn hình khác
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT: return "QUIT"
-            if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
-                action = draw_save_confirm_popup(window)
-                if action == "SAVE":
-                    save_game_process(layout, explorer_char, mw_char, mr_char, sw_char, sr_char, game.gate,
-                                      current_level_idx, difficulty)
-                    return "QUIT_TO_MENU"
-                elif action == "NO_SAVE":
-                    return "QUIT_TO_MENU"
-                elif action == "CANCEL":
-                    pass
+# --- HÀM GENERATE MAZE SCREEN ---
+def wait_for_generation(window, generation):
+    """
+    Màn hình chờ sinh level: vẽ lại + xử lý event mỗi frame trong khi maze_generator.LevelGeneration chạy.
+    Trả về tên file level, "BACK" nếu bấm Escape (hủy), "FAILED" nếu hết thời gian / số lần thử hoặc "QUIT".
+    """
+    progress = {}
+    generation.progress = progress.update  # bản ghi tiến độ solver mới nhất từ các process
+    clock = pygame.time.Clock()
+    try:
+        while True:
+            generated_file = generation.poll()
+            if generated_file is not None: return generated_file
+            if generation.failed: return "FAILED"
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT: return "QUIT"
+                if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: return "BACK"
+
+            pygame.draw.rect(window, COLOR_BG, (0, 360, WINDOW_WIDTH, 80))
+            draw_text(window, "Generating... Please Wait...", 30, WINDOW_WIDTH // 2, 380, (0, 255, 255))
+            status = "{} tries ({:.0f}s) - Escape to cancel".format(
+                generation.attempts, time.perf_counter() - generation.begin)
+            if progress and not progress["done"]:
+                status = "{} tries, checking: {} states".format(generation.attempts, progress["visited"])
+            draw_text(window, status, 18, WINDOW_WIDTH // 2, 410, (180, 180, 180))
+            if generation.relaxation:
+                draw_text(window, "Relaxed: " + generation.relaxation_summary(), 16, WINDOW_WIDTH // 2, 430,
+                          (255, 180, 0))
+            pygame.display.update()
+            clock.tick(30)
+    finally:
+        generation.cancel()
 
-            if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                if btn_reset.collidepoint((mx, my)): return "RETRY"
-                if btn_undo.collidepoint((mx, my)):
-                    if history_stack:
-                        prev_state = history_stack.pop()
-                        restore_state(prev_state, explorer_char, mw_char, mr_char, sw_char, sr_char, game.gate, game)
-                        explorer["coordinates"] = Cal_coordinates(game, explorer_char.get_x(), explorer_char.get_y())
-
-                        def refresh_gfx(gfx_list, char_list):
-                            for i in range(min(len(gfx_list), len(char_list))):
-                                gfx_list[i]["coordinates"] = Cal_coordinates(game, char_list[i].get_x(),
-                                                                             char_list[i].get_y())
-
-                        refresh_gfx(list_mw, mw_char);
-                        refresh_gfx(list_mr, mr_char)
-                        refresh_gfx(list_sw, sw_char);
-                        refresh_gfx(list_sr, sr_char)
-                        continue
 
-            if agent == "KeyboardAgent":
-                move_direction = None
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_UP:
-                        move_direction = "UP"
-                    elif event.key == pygame.K_DOWN:
-                        move_direction = "DOWN"
-                    elif event.key == pygame.K_LEFT:
-                        move_direction = "LEFT"
-                    elif event.key == pygame.K_RIGHT:
-                        move_direction = "RIGHT"
-                    elif event.key == pygame.K_SPACE:
-                        move_direction = "WAIT"
-
-                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-                    if not btn_undo.collidepoint((mx, my)) and not btn_reset.collidepoint((mx, my)):
-                        char_x = explorer["coordinates"][0] + game.cell_rect // 2
-                        char_y = explorer["coordinates"][1] + game.cell_rect // 2
-                        diff_x, diff_y = mx - char_x, my - char_y
-                        if abs(diff_x) > abs(diff_y):
-                            move_direction = "RIGHT" if diff_x > 0 else "LEFT"
-                        else:
-                            move_direction = "DOWN" if diff_y > 0 else "UP"
-
-                if move_direction:
-                    history_stack.append(capture_state(explorer_char, mw_char, mr_char, sw_char, sr_char, game.gate))
-                    ex, ey = explorer_char.get_x(), explorer_char.get_y()
-                    nex, ney = ex, ey
-                    moved = False
-                    if move_direction == "UP" and explorer_char.eligible_character_move(game.maze, game.gate, ex, ey,
-                                                                                        ex - 2, ey):
-                        nex -= 2
-                        explorer["direction"] = "UP"
-                        moved = True
-                    elif move_direction == "DOWN" and explorer_char.eligible_character_move(game.maze, game.gate, ex,
-                                                                                            ey, ex + 2, ey):
-                        nex += 2
-                        explorer["direction"] = "DOWN"
-                        moved = True
-                    elif move_direction == "LEFT" and explorer_char.eligible_character_move(game.maze, game.gate, ex,
-                                                                                            ey, ex, ey - 2):
-                        ney -= 2
-                        explorer["direction"] = "LEFT"
-                        moved = True
-                    elif move_direction == "RIGHT" and explorer_char.eligible_character_move(game.maze, game.gate, ex,
-                                                                                             ey, ex, ey + 2):
-                        ney += 2
-                        explorer["direction"] = "RIGHT"
-                        moved = True
-                    elif move_direction == "WAIT":
-                        moved = True
-
-                    if moved:
-                        if move_direction != "WAIT":
-                            play_sfx("move")
-                        explorer_char.move(nex, ney, render, window, game, backdrop, floor, stair, game.stair_position,
-                                           trap, game.trap_position, key, game.key_position, gate, game.gate, wall,
-                                           explorer, list_mw, list_mr, list_sw, list_sr)
-                        game_status = update_enemy_position(window, render, game, backdrop, floor, stair, trap, key,
-                                                            gate, wall, explorer, explorer_char, mw_char, mr_char,
-                                                            sw_char, sr_char, list_mw, list_mr, list_sw, list_sr)
-
-        if game_status == "WIN":
-            play_sfx("win")
-            pygame.time.delay(1000)
-            return "NEXT_LEVEL"
-        elif game_status == "LOSE":
-            play_sfx("lose")
-            font = pygame.font.SysFont("arial", 50, bold=True)
-            text = font.render("GAME OVER", True, (255, 0, 0))
-            rect = text.get_rect(center=(WINDOW_WIDTH // 2, WINDOW_HEIGHT // 2))
-            window.blit(text, rect);
-            pygame.display.update();
-            pygame.time.delay(2000)
-            return "RETRY"
+def relaxation_notice(window, generation):
+    """
+    Báo level vừa sinh là của điều kiện đã nới (generation.level_relaxation > 0) trước khi chơi.
+    Trả về "PLAY" (Enter / Space / click), "BACK" (Escape) hoặc "QUIT".
+    """
+    summary = generation.relaxation_summary(generation.level_relaxation)
+    clock = pygame.time.Clock()
+    while True:
+        pygame.draw.rect(window, COLOR_BG, (0, 360, WINDOW_WIDTH, 100))
+        draw_text(window, "No maze matched your settings - conditions were relaxed:", 22, WINDOW_WIDTH // 2, 375,
+                  (255, 180, 0))
+        draw_text(window, summary, 22, WINDOW_WIDTH // 2, 400, (255, 180, 0))
+        draw_text(window, "Enter to play, Escape to go back", 18, WINDOW_WIDTH // 2, 430, (180, 180, 180))
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT: return "QUIT"
+            if event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_ESCAPE: return "BACK"
+                if event.key in (pygame.K_RETURN, pygame.K_KP_ENTER, pygame.K_SPACE): return "PLAY"
+            if event.type == pygame.MOUSEBUTTONDOWN: return "PLAY"
+        pygame.display.update()
+        clock.tick(30)
 
 
-# --- HÀM GENERATE MAZE SCREEN ---
 def generate_maze_screen(window):
     # Setup Variables
     selected_size = 6  # Default
@@ -964,11 +1012,10 @@ def generate_maze_screen(window):
         # --- CHỌN KÍCH THƯỚC MÊ CUNG ---
         draw_text(window, "Select Size:", 25, WINDOW_WIDTH // 2, 130, (255, 255, 255))
 
-        sizes = [6, 8, 10]
-        btn_start_x = WINDOW_WIDTH // 2 - 110
-        for i, s in enumerate(sizes):
+        btn_start_x = (WINDOW_WIDTH - (len(GENERATE_SIZES) * 58 - 4)) // 2
+        for i, s in enumerate(GENERATE_SIZES):
             color = (0, 200, 0) if selected_size == s else (100, 100, 100)
-            if draw_button(window, f"{s}x{s}", btn_start_x + i * 80, 150, 60, 30, mx, my, s, color):
+            if draw_button(window, f"{s}x{s}", btn_start_x + i * 58, 150, 54, 30, mx, my, s, color):
                 selected_size = s
 
         # --- NHẬP TỈ LỆ TƯỜNG ---
@@ -987,13 +1034,22 @@ def generate_maze_screen(window):
                 if den < 0: den = 0
                 if den > 100: den = 100
 
-                # Show Loading Text
-                pygame.draw.rect(window, COLOR_BG, (0, 360, WINDOW_WIDTH, 50))
-                draw_text(window, "Generating... Please Wait...", 30, WINDOW_WIDTH // 2, 380, (0, 255, 255))
-                pygame.display.update()
-
-                # CALL GENERATOR
-                generated_file = maze_generator.create_valid_level(selected_size, den)
+                # CALL GENERATOR (chạy trên các process con, màn hình vẫn nhận event trong lúc chờ)
+                generation = maze_generator.LevelGeneration(selected_size, den)
+                generated_file = wait_for_generation(window, generation)
+                if generated_file == "BACK":
+                    message = "Generation cancelled"
+                    continue
+                if generated_file == "FAILED":
+                    message = "No solvable maze found in time - try a lower density"
+                    continue
+                if generated_file != "QUIT" and generation.level_relaxation:
+                    # Level có mật độ / số quái / khoảng cách tới cửa ra khác đã chọn: hỏi trước khi chơi
+                    choice = relaxation_notice(window, generation)
+                    if choice == "QUIT": return "QUIT"
+                    if choice == "BACK":
+                        message = "Relaxed maze discarded"
+                        continue
                 return generated_file  # Trả về tên file để play
 
             except ValueError:
@@ -1,20 +1,41 @@
 import random
 import os
 import sys
+import time
+import hashlib
+import queue
+import signal
+import multiprocessing
+
+# Số state tối đa A* được mở rộng khi kiểm tra 1 ứng viên (vượt quá -> coi như không giải được)
+SOLVE_NODE_BUDGET = 200000
+# Số process sinh ứng viên song song (chừa 1 CPU cho giao diện)
+GENERATION_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Giới hạn mặc định của 1 lần sinh level: hết thời gian (giây) / số ứng viên mà chưa có level thì bỏ cuộc
+GENERATION_TIME_BUDGET = 30.0
+GENERATION_ATTEMPT_BUDGET = 20000
+# Sau mỗi chừng này ứng viên hoặc giây chưa tìm được level thì nới điều kiện thêm 1 bậc (xem relaxed_params);
+# số giây là của map 10x10 trở xuống, map lớn hơn chờ lâu hơn theo cạnh (relax_seconds)
+RELAX_ATTEMPTS = 200
+RELAX_SECONDS = 6.0
 
 try:
     current_dir = os.path.dirname(os.path.abspath(__file__))
     if current_dir not in sys.path: sys.path.append(current_dir)
+    import engine
     import search
-    import characters
 except ImportError:
     pass
 
 
 class MazeGenerator:
-    def __init__(self, size, wall_density):
+    def __init__(self, size, wall_density, seed=None):
         self.size = size  # Ví dụ: 6
         self.density = wall_density / 100.0
+        # Mọi lựa chọn ngẫu nhiên đi qua self.rng: cùng (size, density, seed) -> cùng level.
+        # seed=None: không tái tạo được (random từ hệ thống) như trước
+        self.seed = seed
+        self.rng = random.Random(seed)
 
         # Kích thước thực tế = (Size * 2) + 1
         # Với Size=6 -> 13x13. Viền tường nằm ở index 0 và 12.
@@ -51,7 +72,7 @@ class MazeGenerator:
                     neighbors.append((nr, nc, dr, dc))
 
             if neighbors:
-                nr, nc, dr, dc = random.choice(neighbors)
+                nr, nc, dr, dc = self.rng.choice(neighbors)
 
                 # Đục bức tường nằm GIỮA 2 ô
                 # ô gốc: (2r+1, 2c+1) | ô mới: (2nr+1, 2nc+1)
@@ -80,7 +101,7 @@ class MazeGenerator:
 
         open_ratio = 1.0 - self.density
         num_to_open = int(len(potential_walls) * open_ratio)
-        random.shuffle(potential_walls)
+        self.rng.shuffle(potential_walls)
 
         for i in range(num_to_open):
             wr, wc = potential_walls[i]
@@ -93,16 +114,18 @@ class MazeGenerator:
 
         return self.grid
 
-    def randomize_positions(self, num_enemies):
+    def randomize_positions(self, num_enemies, min_distance=None):
+        # min_distance: explorer phải cách cửa ra hơn chừng này ô (mặc định size // 2)
+        if min_distance is None: min_distance = self.size // 2
         # Lấy danh sách tất cả các ô là ô trống
         all_cells = [(r, c) for r in range(self.size) for c in range(self.size)]
 
         # 1. Chọn vị trí Explorer (Cách xa cửa ra)
         while True:
-            explorer_pos = random.choice(all_cells)
+            explorer_pos = self.rng.choice(all_cells)
             dist = abs(explorer_pos[0] - self.exit_logic_pos[0]) + abs(explorer_pos[1] - self.exit_logic_pos[1])
             # Yêu cầu khoảng cách tối thiểu
-            if dist > self.size // 2: break
+            if dist > min_distance: break
 
         all_cells.remove(explorer_pos)
 
@@ -114,7 +137,7 @@ class MazeGenerator:
         while len(enemies) < num_enemies and attempts < 100:
             attempts += 1
             if not all_cells: break
-            e_pos = random.choice(all_cells)
+            e_pos = self.rng.choice(all_cells)
 
             # Tính khoảng cách
             dist = abs(e_pos[0] - explorer_pos[0]) + abs(e_pos[1] - explorer_pos[1])
@@ -130,104 +153,653 @@ class MazeGenerator:
                     types = ["MW", "MR", "SW", "SR"]
                     weights = [40, 30, 20, 10]
 
-                e_type = random.choices(types, weights=weights, k=1)[0]
+                e_type = self.rng.choices(types, weights=weights, k=1)[0]
                 enemies.append((e_type, e_pos))
                 all_cells.remove(e_pos)
 
         return explorer_pos, enemies
 
+    def agent_lines(self, explorer_pos, enemies):
+        # Các dòng của file agents: tọa độ Logic -> Thực tế (2*x + 1)
+        lines = ["E {} {}".format(2 * explorer_pos[0] + 1, 2 * explorer_pos[1] + 1)]
+        for e_type, pos in enemies:
+            lines.append("{} {} {}".format(e_type, 2 * pos[0] + 1, 2 * pos[1] + 1))
+        return lines
+
+    def fingerprint(self, explorer_pos, enemies):
+        """Hash ổn định của level (nội dung file maze + agents): 2 level giống hệt nhau <=> cùng fingerprint."""
+        return level_fingerprint(self.grid, self.agent_lines(explorer_pos, enemies))
+
     def save_to_files(self, maze_path, agent_path, explorer_pos, enemies):
         os.makedirs(os.path.dirname(maze_path), exist_ok=True)
         os.makedirs(os.path.dirname(agent_path), exist_ok=True)
 
-        # Lưu file Maze
-        with open(maze_path, 'w') as f:
+        # Ghi ra .tmp rồi os.replace, file Agents trước: bị ngắt giữa chừng thì không có file Maze
+        # ghi dở, cũng không có file Maze nào thiếu file Agents
+        with open(agent_path + ".tmp", 'w') as f:
+            for line in self.agent_lines(explorer_pos, enemies):
+                f.write(line + "\n")
+        with open(maze_path + ".tmp", 'w') as f:
             for row in self.grid:
                 f.write("".join(row) + "\n")
-
-        # Lưu file Agents
-        #Convert tọa độ Logic -> Thực tế: (2*x + 1)
-        real_ex_r = 2 * explorer_pos[0] + 1
-        real_ex_c = 2 * explorer_pos[1] + 1
-
-        with open(agent_path, 'w') as f:
-            f.write(f"E {real_ex_r} {real_ex_c}\n")
-            for e_type, pos in enemies:
-                real_r = 2 * pos[0] + 1
-                real_c = 2 * pos[1] + 1
-                f.write(f"{e_type} {real_r} {real_c}\n")
-
-    def is_solvable(self, explorer_pos, enemies):
-        """Kiểm tra xem map có giải được không"""
+        os.replace(agent_path + ".tmp", agent_path)
+        os.replace(maze_path + ".tmp", maze_path)
+
+    def compile(self, explorer_pos, enemies, difficulty=1, patrol_seed=0):
+        """(engine.PackedLevel, trạng thái bắt đầu) của map này với nhân vật đặt theo tọa độ Logic."""
+        level = engine.PackedLevel(self.grid, (), [], difficulty, patrol_seed)
+        groups = {"MW": [], "MR": [], "SW": [], "SR": []}
+        for e_type, pos in enemies:
+            groups[e_type].append(level.cell(2 * pos[0] + 1, 2 * pos[1] + 1))
+        start = level.encode(level.cell(2 * explorer_pos[0] + 1, 2 * explorer_pos[1] + 1),
+                             groups["MW"], groups["MR"], groups["SW"], groups["SR"], False)
+        return level, start
+
+    def is_solvable(self, explorer_pos, enemies, node_budget=None, difficulty=1, patrol_seed=0, progress=None,
+                    should_stop=None, filter_stats=None):
+        """
+        Kiểm tra xem map có giải được không (node_budget: giới hạn số state A* mở rộng).
+        difficulty / patrol_seed: AI của quái mà solver mô phỏng (mặc định Greedy như Mummy gốc)
+        progress: callback nhận bản ghi tiến độ của A* (search.ProgressReporter) khi giải lâu
+        should_stop(): trả về True để bỏ dở (coi như không giải được)
+        Trước A* là các tầng lọc rẻ (static_filter, probe_filter); filter_stats (mặc định FILTER_STATS)
+        đếm số ứng viên mỗi tầng quyết định được và lý do bị loại (REJECTION_REASONS).
+        """
+        stats = filter_stats if filter_stats is not None else FILTER_STATS
         try:
-            # Setup tọa độ thực tế để BFS chạy
-            real_ex_r = 2 * explorer_pos[0] + 1
-            real_ex_c = 2 * explorer_pos[1] + 1
-            explorer = characters.Explorer(real_ex_r, real_ex_c)
-
-            mw, mr, sw, sr = [], [], [], []
-            for e_type, pos in enemies:
-                real_r = 2 * pos[0] + 1
-                real_c = 2 * pos[1] + 1
-
-                # Tạo object quái vật (Difficulty 1 = Greedy Move chuẩn Mummy)
-                enemy_obj = None
-                if e_type == "MW":
-                    enemy_obj = characters.mummy_white(real_r, real_c)
-                elif e_type == "MR":
-                    enemy_obj = characters.mummy_red(real_r, real_c)
-                elif e_type == "SW":
-                    enemy_obj = characters.scorpion_white(real_r, real_c)
-                elif e_type == "SR":
-                    enemy_obj = characters.scorpion_red(real_r, real_c)
-
-                if enemy_obj:
-                    enemy_obj.set_difficulty(1)
-                    if e_type == "MW":
-                        mw.append(enemy_obj)
-                    elif e_type == "MR":
-                        mr.append(enemy_obj)
-                    elif e_type == "SW":
-                        sw.append(enemy_obj)
-                    elif e_type == "SR":
-                        sr.append(enemy_obj)
-
-            gate = {"isClosed": False}
-            path = search.BFS(explorer, mw, mr, sw, sr, gate, [], (), self.grid)
-            return path is not None and len(path) > 0
+            level, start = self.compile(explorer_pos, enemies, difficulty, patrol_seed)
+
+            # Tầng 1: liên thông + trường khoảng cách (không mô phỏng quái)
+            begin = time.perf_counter()
+            route = explorer_route(level, start)
+            verdict = static_filter(level, start, route)
+            stats.record("static", verdict, time.perf_counter() - begin)
+            if verdict is False: stats.reject(static_reason(level, start))
+            if verdict is not None: return verdict
+
+            # Tầng 2: cho explorer đi theo đường ngắn nhất, quái di chuyển thật
+            begin = time.perf_counter()
+            verdict = probe_filter(level, start, route)
+            stats.record("probe", verdict, time.perf_counter() - begin)
+            if verdict is not None: return verdict
+
+            # Tầng 3: giải đầy đủ
+            begin = time.perf_counter()
+            solve_stats = {}
+            path = search.astar_states(level, start, node_budget, solve_stats, should_stop=should_stop,
+                                       progress=progress)
+            solvable = path is not None and len(path) > 0
+            if not solvable and should_stop is not None and should_stop():
+                return False  # bị hủy giữa chừng: không tính vào bộ đếm
+            stats.record("solve", solvable, time.perf_counter() - begin)
+            if not solvable: stats.reject("unsolvable" if solve_stats.get("unsolvable") else "node_budget")
+            return solvable
 
         except Exception as e:
             return False
 
-
-def create_valid_level(size, density):
-    """Hàm tạo level đảm bảo LUÔN GIẢI ĐƯỢC"""
-    project_path = os.path.dirname(os.path.abspath(__file__))
-    maze_file = os.path.join(project_path, "map", "maze", "custom_gen.txt")
-    agent_file = os.path.join(project_path, "map", "agents", "custom_gen.txt")
-
+    def measure(self, explorer_pos, enemies, node_budget=None, difficulty=1, patrol_seed=0, should_stop=None,
+                filter_stats=None):
+        """
+        Số liệu của A* cho ứng viên, hoặc None nếu không giải được / vượt node_budget / bị hủy:
+            moves: số bước của lời giải tối ưu, waits: số lượt đứng chờ trong lời giải đó,
+            expanded: số state A* mở rộng, branching: số state con trung bình của 1 state,
+            forced_wait: False nếu lời giải không cần chờ, None nếu chưa biết (xem wait_is_forced)
+        filter_stats: nếu có, đếm lý do ứng viên bị loại (xem is_solvable).
+        """
+        try:
+            level, start = self.compile(explorer_pos, enemies, difficulty, patrol_seed)
+            if static_filter(level, start, None) is False:
+                if filter_stats is not None: filter_stats.reject(static_reason(level, start))
+                return None
+            stats = {}
+            path = search.astar_states(level, start, node_budget, stats, should_stop)
+            if not path:
+                if filter_stats is not None and not (should_stop is not None and should_stop()):
+                    filter_stats.reject("unsolvable" if stats.get("unsolvable") else "node_budget")
+                return None
+            waits = sum(1 for a, b in zip(path, path[1:]) if a == b)
+            return {"moves": len(path) - 1, "waits": waits, "expanded": stats["expanded"],
+                    "branching": round(stats["generated"] / max(stats["expanded"], 1), 2),
+                    "forced_wait": False if waits == 0 else None}
+        except (MemoryError, ValueError, IndexError):
+            # Hết bộ nhớ khi giải, hoặc grid lỗi khi compile (dòng ngắn / vị trí ngoài maze): bỏ ứng viên
+            return None
+
+    def wait_is_forced(self, explorer_pos, enemies, node_budget=None, difficulty=1, patrol_seed=0, should_stop=None):
+        """True nếu không có lời giải nào không đứng chờ, False nếu có, None nếu vượt node_budget / bị hủy."""
+        level, start = self.compile(explorer_pos, enemies, difficulty, patrol_seed)
+        stats = {}
+        path = search.astar_states(level, start, node_budget, stats, should_stop, allow_wait=False)
+        if path: return False
+        return True if stats["unsolvable"] else None
+
+
+def level_fingerprint(grid, agent_lines):
+    """16 ký tự hex từ các dòng maze + các dòng agents (không phụ thuộc seed hay cách sinh)."""
+    text = "\n".join("".join(row) for row in grid) + "\n#\n" + "\n".join(agent_lines)
+    return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+
+# --- LỌC ỨNG VIÊN TRƯỚC KHI GIẢI ---
+# Mỗi tầng trả về True (chắc chắn giải được), False (chắc chắn không) hoặc None (chưa biết -> tầng sau)
+FILTER_TIERS = ("static", "probe", "solve")
+# Lý do ứng viên bị loại: explorer đứng sẵn trên quái / bẫy, không có đường ra, A* chứng minh không giải được,
+# A* vượt SOLVE_NODE_BUDGET, giải được nhưng ngoài dải LevelTarget
+REJECTION_REASONS = ("start_killed", "no_exit_path", "unsolvable", "node_budget", "off_target")
+
+
+class FilterStats:
+    """
+    Bộ đếm của các tầng lọc trong is_solvable: mỗi tầng đã xét / loại / nhận bao nhiêu ứng viên và mất bao lâu.
+    Thời gian tiết kiệm (ước tính) = số ứng viên bị loại / được nhận trước tầng "solve" x thời gian A* trung bình
+    của 1 ứng viên bị loại / được nhận - thời gian đã tốn cho các tầng lọc.
+    """
+    def __init__(self):
+        self.counts = {tier: {"checked": 0, "rejected": 0, "accepted": 0, "time": 0.0, "rejected_time": 0.0,
+                              "accepted_time": 0.0} for tier in FILTER_TIERS}
+        self.reasons = dict.fromkeys(REJECTION_REASONS, 0)
+
+    def record(self, tier, verdict, elapsed):
+        count = self.counts[tier]
+        count["checked"] += 1
+        count["time"] += elapsed
+        if verdict is True:
+            count["accepted"] += 1
+            count["accepted_time"] += elapsed
+        elif verdict is False:
+            count["rejected"] += 1
+            count["rejected_time"] += elapsed
+
+    def reject(self, reason):
+        self.reasons[reason] += 1
+
+    def merge(self, counts, reasons=None):
+        """Cộng thêm bộ đếm (`counts`, `reasons`) của FilterStats khác, vd. từ process sinh level."""
+        for tier, count in counts.items():
+            for key, value in count.items():
+                self.counts[tier][key] += value
+        for reason, value in (reasons or {}).items():
+            self.reasons[reason] += value
+
+    def time_saved(self):
+        solve = self.counts["solve"]
+        saved = 0.0
+        for verdict in ("accepted", "rejected"):
+            if solve[verdict]:
+                decided = sum(self.counts[t][verdict] for t in FILTER_TIERS if t != "solve")
+                saved += decided * solve[verdict + "_time"] / solve[verdict]
+        return saved - sum(self.counts[t]["time"] for t in FILTER_TIERS if t != "solve")
+
+    def summary(self):
+        parts = ["{} {}/{} rejected, {} accepted ({:.3f}s)".format(
+            tier, c["rejected"], c["checked"], c["accepted"], c["time"]) for tier, c in self.counts.items()]
+        return "; ".join(parts) + "; saved ~{:.2f}s".format(self.time_saved())
+
+    def rejection_summary(self):
+        total = sum(self.reasons.values())
+        return ", ".join("{} {} ({:.0%})".format(reason, n, n / total) for reason, n in self.reasons.items() if n) \
+            or "none"
+
+
+# Bộ đếm mặc định của process này
+FILTER_STATS = FilterStats()
+
+
+def explorer_route(level, start):
+    """Các ô explorer đi qua trên 1 đường ngắn nhất tới lối ra (bỏ qua quái, cổng giữ nguyên), hoặc None."""
+    explorer, _, _, _, _, closed = level.decode(start)
+    dist = level.distance_field(explorer, closed)
+    exits = [c for c in range(len(dist)) if level.is_exit[c] and dist[c] >= 0]
+    if not exits: return None
+    cell = min(exits, key=lambda c: dist[c])
+    route = [cell]
+    moves = level.moves[closed]
+    while cell != explorer:
+        cell = next(nxt for nxt in (moves[cell * 4 + d] for d in range(4)) if nxt >= 0 and dist[nxt] == dist[cell] - 1)
+        route.append(cell)
+    route.reverse()
+    return route
+
+
+def static_filter(level, start, route):
+    """
+    Tầng 1, không mô phỏng lượt nào:
+    False nếu explorer đứng sẵn trên quái / bẫy hoặc không có đường tới lối ra kể cả khi mở cổng;
+    True nếu không có chìa khóa (cổng không đổi), đường ngắn nhất không qua bẫy và không quái nào kịp tới
+    ô thứ i của đường trong i lượt (xác ướp đi 2 bước / lượt, bọ cạp 1 bước).
+    """
+    explorer, mw, mr, sw, sr, closed = level.decode(start)
+    if explorer in level.traps or explorer in mw or explorer in mr or explorer in sw or explorer in sr:
+        return False
+    if level.exit_distance()[explorer] < 0:
+        return False
+    if route is None or level.key >= 0 or any(c in level.traps for c in route):
+        return None
+    for speed, group in ((2, mw), (2, mr), (1, sw), (1, sr)):
+        for enemy in group:
+            # Quái cũng đi theo tường như explorer: khoảng cách tới quái = khoảng cách từ quái
+            dist = level.distance_field(enemy, closed)
+            if any(0 <= dist[c] <= speed * i for i, c in enumerate(route)):
+                return None
+    return True
+
+
+def static_reason(level, start):
+    """Lý do (trong REJECTION_REASONS) static_filter loại ứng viên."""
+    explorer = level.explorer_cell(start)
+    return "no_exit_path" if level.exit_distance()[explorer] < 0 else "start_killed"
+
+
+def probe_filter(level, start, route):
+    """
+    Tầng 2: cho explorer đi đúng đường ngắn nhất, quái di chuyển theo luật thật (engine.PackedLevel.step).
+    True nếu tới được lối ra; thua giữa đường thì chưa kết luận được gì (None).
+    """
+    if route is None: return None
+    state = start
+    for cell, nxt in zip(route, route[1:]):
+        action = engine.DIRECTIONS.index((level.row[nxt] - level.row[cell], level.col[nxt] - level.col[cell]))
+        state, outcome = level.step(state, action)
+        if outcome == engine.WIN: return True
+        if outcome != engine.PLAYING: return None
+    return None
+
+
+class LevelTarget:
+    """
+    Dải độ khó mong muốn cho LevelGeneration, đo bằng MazeGenerator.measure với AI quái `difficulty`.
+    Vd. LevelTarget(min_moves=25, max_moves=40, forced_wait=True): lời giải tối ưu 25-40 bước
+    và không thắng được nếu không đứng chờ ít nhất 1 lượt.
+    """
+    def __init__(self, min_moves=0, max_moves=None, min_waits=0, forced_wait=False, min_nodes=0, max_nodes=None,
+                 difficulty=1):
+        self.min_moves, self.max_moves = min_moves, max_moves
+        self.min_waits = min_waits
+        self.forced_wait = forced_wait
+        self.min_nodes, self.max_nodes = min_nodes, max_nodes
+        self.difficulty = difficulty
+
+    def score(self, metrics):
+        """Khoảng cách tới dải mục tiêu (0 = đạt); dùng để giữ ứng viên gần nhất khi hết thời gian."""
+        def gap(value, low, high):
+            if value < low: return low - value
+            if high is not None and value > high: return value - high
+            return 0
+        score = gap(metrics["moves"], self.min_moves, self.max_moves)
+        score += 2 * gap(metrics["waits"], self.min_waits, None)
+        if self.forced_wait and not metrics["forced_wait"]:
+            score += 5
+        if self.min_nodes or self.max_nodes is not None:
+            score += 10 * gap(metrics["expanded"], self.min_nodes, self.max_nodes) / max(self.min_nodes, 1)
+        return score
+
+    def matches(self, metrics):
+        return self.score(metrics) == 0
+
+    def __str__(self):
+        parts = ["moves {}-{}".format(self.min_moves, "" if self.max_moves is None else self.max_moves)]
+        if self.min_waits: parts.append("waits >= {}".format(self.min_waits))
+        if self.forced_wait: parts.append("forced wait")
+        if self.min_nodes or self.max_nodes is not None:
+            parts.append("nodes {}-{}".format(self.min_nodes, "" if self.max_nodes is None else self.max_nodes))
+        return ", ".join(parts)
+
+
+def enemy_count(size):
     num_enemies = 1
     if size >= 8: num_enemies = 2
     if size >= 10: num_enemies = 3
-
-    attempts = 0
-    while True:
-        # 1. Tạo cấu trúc tường
-        gen = MazeGenerator(size, density)
-        gen.generate()
-
-        # 2. Thử đặt nhân vật 10 lần trên map này
-        for _ in range(10):
-            ex_pos, enemies = gen.randomize_positions(num_enemies)
-
-            # 3. Check giải được không
-            if gen.is_solvable(ex_pos, enemies):
-                print(f"MAZE GEN: Found solvable map after {attempts} tries.")
-                gen.save_to_files(maze_file, agent_file, ex_pos, enemies)
-                return "custom_gen.txt"
-
-            attempts += 1
-            if attempts % 50 == 0:
-                print(f"Generating... ({attempts} tries)")
-
-
+    if size >= 12: num_enemies = size // 4  # Mê cung lớn: 12x12 -> 3 quái ... 30x30 -> 7 quái
+    return num_enemies
+
+
+# Thứ tự nới điều kiện khi khó tìm level: bớt 1 quái, giảm mật độ tường RELAX_DENSITY_STEP %,
+# giảm một nửa khoảng cách tối thiểu từ explorer tới cửa ra; rồi lặp lại
+RELAX_STEPS = ("enemies", "density", "distance")
+RELAX_DENSITY_STEP = 10
+
+
+def relaxed_params(size, density, relaxation=0):
+    """(mật độ tường, số quái, khoảng cách tối thiểu explorer - cửa ra) sau `relaxation` bậc nới điều kiện."""
+    enemies, distance = enemy_count(size), size // 2
+    for i in range(relaxation):
+        step = RELAX_STEPS[i % len(RELAX_STEPS)]
+        if step == "enemies": enemies = max(1, enemies - 1)
+        elif step == "density": density = max(0, density - RELAX_DENSITY_STEP)
+        else: distance //= 2
+    return density, enemies, distance
+
+
+def relax_seconds(size):
+    """Số giây chưa có level trước khi nới 1 bậc: RELAX_SECONDS, tăng theo cạnh với map lớn hơn 10x10."""
+    return RELAX_SECONDS * max(1.0, size / 10)
+
+
+def generate_level(size, density, seed, relaxation=0):
+    """
+    Level ứng viên xác định hoàn toàn bởi (size, density, seed, relaxation): (MazeGenerator, vị trí explorer, quái).
+    Dùng để sinh lại đúng level đã thấy (vd. từ seed in ra khi sinh) mà không cần lưu file.
+    relaxation: số bậc nới điều kiện (relaxed_params); 0 = đúng tham số đã chọn.
+    """
+    density, num_enemies, distance = relaxed_params(size, density, relaxation)
+    gen = MazeGenerator(size, density, seed)
+    gen.generate()
+    explorer_pos, enemies = gen.randomize_positions(num_enemies, distance)
+    return gen, explorer_pos, enemies
+
+
+# --- SINH SONG SONG ---
+# Mỗi process gửi bộ đếm lọc của mình về sau mỗi chừng này ứng viên (và khi tìm được level)
+FILTER_REPORT_INTERVAL = 10
+
+# Biến dùng chung của process con, gán 1 lần trong _init_worker (Pool không cho truyền Event / Queue qua task)
+_stop = None
+_attempts = None
+_results = None
+_relax = None  # Bậc nới điều kiện hiện tại, do LevelGeneration.poll tăng dần
+
+
+def _init_worker(stop, attempts, results, relax):
+    global _stop, _attempts, _results, _relax
+    # Process con được fork từ giao diện: bỏ handler SIGTERM của SDL (chỉ đẩy event QUIT) để cancel() dừng được nó
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _stop, _attempts, _results, _relax = stop, attempts, results, relax
+
+
+def _report_filters(filter_stats):
+    # Gửi phần chênh lệch; nơi gọi đếm lại từ 0
+    _results.put(("filters", (filter_stats.counts, filter_stats.reasons)))
+
+
+def _generation_worker(size, density, seed, stride):
+    # Sinh + kiểm tra ứng viên seed, seed + stride, ... cho đến khi có 1 level giải được (ở process này
+    # hoặc process khác). Mỗi process có 1 offset riêng trong cùng stride nên không process nào thử trùng seed.
+    def progress(record):
+        # Bản ghi cuối (done) của mỗi ứng viên không cần gửi: số ứng viên đã có trong _attempts
+        if not record["done"]: _results.put(("progress", record))
+
+    filter_stats = FilterStats()
+    checked = 0
+    while not _stop.is_set():
+        relaxation = _relax.value
+        gen, ex_pos, enemies = generate_level(size, density, seed, relaxation)
+        solvable = gen.is_solvable(ex_pos, enemies, SOLVE_NODE_BUDGET, progress=progress, should_stop=_stop.is_set,
+                                   filter_stats=filter_stats)
+        checked += 1
+        if solvable or checked % FILTER_REPORT_INTERVAL == 0:
+            _report_filters(filter_stats)
+            filter_stats = FilterStats()
+        if solvable:
+            _stop.set()
+            _results.put(("found", (seed, None, relaxation)))
+            return
+        with _attempts.get_lock():
+            _attempts.value += 1
+        seed += stride
+
+
+def _target_worker(size, density, seed, stride, target):
+    # Như _generation_worker nhưng chấm điểm ứng viên theo `target` (LevelTarget); gửi về ứng viên tốt nhất
+    # của process này mỗi khi nó tốt hơn để LevelGeneration còn có cái để dùng khi hết thời gian
+    best = None
+    filter_stats = FilterStats()
+    checked = 0
+    while not _stop.is_set():
+        relaxation = _relax.value
+        gen, ex_pos, enemies = generate_level(size, density, seed, relaxation)
+        metrics = gen.measure(ex_pos, enemies, SOLVE_NODE_BUDGET, target.difficulty, should_stop=_stop.is_set,
+                              filter_stats=filter_stats)
+        checked += 1
+        if metrics is not None:
+            # Kiểm tra "bắt buộc chờ" tốn thêm 1 lần giải nên chỉ làm khi mọi tiêu chí khác đã đạt
+            if metrics["forced_wait"] is None and target.forced_wait and target.matches(dict(metrics, forced_wait=True)):
+                metrics["forced_wait"] = gen.wait_is_forced(ex_pos, enemies, SOLVE_NODE_BUDGET, target.difficulty,
+                                                            should_stop=_stop.is_set)
+            score = target.score(metrics)
+            if score == 0:
+                _report_filters(filter_stats)
+                _stop.set()
+                _results.put(("found", (seed, metrics, relaxation)))
+                return
+            filter_stats.reject("off_target")
+            if best is None or score < best:
+                best = score
+                _results.put(("candidate", (seed, score, metrics, relaxation)))
+        if checked % FILTER_REPORT_INTERVAL == 0:
+            _report_filters(filter_stats)
+            filter_stats = FilterStats()
+        with _attempts.get_lock():
+            _attempts.value += 1
+        seed += stride
+
+
+class LevelGeneration:
+    """
+    Sinh level trên `workers` process, không chặn thread gọi: gọi poll() định kỳ (vd. mỗi frame)
+    cho đến khi nó trả về tên file level. Ứng viên giải được đầu tiên thắng, các process còn lại bị dừng.
+    progress: callback nhận bản ghi tiến độ solver từ các process (kèm "attempts"), được gọi trong poll().
+    seed: seed đầu của dãy ứng viên (mặc định ngẫu nhiên). Khi xong, self.level_seed / self.level_relaxation
+    là seed và bậc nới điều kiện của level thắng (generate_level(size, density, level_seed, level_relaxation)
+    sinh lại đúng nó) và self.fingerprint là hash nội dung level.
+    self.filter_stats: bộ đếm các tầng lọc và lý do loại ứng viên, cộng từ mọi process (gửi về sau mỗi
+    FILTER_REPORT_INTERVAL ứng viên, nên có thể thiếu vài ứng viên cuối của process bị dừng).
+    target: LevelTarget -> chỉ nhận level trong dải mục tiêu. self.metrics: số liệu solver của level được chọn.
+    time_budget / attempt_budget (None = không giới hạn): hết giây / số ứng viên mà chưa có level thì lấy
+    ứng viên gần mục tiêu nhất nếu có, không thì bỏ cuộc: self.failed = True và poll() trả về None mãi.
+    relax: sau mỗi RELAX_ATTEMPTS ứng viên bị loại hoặc relax_seconds(size) giây (có ít nhất 1 ứng viên bị
+    loại) chưa có level (chế độ target: chưa có ứng viên giải được nào) thì nới thêm 1 bậc (relaxed_params);
+    self.relaxations ghi lại các bậc đã áp dụng, self.level_relaxation > 0 nếu level thắng sinh sau khi nới.
+    """
+    def __init__(self, size, density, workers=None, progress=None, maze_file=None, agent_file=None, seed=None,
+                 target=None, time_budget=GENERATION_TIME_BUDGET, attempt_budget=GENERATION_ATTEMPT_BUDGET, relax=True):
+        project_path = os.path.dirname(os.path.abspath(__file__))
+        self.maze_file = maze_file or os.path.join(project_path, "map", "maze", "custom_gen.txt")
+        self.agent_file = agent_file or os.path.join(project_path, "map", "agents", "custom_gen.txt")
+        self.size = size
+        self.density = density
+        self.seed = seed if seed is not None else random.randrange(1 << 32)
+        self.progress = progress
+        self.result = None  # tên file level khi đã tìm được
+        self.failed = False  # True khi hết time_budget / attempt_budget mà không có level
+        self.level_seed = None
+        self.level_relaxation = 0
+        self.fingerprint = None
+        self.metrics = None
+        self.target = target
+        self.time_budget = time_budget
+        self.attempt_budget = attempt_budget
+        self.relax = relax
+        self.relaxation = 0  # bậc nới điều kiện hiện tại của các process
+        self.relaxations = []  # (bậc, (mật độ, số quái, khoảng cách), số ứng viên đã loại, giây) mỗi lần nới
+        self.best = None  # (điểm, seed, số liệu, bậc nới) của ứng viên gần mục tiêu nhất
+        self.filter_stats = FilterStats()
+        self.begin = time.perf_counter()
+        self._relaxed_at = (0, self.begin)  # (attempts, thời điểm) của lần nới gần nhất
+        workers = workers or GENERATION_WORKERS
+        self._stop = multiprocessing.Event()
+        self._attempts = multiprocessing.Value("i", 0)
+        self._relax = multiprocessing.Value("i", 0)
+        self._results = multiprocessing.Queue()
+        self._pool = multiprocessing.Pool(workers, _init_worker,
+                                          (self._stop, self._attempts, self._results, self._relax))
+        for i in range(workers):
+            if target is None:
+                self._pool.apply_async(_generation_worker, (size, density, self.seed + i, workers))
+            else:
+                self._pool.apply_async(_target_worker, (size, density, self.seed + i, workers, target))
+        self._pool.close()
+
+    @property
+    def attempts(self):
+        """Số ứng viên đã bị loại (cộng dồn mọi process)."""
+        return self._attempts.value
+
+    def relaxation_summary(self, relaxation=None):
+        """Các tham số đã nới ở bậc `relaxation` (mặc định bậc hiện tại), vd. "enemies 3->2, density 50->40"."""
+        relaxation = self.relaxation if relaxation is None else relaxation
+        before = relaxed_params(self.size, self.density)
+        after = relaxed_params(self.size, self.density, relaxation)
+        return ", ".join("{} {}->{}".format(name, old, new)
+                         for name, old, new in zip(("density", "enemies", "distance"), before, after)
+                         if old != new) or "none"
+
+    def summary(self):
+        """Số ứng viên đã đánh giá, tốc độ (ứng viên/giây), lý do bị loại và điều kiện đã nới."""
+        # Ứng viên thắng không nằm trong attempts (trừ khi được chọn vì hết thời gian)
+        matched = self.result is not None and (self.target is None or self.target.matches(self.metrics))
+        evaluated = self.attempts + (1 if matched else 0)
+        elapsed = time.perf_counter() - self.begin
+        relaxation = self.level_relaxation if self.result is not None else self.relaxation
+        return "{} candidates in {:.1f}s ({:.1f}/s); rejected: {}; relaxed: {}".format(
+            evaluated, elapsed, evaluated / max(elapsed, 1e-9), self.filter_stats.rejection_summary(),
+            self.relaxation_summary(relaxation))
+
+    def poll(self):
+        """Tên file level (trong map/maze) nếu đã sinh xong, None nếu chưa (hoặc đã bỏ cuộc, xem self.failed)."""
+        if self.result is not None or self.failed: return self.result
+        while True:
+            try:
+                kind, value = self._results.get_nowait()
+            except queue.Empty:
+                return self._check_budget()
+            if kind == "progress":
+                if self.progress is not None:
+                    self.progress(dict(value, attempts=self.attempts))
+                continue
+            if kind == "filters":
+                self.filter_stats.merge(*value)
+                continue
+            if kind == "candidate":
+                if self.best is None or value[1] < self.best[0]:
+                    self.best = (value[1], value[0], value[2], value[3])
+                continue
+            return self._finish(*value)
+
+    def _check_budget(self):
+        # Hết thời gian / số ứng viên -> lấy ứng viên gần nhất hoặc bỏ cuộc; chưa hết -> nới điều kiện nếu cần
+        now = time.perf_counter()
+        expired = self.time_budget is not None and now - self.begin > self.time_budget
+        exhausted = self.attempt_budget is not None and self.attempts >= self.attempt_budget
+        if expired or exhausted:
+            reason = "time budget expired" if expired else "attempt budget exhausted"
+            if self.best is not None:
+                print(f"MAZE GEN: {reason}, taking the closest candidate (score {self.best[0]}).")
+                return self._finish(self.best[1], self.best[2], self.best[3])
+            self.cancel()
+            self.failed = True
+            print(f"MAZE GEN: {reason}, no valid level: size {self.size}, density {self.density}.")
+            if self.target is None:
+                print(f"MAZE GEN: filters: {self.filter_stats.summary()}")
+            print(f"MAZE GEN: {self.summary()}")
+            return None
+        if self.relax and self.best is None:
+            attempts, relaxed_time = self._relaxed_at
+            # Theo thời gian chỉ khi đã có ứng viên bị loại: ứng viên đầu của map lớn có thể giải lâu
+            rejected = self.attempts - attempts
+            if rejected >= RELAX_ATTEMPTS or (rejected and now - relaxed_time >= relax_seconds(self.size)):
+                self._relax_step(now)
+        return None
+
+    def _relax_step(self, now):
+        # Bậc kế tiếp thật sự đổi tham số (bước đã chạm đáy, vd. còn 1 quái, thì bỏ qua)
+        self._relaxed_at = (self.attempts, now)
+        current = relaxed_params(self.size, self.density, self.relaxation)
+        for relaxation in range(self.relaxation + 1, self.relaxation + len(RELAX_STEPS) + 1):
+            params = relaxed_params(self.size, self.density, relaxation)
+            if params != current: break
+        else:
+            return  # Đã nới hết mức
+        self.relaxation = self._relax.value = relaxation
+        self.relaxations.append((relaxation, params, self.attempts, now - self.begin))
+        print(f"MAZE GEN: relaxing after {self.attempts} tries ({now - self.begin:.1f}s): "
+              f"{self.relaxation_summary()}.")
+
+    def _finish(self, seed, metrics, relaxation=0):
+        self.cancel()
+        self.level_seed = seed
+        self.level_relaxation = relaxation
+        self.metrics = metrics
+        gen, ex_pos, enemies = generate_level(self.size, self.density, self.level_seed, relaxation)
+        self.fingerprint = gen.fingerprint(ex_pos, enemies)
+        gen.save_to_files(self.maze_file, self.agent_file, ex_pos, enemies)
+        self.result = os.path.basename(self.maze_file)
+        print(f"MAZE GEN: Found solvable map after {self.attempts} tries "
+              f"({time.perf_counter() - self.begin:.1f}s): size {self.size}, density {self.density}, "
+              f"seed {self.level_seed}, relaxation {relaxation}, fingerprint {self.fingerprint}.")
+        if self.target is None:
+            print(f"MAZE GEN: filters: {self.filter_stats.summary()}")
+        else:
+            print(f"MAZE GEN: target {self.target}: {metrics}")
+        print(f"MAZE GEN: {self.summary()}")
+        return self.result
+
+    def cancel(self):
+        """Dừng mọi process sinh level (gọi khi đã có kết quả hoặc người chơi bỏ ngang)."""
+        if self._pool is None: return
+        self._stop.set()
+        self._pool.terminate()
+        self._pool.join()
+        self._pool = None
+
+
+def create_valid_level(size, density, progress=None, workers=None, seed=None, target=None,
+                       time_budget=GENERATION_TIME_BUDGET, attempt_budget=GENERATION_ATTEMPT_BUDGET, relax=True):
+    """
+    Hàm tạo level GIẢI ĐƯỢC (chặn cho đến khi xong; giao diện dùng LevelGeneration.poll).
+    Trả về tên file level, hoặc None nếu hết time_budget / attempt_budget mà không tìm được.
+    progress: callback nhận bản ghi tiến độ của solver (search.ProgressReporter) kèm "attempts" = số ứng viên đã loại
+    seed / target / time_budget / attempt_budget / relax: xem LevelGeneration
+    """
+    generation = LevelGeneration(size, density, workers, progress, seed=seed, target=target, time_budget=time_budget,
+                                 attempt_budget=attempt_budget, relax=relax)
+    try:
+        while not generation.failed:
+            result = generation.poll()
+            if result is not None: return result
+            time.sleep(0.01)
+        return None
+    finally:
+        generation.cancel()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sinh 1 level giải được (tùy chọn: theo dải độ khó) vào map/")
+    parser.add_argument("--size", type=int, default=10, help="Số ô mỗi cạnh (mặc định 10)")
+    parser.add_argument("--density", type=int, default=50, help="Mật độ tường, %% (mặc định 50)")
+    parser.add_argument("--seed", type=int, help="Seed đầu của dãy ứng viên (mặc định ngẫu nhiên)")
+    parser.add_argument("--workers", type=int, help="Số process (mặc định: số CPU - 1)")
+    parser.add_argument("--name", default="custom_gen.txt", help="Tên file level trong map/maze + map/agents")
+    parser.add_argument("--moves", type=int, nargs=2, metavar=("MIN", "MAX"), help="Số bước của lời giải tối ưu")
+    parser.add_argument("--waits", type=int, default=0, help="Số lượt đứng chờ tối thiểu trong lời giải tối ưu")
+    parser.add_argument("--forced-wait", action="store_true", help="Không thắng được nếu không đứng chờ")
+    parser.add_argument("--nodes", type=int, nargs=2, metavar=("MIN", "MAX"), help="Số state A* phải mở rộng")
+    parser.add_argument("--difficulty", type=int, default=1, choices=(1, 2, 3),
+                        help="AI của quái khi đo độ khó (1 Greedy, 2 Chase, 3 Zone + đi tuần)")
+    parser.add_argument("--time", type=float, default=GENERATION_TIME_BUDGET,
+                        help="Giây tối đa; hết giờ thì lấy ứng viên gần mục tiêu nhất hoặc bỏ cuộc (0 = không giới hạn)")
+    parser.add_argument("--attempts", type=int, default=GENERATION_ATTEMPT_BUDGET,
+                        help="Số ứng viên tối đa, như --time (0 = không giới hạn)")
+    parser.add_argument("--no-relax", action="store_true",
+                        help="Không tự bớt quái / giảm mật độ / gần cửa ra hơn khi khó tìm level")
+    args = parser.parse_args()
+
+    target = None
+    if args.moves or args.waits or args.forced_wait or args.nodes:
+        min_moves, max_moves = args.moves or (0, None)
+        min_nodes, max_nodes = args.nodes or (0, None)
+        target = LevelTarget(min_moves, max_moves, args.waits, args.forced_wait, min_nodes, max_nodes, args.difficulty)
+    project_path = os.path.dirname(os.path.abspath(__file__))
+    generation = LevelGeneration(args.size, args.density, args.workers, seed=args.seed, target=target,
+                                 time_budget=args.time or None, attempt_budget=args.attempts or None,
+                                 relax=not args.no_relax,
+                                 maze_file=os.path.join(project_path, "map", "maze", args.name),
+                                 agent_file=os.path.join(project_path, "map", "agents", args.name))
+    try:
+        while generation.poll() is None and not generation.failed:
+            time.sleep(0.01)
+    finally:
+        generation.cancel()
+    sys.exit(1 if generation.failed else 0)
@@ -1,10 +1,24 @@
-import characters
+import heapq
+import sys
+import time
+from array import array
+# The turn rules live in engine; search only runs the solvers over engine.PackedLevel
+from engine import ACTIONS, DIRECTIONS, PackedLevel
+from engine import MUMMY_WHITE, MUMMY_RED, SCORPION_WHITE, SCORPION_RED, FIRST_COLLISIONS, SECOND_COLLISIONS
+
+try:
+    import numpy as np  # Optional, only bfs_layers needs it
+except ImportError:
+    np = None
 
 class Queue:
-    default_capacity = 100000000
+    # _data / _trace grow with the number of states actually pushed;
+    # _trace[i] is the index of the parent of _data[i] (-1 for the root)
+    # _visited maps the hashable key of every state ever pushed -> its index in _data
     def __init__(self):
-        self._data = [None] * Queue.default_capacity
-        self._trace = [None]* Queue.default_capacity
+        self._data = []
+        self._trace = []
+        self._visited = {}
         self._size = 0
         self._front = 0
 
@@ -17,382 +31,654 @@ class Queue:
 
     def pop(self):
         if self.is_empty():
-            print("Queue is empty!")
-        else:
-            ans = self._data[self._front]
-            self._front += 1
-            self._size -= 1
+            return None
+        ans = self._data[self._front]
+        self._front += 1
+        self._size -= 1
         return ans
 
-    def push(self, element):
-        position = self._front + self._size
-        self._data[position] = element
+    def __contains__(self, key):
+        return key in self._visited
+
+    def push(self, element, key=None):
+        if key is None:
+            key = element
+        self._visited[key] = len(self._data)
+        self._data.append(element)
+        self._trace.append(self._front - 1)
         self._size += 1
-        self._trace[position] = self._front - 1
-    def trace_back(self):
-        print("NUMBER NODE HAVE EXPANDED: {}".format(self._front + self._size))
+
+    def trace_back(self, position=None):
+        # position(element) -> explorer [x, y]; default reads the character object at element[0]
+        # (the number of states pushed is len(self._data); solvers report it through stats / progress)
         ans = []
         p = self._front - 1
         while p != self._trace[0]:
-            ans.append([self._data[p][0].get_x(), self._data[p][0].get_y()])
+            if position:
+                ans.append(position(self._data[p]))
+            else:
+                ans.append([self._data[p][0].get_x(), self._data[p][0].get_y()])
             p = self._trace[p]
         return ans
 
-    def check_exists_element_in_queue(self, explorer, mummy_white, mummy_red, scorpion_white, scorpion_red, gate):
-        is_exists = False
-        for i in range(self._front + self._size):
-            if self._data[i][0].get_x() != explorer.get_x() or self._data[i][0].get_y() != explorer.get_y():
-                continue
-            if len(self._data[i][1]) != len(mummy_white):
-                continue
-            else:
-                next = False
-                for j in range(len(mummy_white)):
-                    if self._data[i][1][j].get_x() != mummy_white[j].get_x() or self._data[i][1][j].get_y() != mummy_white[j].get_y():
-                        next = True
-                        break
-                if next:
-                    continue
-            if len(self._data[i][2]) != len(mummy_red):
-                continue
-            else:
-                next = False
-                for j in range(len(mummy_red)):
-                    if self._data[i][2][j].get_x() != mummy_red[j].get_x() or self._data[i][2][j].get_y() != mummy_red[j].get_y():
-                        next = True
-                        break
-                if next:
-                    continue
-            if len(self._data[i][3]) != len(scorpion_white):
-                continue
-            else:
-                next = False
-                for j in range(len(scorpion_white)):
-                    if self._data[i][3][j].get_x() != scorpion_white[j].get_x() or self._data[i][3][j].get_y() != scorpion_white[j].get_y():
-                        next = True
-                        break
-                if next:
-                    continue
-            if len(self._data[i][4]) != len(scorpion_red):
-                continue
+class PriorityQueue:
+    # Same _data / _trace parent-pointer layout as Queue, but pop() returns
+    # the element with the lowest priority (ties: first pushed first)
+    def __init__(self):
+        self._data = []
+        self._trace = []
+        self._heap = []
+        self._current = -1
+
+    def __len__(self):
+        return len(self._heap)
+
+    def is_empty(self):
+        return not self._heap
+
+    def pop(self):
+        if self.is_empty():
+            return None
+        _, self._current = heapq.heappop(self._heap)
+        return self._data[self._current]
+
+    def push(self, element, priority):
+        # The parent is the element popped last
+        heapq.heappush(self._heap, (priority, len(self._data)))
+        self._data.append(element)
+        self._trace.append(self._current)
+
+    def trace_back(self, position=None):
+        ans = []
+        p = self._current
+        while p != -1:
+            if position:
+                ans.append(position(self._data[p]))
             else:
-                next = False
-                for j in range(len(scorpion_red)):
-                    if self._data[i][4][j].get_x() != scorpion_red[j].get_x() or self._data[i][4][j].get_y() != scorpion_red[j].get_y():
-                        next = True
-                        break
-                if next:
-                    continue
-            if self._data[i][5] and self._data[i][5]["isClosed"] != gate["isClosed"]:
-                continue
-            is_exists = True
-            break
-        return is_exists
-
-def check_key_position(character, gate, key_position):
-    if key_position and character.get_x() == key_position[0] and character.get_y() == key_position[1]:
-        if gate["isClosed"]:
-            gate["isClosed"] = False
-        else:
-            gate["isClosed"] = True
-    return gate
-
-def update_list_character(list_character):
-    i = 0
-    while i < len(list_character):
-        j = 0
-        while j < len(list_character):
-            if j != i and list_character[i].check_same_position(list_character[j]):
-                del list_character[j]
-            j += 1
-        i += 1
-    return list_character
-
-def update_lists_character(list_strong_scharacter, list_week_scharacter):
-    for i in range(len(list_strong_scharacter)):
-        j = 0
-        while j < len(list_week_scharacter):
-            if list_strong_scharacter[i].check_same_position(list_week_scharacter[j]):
-                del list_week_scharacter[j]
-            j += 1
-    return list_week_scharacter
-
-def check_explorer_is_killed(explorer_character, mummy_white_character, mummy_red_character, scorpion_white_character,
-                            scorpion_red_character, trap_position):
-    if trap_position and explorer_character.get_x() == trap_position[0] and explorer_character.get_y() == trap_position[1]:
-        return True
-    if mummy_white_character:
-        for i in range(len(mummy_white_character)):
-            if explorer_character.get_x() == mummy_white_character[i].get_x() and explorer_character.get_y() == mummy_white_character[i].get_y():
-                return True
-    if mummy_red_character:
-        for i in range(len(mummy_red_character)):
-            if explorer_character.get_x() == mummy_red_character[i].get_x() and explorer_character.get_y() == mummy_red_character[i].get_y():
-                return True
-    if scorpion_white_character:
-        for i in range(len(scorpion_white_character)):
-            if explorer_character.get_x() == scorpion_white_character[i].get_x() and explorer_character.get_y() == scorpion_white_character[i].get_y():
-                return True
-    if scorpion_red_character:
-        for i in range(len(scorpion_red_character)):
-            if explorer_character.get_x() == scorpion_red_character[i].get_x() and explorer_character.get_y() == scorpion_red_character[i].get_y():
-                return True
-    return False
-
-def attempt_move(explorer_x, explorer_y, explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp,
-                 current_gate_tmp, key_position, trap_position, maze):
-    explorer_is_killed = False
-    explorer_tmp.move_xy(explorer_x, explorer_y)
-    if key_position:
-        current_gate_tmp = check_key_position(explorer_tmp, current_gate_tmp, key_position)
-    # FIRST MOVE
-    # Mummy White
-    for i in range(len(mummy_white_tmp)):
-        mummy_white_tmp[i] = mummy_white_tmp[i].white_move(maze, current_gate_tmp, explorer_tmp)
-    if key_position:
-        for i in range(len(mummy_white_tmp)):
-            current_gate_tmp = check_key_position(mummy_white_tmp[i], current_gate_tmp, key_position)
-    # Mummy Red
-    for i in range(len(mummy_red_tmp)):
-        mummy_red_tmp[i] = mummy_red_tmp[i].red_move(maze, current_gate_tmp, explorer_tmp)
-    if key_position:
-        for i in range(len(mummy_red_tmp)):
-            current_gate_tmp = check_key_position(mummy_red_tmp[i], current_gate_tmp, key_position)
-    # Scorpion White
-    for i in range(len(scorpion_white_tmp)):
-        scorpion_white_tmp[i] = scorpion_white_tmp[i].white_move(maze, current_gate_tmp, explorer_tmp)
-    if key_position:
-        for i in range(len(scorpion_white_tmp)):
-            current_gate_tmp = check_key_position(scorpion_white_tmp[i], current_gate_tmp, key_position)
-    # Scorpion Red
-    for i in range(len(scorpion_red_tmp)):
-        scorpion_red_tmp[i] = scorpion_red_tmp[i].red_move(maze, current_gate_tmp, explorer_tmp)
-    if key_position:
-        for i in range(len(scorpion_red_tmp)):
-            current_gate_tmp = check_key_position(scorpion_red_tmp[i], current_gate_tmp, key_position)
-
-    explorer_is_killed = check_explorer_is_killed(explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp,
-                                                  scorpion_red_tmp, trap_position)
-
-    if not explorer_is_killed:
-        # Delete mummy white have same position
-        mummy_white_tmp = update_list_character(mummy_white_tmp)
-        # Delete mummy red have same position
-        mummy_red_tmp = update_list_character(mummy_red_tmp)
-        # Delete scorpion white have same position
-        scorpion_white_tmp = update_list_character(scorpion_white_tmp)
-        # Delete scorpion red have same position
-        scorpion_red_tmp = update_list_character(scorpion_red_tmp)
-        # Delete mummy red, scropion white, scorpion red if mummy white have the same position
-        if mummy_red_tmp:
-            mummy_red_tmp = update_lists_character(mummy_white_tmp, mummy_red_tmp)
-        if scorpion_white_tmp:
-            scorpion_white_tmp = update_lists_character(mummy_white_tmp, scorpion_white_tmp)
-        if scorpion_red_tmp:
-            scorpion_red_tmp = update_lists_character(mummy_white_tmp, scorpion_red_tmp)
-        # Delete scropion white, scorpion red if mummy red have the same position
-        if scorpion_white_tmp:
-            scorpion_white_tmp = update_lists_character(mummy_red_tmp, scorpion_white_tmp)
-        if scorpion_red_tmp:
-            scorpion_red_tmp = update_lists_character(mummy_red_tmp, scorpion_red_tmp)
-        # Delete scorpion red if scorpion white have the same position
-        if scorpion_red_tmp:
-            scorpion_red_tmp = update_lists_character(scorpion_white_tmp, scorpion_red_tmp)
-
-    # SECOND MOVE
-        # Mummy White
-        for i in range(len(mummy_white_tmp)):
-            mummy_white_tmp[i] = mummy_white_tmp[i].white_move(maze, current_gate_tmp, explorer_tmp)
-        if key_position:
-            for i in range(len(mummy_white_tmp)):
-                current_gate_tmp = check_key_position(mummy_white_tmp[i], current_gate_tmp, key_position)
-        # Mummy Red
-        for i in range(len(mummy_red_tmp)):
-            mummy_red_tmp[i] = mummy_red_tmp[i].red_move(maze, current_gate_tmp, explorer_tmp)
-        if key_position:
-            for i in range(len(mummy_red_tmp)):
-                current_gate_tmp = check_key_position(mummy_red_tmp[i], current_gate_tmp, key_position)
-        # Delete mummy white have same position
-        mummy_white_tmp = update_list_character(mummy_white_tmp)
-        # Delete mummy red have same position
-        mummy_red_tmp = update_list_character(mummy_red_tmp)
-        # Delete mummy red, scropion white, scorpion red if mummy white have the same position
-        if mummy_red_tmp:
-            mummy_red_tmp = update_lists_character(mummy_white_tmp, mummy_red_tmp)
-        if scorpion_white_tmp:
-            scorpion_white_tmp = update_lists_character(mummy_white_tmp, scorpion_white_tmp)
-        if scorpion_red_tmp:
-            scorpion_red_tmp = update_lists_character(mummy_white_tmp, scorpion_red_tmp)
-        # Delete scropion white, scorpion red if mummy red have the same position
-        if scorpion_white_tmp:
-            scorpion_white_tmp = update_lists_character(mummy_red_tmp, scorpion_white_tmp)
-        if scorpion_red_tmp:
-            scorpion_red_tmp = update_lists_character(mummy_red_tmp, scorpion_red_tmp)
-        explorer_is_killed = check_explorer_is_killed(explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp,
-                                                      scorpion_red_tmp, trap_position)
-
-    return explorer_is_killed
-
-def BFS(explorer_character, mw_character, mr_character, sw_character, sr_character, gate, trap_position, key_position, maze):
+                ans.append([self._data[p][0].get_x(), self._data[p][0].get_y()])
+            p = self._trace[p]
+        return ans
+
+# should_stop() is polled every STOP_CHECK_INTERVAL expansions; returning True abandons the search
+STOP_CHECK_INTERVAL = 256
+# Seconds between two progress records of a running solver
+PROGRESS_INTERVAL = 0.25
+
+class ProgressReporter:
+    # Sends progress(record) from a running solver, at most every `interval` seconds (solvers ask due()
+    # every STOP_CHECK_INTERVAL expansions) and once more with done=True when the solver returns.
+    # record: {"solver", "depth", "frontier", "visited", "expanded", "elapsed", "nodes_per_sec", "done"}
+    def __init__(self, progress, solver, interval=PROGRESS_INTERVAL):
+        self.progress = progress
+        self.solver = solver
+        self.interval = interval
+        self.begin = time.perf_counter()
+        self._next = self.begin + interval
+
+    def due(self):
+        return time.perf_counter() >= self._next
+
+    def report(self, depth, frontier, visited, expanded, done=False):
+        now = time.perf_counter()
+        self._next = now + self.interval
+        elapsed = now - self.begin
+        self.progress({"solver": self.solver, "depth": depth, "frontier": frontier, "visited": visited,
+                       "expanded": expanded, "elapsed": elapsed,
+                       "nodes_per_sec": expanded / elapsed if elapsed > 0 else 0.0, "done": done})
+
+def bfs_states(level, start, stats=None, should_stop=None, progress=None):
+    """
+    BFS over packed states of a PackedLevel; returns the explorer path in the trace_back format or None.
+    None is also returned if should_stop() asked to give up (stats["cancelled"]); stats["unsolvable"]
+    is only set when every reachable state was expanded.
+    progress: optional callback for ProgressReporter records (depth = BFS layer being expanded).
+    """
     queue = Queue()
-    queue.push([explorer_character, mw_character, mr_character, sw_character, sr_character, gate])
-    while not queue.is_empty():
-        character = queue.pop()
-        explorer = character[0]
-        mummy_white = character[1]
-        mummy_red = character[2]
-        scorpion_white = character[3]
-        scorpion_red = character[4]
-        current_gate = character[5]
-
-        explorer_x = explorer.get_x()
-        explorer_y = explorer.get_y()
-        if maze[explorer_x - 1][explorer_y] == "S" or maze[explorer_x + 1][explorer_y] == "S" or \
-                maze[explorer_x][explorer_y - 1] == "S" or maze[explorer_x][explorer_y + 1] == "S":
-            return queue.trace_back()
-
-        # if explorer Move Up
-        explorer_tmp = characters.Explorer(explorer_x, explorer_y)
-        mummy_white_tmp = []
-        for i in range(len(mummy_white)):
-            mummy_white_tmp.append(characters.mummy_white(mummy_white[i].get_x(), mummy_white[i].get_y()))
-        mummy_red_tmp = []
-        for i in range(len(mummy_red)):
-            mummy_red_tmp.append(characters.mummy_red(mummy_red[i].get_x(), mummy_red[i].get_y()))
-        scorpion_white_tmp = []
-        for i in range(len(scorpion_white)):
-            scorpion_white_tmp.append(characters.scorpion_white(scorpion_white[i].get_x(), scorpion_white[i].get_y()))
-        scorpion_red_tmp = []
-        for i in range(len(scorpion_red)):
-            scorpion_red_tmp.append(characters.scorpion_red(scorpion_red[i].get_x(), scorpion_red[i].get_y()))
-        current_gate_tmp = current_gate.copy()
-        if explorer_tmp.eligible_character_move(maze, current_gate_tmp, explorer_x, explorer_y, explorer_x - 2, explorer_y):
-            if not attempt_move(explorer_x - 2, explorer_y, explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp,
-                 current_gate_tmp, key_position, trap_position, maze):
-                if not queue.check_exists_element_in_queue(explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp,
-                                                         scorpion_red_tmp, current_gate_tmp):
-                    queue.push([explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp, current_gate_tmp])
-
-        # if explorer Move Down
-        explorer_tmp = characters.Explorer(explorer_x, explorer_y)
-        mummy_white_tmp = []
-        for i in range(len(mummy_white)):
-            mummy_white_tmp.append(characters.mummy_white(mummy_white[i].get_x(), mummy_white[i].get_y()))
-        mummy_red_tmp = []
-        for i in range(len(mummy_red)):
-            mummy_red_tmp.append(characters.mummy_red(mummy_red[i].get_x(), mummy_red[i].get_y()))
-        scorpion_white_tmp = []
-        for i in range(len(scorpion_white)):
-            scorpion_white_tmp.append(characters.scorpion_white(scorpion_white[i].get_x(), scorpion_white[i].get_y()))
-        scorpion_red_tmp = []
-        for i in range(len(scorpion_red)):
-            scorpion_red_tmp.append(characters.scorpion_red(scorpion_red[i].get_x(), scorpion_red[i].get_y()))
-        current_gate_tmp = current_gate.copy()
-        if explorer_tmp.eligible_character_move(maze, current_gate_tmp, explorer_x, explorer_y, explorer_x + 2, explorer_y):
-            if not attempt_move(explorer_x + 2, explorer_y, explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp,
-                 current_gate_tmp, key_position, trap_position, maze):
-                if not queue.check_exists_element_in_queue(explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp,
-                                                         scorpion_red_tmp, current_gate_tmp):
-                    queue.push([explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp, current_gate_tmp])
-
-        # if explorer Move Left
-        explorer_tmp = characters.Explorer(explorer_x, explorer_y)
-        mummy_white_tmp = []
-        for i in range(len(mummy_white)):
-            mummy_white_tmp.append(characters.mummy_white(mummy_white[i].get_x(), mummy_white[i].get_y()))
-        mummy_red_tmp = []
-        for i in range(len(mummy_red)):
-            mummy_red_tmp.append(characters.mummy_red(mummy_red[i].get_x(), mummy_red[i].get_y()))
-        scorpion_white_tmp = []
-        for i in range(len(scorpion_white)):
-            scorpion_white_tmp.append(characters.scorpion_white(scorpion_white[i].get_x(), scorpion_white[i].get_y()))
-        scorpion_red_tmp = []
-        for i in range(len(scorpion_red)):
-            scorpion_red_tmp.append(characters.scorpion_red(scorpion_red[i].get_x(), scorpion_red[i].get_y()))
-        current_gate_tmp = current_gate.copy()
-        if explorer_tmp.eligible_character_move(maze, current_gate_tmp, explorer_x, explorer_y, explorer_x, explorer_y - 2):
-            if not attempt_move(explorer_x, explorer_y - 2, explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp,
-                 current_gate_tmp, key_position, trap_position, maze):
-                if not queue.check_exists_element_in_queue(explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp,
-                                                     scorpion_red_tmp, current_gate_tmp):
-                    queue.push([explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp, current_gate_tmp])
-
-        # if explorer Move Right
-        explorer_tmp = characters.Explorer(explorer_x, explorer_y)
-        mummy_white_tmp = []
-        for i in range(len(mummy_white)):
-            mummy_white_tmp.append(characters.mummy_white(mummy_white[i].get_x(), mummy_white[i].get_y()))
-        mummy_red_tmp = []
-        for i in range(len(mummy_red)):
-            mummy_red_tmp.append(characters.mummy_red(mummy_red[i].get_x(), mummy_red[i].get_y()))
-        scorpion_white_tmp = []
-        for i in range(len(scorpion_white)):
-            scorpion_white_tmp.append(characters.scorpion_white(scorpion_white[i].get_x(), scorpion_white[i].get_y()))
-        scorpion_red_tmp = []
-        for i in range(len(scorpion_red)):
-            scorpion_red_tmp.append(characters.scorpion_red(scorpion_red[i].get_x(), scorpion_red[i].get_y()))
-        current_gate_tmp = current_gate.copy()
-        if explorer_tmp.eligible_character_move(maze, current_gate_tmp, explorer_x, explorer_y, explorer_x, explorer_y + 2):
-            if not attempt_move(explorer_x, explorer_y + 2, explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp,
-                 current_gate_tmp, key_position, trap_position, maze):
-                 if not queue.check_exists_element_in_queue(explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp,
-                                                      scorpion_red_tmp, current_gate_tmp):
-                    queue.push([explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp, current_gate_tmp])
-
-        # if explorer still standing
-        explorer_tmp = characters.Explorer(explorer_x, explorer_y)
-        mummy_white_tmp = []
-        for i in range(len(mummy_white)):
-            mummy_white_tmp.append(characters.mummy_white(mummy_white[i].get_x(), mummy_white[i].get_y()))
-        mummy_red_tmp = []
-        for i in range(len(mummy_red)):
-            mummy_red_tmp.append(characters.mummy_red(mummy_red[i].get_x(), mummy_red[i].get_y()))
-        scorpion_white_tmp = []
-        for i in range(len(scorpion_white)):
-            scorpion_white_tmp.append(characters.scorpion_white(scorpion_white[i].get_x(), scorpion_white[i].get_y()))
-        scorpion_red_tmp = []
-        for i in range(len(scorpion_red)):
-            scorpion_red_tmp.append(characters.scorpion_red(scorpion_red[i].get_x(), scorpion_red[i].get_y()))
-        current_gate_tmp = current_gate.copy()
-        if not attempt_move(explorer_x, explorer_y, explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp,
-                        scorpion_red_tmp,
-                        current_gate_tmp, key_position, trap_position, maze):
-            is_the_same_state = True
-            if len(mummy_white) != len(mummy_white_tmp):
-                is_the_same_state = False
+    queue.push(start)
+    expanded = 0
+    depth, layer_end = 0, 1  # states at index >= layer_end in queue._data are one move deeper
+    cancelled = False
+    unsolvable = False
+    reporter = ProgressReporter(progress, "bfs") if progress is not None else None
+    try:
+        while not queue.is_empty():
+            state = queue.pop()
+            if queue._front > layer_end:
+                depth += 1
+                layer_end = len(queue._data)
+            if level.is_exit[level.explorer_cell(state)]:
+                return queue.trace_back(level.explorer_position)
+            if expanded % STOP_CHECK_INTERVAL == 0:
+                if should_stop is not None and should_stop():
+                    cancelled = True
+                    return None
+                if reporter is not None and reporter.due():
+                    reporter.report(depth, len(queue), len(queue._data), expanded)
+            expanded += 1
+            for _, next_state in level.successors(state):
+                if next_state not in queue:
+                    queue.push(next_state)
+        unsolvable = True
+        return None
+    finally:
+        if stats is not None:
+            stats["expanded"] = expanded
+            stats["generated"] = len(queue._data)
+            stats["cancelled"] = cancelled
+            stats["unsolvable"] = unsolvable
+        if reporter is not None:
+            reporter.report(depth, len(queue), len(queue._data), expanded, done=True)
+
+def astar_states(level, start, node_budget=None, stats=None, should_stop=None, progress=None, allow_wait=True):
+    """
+    A* over the same packed states as BFS, guided by PackedLevel.exit_distance().
+    Returns a shortest path in the trace_back format, or None if the level is unsolvable,
+    more than node_budget states had to be expanded or should_stop() asked to give up
+    (stats["unsolvable"] / stats["budget_exceeded"] / stats["cancelled"] tell them apart).
+    progress: optional callback for ProgressReporter records (depth = moves to the state being expanded).
+    allow_wait=False searches without the stand-still action (see PackedLevel.successors).
+    """
+    distance = level.exit_distance()
+    queue = PriorityQueue()
+    best_cost = {start: 0}
+    expanded = 0
+    cost = 0
+    budget_exceeded = False
+    cancelled = False
+    unsolvable = False
+    reporter = ProgressReporter(progress, "astar") if progress is not None else None
+    if distance[level.explorer_cell(start)] >= 0:
+        queue.push((start, 0), (distance[level.explorer_cell(start)], 0))
+    try:
+        while not queue.is_empty():
+            state, cost = queue.pop()
+            if cost > best_cost[state]:
+                continue  # a cheaper copy of this state was already expanded
+            if level.is_exit[level.explorer_cell(state)]:
+                return queue.trace_back(lambda element: level.explorer_position(element[0]))
+            if node_budget is not None and expanded >= node_budget:
+                budget_exceeded = True
+                return None
+            if expanded % STOP_CHECK_INTERVAL == 0:
+                if should_stop is not None and should_stop():
+                    cancelled = True
+                    return None
+                if reporter is not None and reporter.due():
+                    reporter.report(cost, len(queue), len(best_cost), expanded)
+            expanded += 1
+            cost += 1
+            for _, next_state in level.successors(state, allow_wait):
+                h = distance[level.explorer_cell(next_state)]
+                if h >= 0 and cost < best_cost.get(next_state, cost + 1):
+                    best_cost[next_state] = cost
+                    # Prefer deeper states among equal estimates
+                    queue.push((next_state, cost), (cost + h, -cost))
+        unsolvable = True
+        return None
+    finally:
+        if stats is not None:
+            stats["expanded"] = expanded
+            stats["generated"] = len(queue._data)
+            stats["budget_exceeded"] = budget_exceeded
+            stats["cancelled"] = cancelled
+            stats["unsolvable"] = unsolvable
+        if reporter is not None:
+            reporter.report(cost, len(queue), len(best_cost), expanded, done=True)
+
+# Default memory for the transposition table of idastar_states
+TABLE_MEMORY_MB = 64
+INF_DEPTH = 0xFFFF  # depth / f value meaning "never" in TranspositionTable and idastar_states
+_FIBONACCI = 0x9E3779B97F4A7C15  # 2**64 / golden ratio, spreads packed states over the table slots
+_MASK64 = (1 << 64) - 1
+
+class TranspositionTable:
+    # Fixed-size table of packed states for idastar_states, allocated once from the memory cap.
+    # The slot is a Fibonacci hash of the state (its low bits are just the gate and the explorer cell)
+    # and holds the state, the depth it was reached at in the current iteration (stamp), the lowest
+    # depth it was ever reached at, a "cut off by the bound" flag and a "cannot reach the exit" flag.
+    # A new state replaces the slot's occupant unless the occupant was reached closer to the root in
+    # the current iteration, since those prune the biggest subtrees.
+    def __init__(self, memory_mb=TABLE_MEMORY_MB, sample_state=0):
+        self.slot_bytes = 8 + 2 + 2 + 4 + 1 + 1 + sys.getsizeof(sample_state)
+        slots = max(1, int(memory_mb * 1024 * 1024) // self.slot_bytes)
+        bits = slots.bit_length() - 1
+        self.size = 1 << bits
+        self._shift = 64 - bits
+        self.memory_cap = int(memory_mb * 1024 * 1024)
+        self._keys = [None] * self.size
+        self._depth = array("H", bytes(2 * self.size))
+        self._best = array("H", [INF_DEPTH]) * self.size
+        self._stamp = array("I", bytes(4 * self.size))
+        self._cut = array("B", bytes(self.size))
+        self._dead = array("B", bytes(self.size))
+        self.iteration = 0
+        self.used = 0
+        self.replacements = 0
+        self._cuts = 0
+        self._cut_min = INF_DEPTH
+
+    def _slot(self, state):
+        return ((state ^ (state >> 64)) * _FIBONACCI & _MASK64) >> self._shift
+
+    def next_iteration(self):
+        self.iteration += 1
+        self._cuts = 0  # states cut off by the bound in this iteration and not reached again within it
+        self._cut_min = INF_DEPTH
+
+    def is_dead(self, state):
+        i = self._slot(state)
+        return self._keys[i] == state and self._dead[i]
+
+    def mark_dead(self, state):
+        i = self._slot(state)
+        if self._keys[i] == state:
+            self._dead[i] = 1
+
+    def seen(self, state, depth):
+        """
+        True if `state` needs no expanding at `depth`: it was already expanded this iteration at `depth`
+        or shallower, or some earlier iteration reached it in fewer moves (a prefix of a shortest
+        solution is a shortest path itself, so it is never reached deeper than that).
+        """
+        i = self._slot(state)
+        if self._keys[i] != state: return False
+        if self._best[i] < depth: return True
+        return self._stamp[i] == self.iteration and not self._cut[i] and self._depth[i] <= depth
+
+    def store(self, state, depth, cut=False, estimate=0):
+        """Record `state` as expanded at `depth`, or with cut=True as cut off there with f = depth + estimate."""
+        i = self._slot(state)
+        key = self._keys[i]
+        current = self._stamp[i] == self.iteration
+        if cut and depth + estimate < self._cut_min:
+            self._cut_min = depth + estimate
+        if key == state:
+            if cut and current and self._depth[i] <= depth:
+                return  # already expanded or cut off from a shallower depth
+            was_cut = current and self._cut[i]
+        else:
+            if key is not None and current and self._depth[i] < depth:
+                if cut:
+                    self._cuts += 1  # not stored, so it can never be cleared
+                return
+            if key is None:
+                self.used += 1
             else:
-                for i in range(len(mummy_white_tmp)):
-                    if not mummy_white[i].check_same_position(mummy_white_tmp[i]):
-                        is_the_same_state = False
-                        break
-            if is_the_same_state:
-                if len(mummy_red) != len(mummy_red_tmp):
-                    is_the_same_state = False
-                else:
-                    for i in range(len(mummy_red_tmp)):
-                        if not mummy_red[i].check_same_position(mummy_red_tmp[i]):
-                            is_the_same_state = False
-                            break
-
-            if is_the_same_state:
-                if len(scorpion_white) != len(scorpion_white_tmp):
-                    is_the_same_state = False
-                else:
-                    for i in range(len(scorpion_white_tmp)):
-                        if not scorpion_white[i].check_same_position(scorpion_white_tmp[i]):
-                            is_the_same_state = False
-                            break
-
-            if is_the_same_state:
-                if len(scorpion_red) != len(scorpion_red_tmp):
-                    is_the_same_state = False
+                self.replacements += 1  # an evicted cut-off state stays counted in _cuts
+            self._keys[i] = state
+            self._best[i] = INF_DEPTH
+            self._dead[i] = 0
+            was_cut = False
+        if cut and not was_cut:
+            self._cuts += 1
+        elif was_cut and not cut:
+            self._cuts -= 1  # reached again within the bound
+        self._depth[i] = min(depth, INF_DEPTH)
+        if depth < self._best[i]:
+            self._best[i] = depth
+        self._stamp[i] = self.iteration
+        self._cut[i] = cut
+
+    def next_bound(self):
+        """
+        Bound for the next iteration: the lowest f among this iteration's cut-off states, or INF_DEPTH
+        if every one of them was later reached within the bound (nothing left to search).
+        """
+        return self._cut_min if self._cuts else INF_DEPTH
+
+    def memory_bytes(self):
+        """Bytes held by the table: the slot arrays plus the state objects stored in them."""
+        arrays = sum(a.buffer_info()[1] * a.itemsize
+                     for a in (self._depth, self._best, self._stamp, self._cut, self._dead))
+        return sys.getsizeof(self._keys) + arrays + sum(sys.getsizeof(k) for k in self._keys if k is not None)
+
+def idastar_states(level, start, memory_mb=TABLE_MEMORY_MB, max_depth=None, stats=None, should_stop=None,
+                   progress=None):
+    """
+    IDA* over the same packed states and PackedLevel.exit_distance() heuristic as astar_states, for
+    machines where the BFS / A* frontier does not fit in memory: the only growing structure is the
+    current path, everything else lives in a TranspositionTable of at most memory_mb.
+    Returns a shortest path in the trace_back format, or None if the level is unsolvable, the bound
+    passed max_depth or should_stop() asked to give up (stats["depth_exceeded"] / stats["cancelled"]).
+    stats also gets "table_bytes" (memory the table really used) next to "memory_cap_bytes".
+    progress: optional callback for ProgressReporter records; depth is the current bound, frontier
+    the length of the current path and visited the number of table slots in use.
+    """
+    distance = level.exit_distance()
+    table = TranspositionTable(memory_mb, start)
+    expanded = 0
+    generated = 0
+    cancelled = False
+    depth_exceeded = False
+    unsolvable = False
+    bound = distance[level.explorer_cell(start)]
+    searched = max(bound, 0)  # bound of the last iteration, for progress records
+    path = [start]
+    reporter = ProgressReporter(progress, "ida") if progress is not None else None
+    try:
+        if level.is_exit[level.explorer_cell(start)]:
+            return [level.explorer_position(start)]
+        while 0 <= bound < INF_DEPTH:
+            if max_depth is not None and bound > max_depth:
+                depth_exceeded = True
+                return None
+            searched = bound
+            table.next_iteration()
+            table.store(start, 0)
+            # Depth-first with an explicit stack: path[i] is expanded through the generator children[i];
+            # alive[i] tells whether any child of path[i] may still reach the exit
+            path, on_path = [start], {start}
+            children, alive = [level.successors(start)], [False]
+            while path:
+                depth = len(path)
+                for _, child in children[-1]:
+                    generated += 1
+                    h = distance[level.explorer_cell(child)]
+                    if h < 0 or table.is_dead(child):
+                        continue
+                    alive[-1] = True
+                    if child in on_path or table.seen(child, depth):
+                        continue
+                    if depth + h > bound:
+                        table.store(child, depth, cut=True, estimate=h)
+                        continue
+                    if level.is_exit[level.explorer_cell(child)]:
+                        path.append(child)
+                        return [level.explorer_position(state) for state in reversed(path)]
+                    if expanded % STOP_CHECK_INTERVAL == 0:
+                        if should_stop is not None and should_stop():
+                            cancelled = True
+                            return None
+                        if reporter is not None and reporter.due():
+                            reporter.report(bound, len(path), table.used, expanded)
+                    expanded += 1
+                    table.store(child, depth)
+                    path.append(child)
+                    on_path.add(child)
+                    children.append(level.successors(child))
+                    alive.append(False)
+                    break
                 else:
-                    for i in range(len(scorpion_red_tmp)):
-                        if not scorpion_red[i].check_same_position(scorpion_red_tmp[i]):
-                            is_the_same_state = False
-                            break
-            if is_the_same_state:
-                if current_gate and current_gate["isClosed"] != current_gate_tmp["isClosed"]:
-                    is_the_same_state = False
-            if not is_the_same_state:
-                queue.push([explorer_tmp, mummy_white_tmp, mummy_red_tmp, scorpion_white_tmp, scorpion_red_tmp, current_gate_tmp])
\ No newline at end of file
+                    state = path.pop()
+                    on_path.discard(state)
+                    children.pop()
+                    if not alive.pop():
+                        # Every move from here kills the explorer or leads to a dead state.
+                        # (Learning finite bounds as well does not pay off here: on unsolvable
+                        # levels they climb with the bound around cycles and IDA* never stops.)
+                        table.mark_dead(state)
+            bound = table.next_bound()  # INF_DEPTH: nothing was cut off, every reachable state was expanded
+        unsolvable = True
+        return None
+    finally:
+        if stats is not None:
+            stats["expanded"] = expanded
+            stats["generated"] = generated
+            stats["iterations"] = table.iteration
+            stats["bound"] = bound
+            stats["depth_exceeded"] = depth_exceeded
+            stats["cancelled"] = cancelled
+            stats["table_slots"] = table.size
+            stats["table_used"] = table.used
+            stats["table_replacements"] = table.replacements
+            stats["table_bytes"] = table.memory_bytes()
+            stats["memory_cap_bytes"] = table.memory_cap
+            stats["unsolvable"] = unsolvable
+        if reporter is not None:
+            reporter.report(searched, len(path), table.used, expanded, done=True)
+
+# bfs_layers plays every group with set semantics, which matches engine._remove_same_cells
+# as long as no group has more than LAYER_MAX_GROUP enemies (with 5+ on one cell it can keep two)
+LAYER_MAX_GROUP = 4
+
+class LayerTables:
+    # A PackedLevel's rules as NumPy arrays indexed by room (PackedLevel.room), for bfs_layers.
+    # Enemy slots hold a room, or `rooms` for an enemy that was removed.
+    def __init__(self, level):
+        rooms = level.rooms
+        self.rooms = rooms
+        self.room_cell = np.array([c for c in range(len(level.room)) if level.room[c] >= 0])
+        room = np.array(level.room + [-1])  # room[-1] -> -1 for blocked moves
+        # move[closed, explorer room, direction] -> room, or -1 if blocked
+        moves = np.array(level.moves).reshape(2, -1, 4)[:, self.room_cell, :]
+        self.move = room[moves]
+        # enemy[closed, horizontal_first, enemy room, explorer room] -> the enemy's next room
+        self.enemy = np.full((2, 2, rooms + 1, rooms), rooms, dtype=np.int64)
+        for closed in (0, 1):
+            if level.greedy_tables is not None:
+                for horizontal_first in (0, 1):
+                    table = np.array(level.greedy_tables[closed][horizontal_first])
+                    self.enemy[closed, horizontal_first, :rooms] = room[table].reshape(rooms, rooms)
+            else:
+                # chase / zone moves do not depend on the white / red order
+                cells = self.room_cell.tolist()
+                self.enemy[closed, :, :rooms] = [[level.room[level.enemy_move(e, x, closed)] for x in cells]
+                                                 for e in cells]
+        self.is_exit = np.array(level.is_exit)[self.room_cell]
+        self.trap = np.zeros(rooms, dtype=bool)
+        self.trap[[level.room[c] for c in level.traps]] = True
+        self.key = level.room[level.key] if level.key >= 0 else -1
+
+def _layer_successors(tables, explorer, closed, slots, groups):
+    """
+    One turn for every (state, action) pair of a layer at once, same rules as PackedLevel.turn.
+    Returns (parent index, explorer, closed, slots) of the children the explorer survives.
+    """
+    rooms, key = tables.rooms, tables.key
+    n = len(explorer)
+    parent = np.repeat(np.arange(n), len(ACTIONS))
+    action = np.tile(np.arange(len(ACTIONS)), n)  # index into ACTIONS; the last one is waiting
+    explorer, closed, slots = explorer[parent], closed[parent], slots[parent]
+    target = np.where(action == len(ACTIONS) - 1, explorer,
+                      tables.move[closed, explorer, np.minimum(action, len(DIRECTIONS) - 1)])
+    keep = target >= 0
+    parent, target, closed, slots = parent[keep], target[keep], closed[keep], slots[keep]
+    closed = closed ^ (target == key)
+
+    def survivors(keep):
+        return parent[keep], target[keep], closed[keep], slots[keep]
+
+    def killed():
+        return (slots == target[:, None]).any(axis=1)
+
+    def move(group, horizontal_first):
+        nonlocal closed
+        cols = slots[:, group]
+        cols[:] = tables.enemy[closed[:, None], int(horizontal_first), cols, target[:, None]]
+        slots[:, group] = cols
+        if key >= 0:
+            closed = closed ^ ((cols == key).sum(axis=1) & 1)
+
+    def remove_same_cells(group):
+        cols = np.sort(slots[:, group], axis=1)
+        cols[:, 1:][cols[:, 1:] == cols[:, :-1]] = rooms
+        slots[:, group] = np.sort(cols, axis=1)
+
+    def remove_overlap(strong, weak):
+        cols = slots[:, weak]
+        cols[(cols[:, :, None] == slots[:, None, strong]).any(axis=2)] = rooms
+        slots[:, weak] = cols
+
+    parent, target, closed, slots = survivors(~tables.trap[target] & ~killed())
+    for phase, collisions in ((1, FIRST_COLLISIONS), (2, SECOND_COLLISIONS)):
+        for index in ((MUMMY_WHITE, MUMMY_RED, SCORPION_WHITE, SCORPION_RED) if phase == 1
+                      else (MUMMY_WHITE, MUMMY_RED)):
+            if groups[index].start != groups[index].stop:
+                move(groups[index], index % 2 == 0)
+        parent, target, closed, slots = survivors(~killed())
+        same_type, overlaps = collisions
+        for index in same_type:
+            remove_same_cells(groups[index])
+        for strong, weak in overlaps:
+            remove_overlap(groups[strong], groups[weak])
+    for group in groups:
+        slots[:, group] = np.sort(slots[:, group], axis=1)
+    return parent, target, closed, slots
+
+def bfs_layers(level, start, stats=None, should_stop=None, progress=None):
+    """
+    Vectorized BFS for bulk validation: each depth layer is expanded as NumPy arrays (all five
+    actions, enemy moves from LayerTables, gate toggles, collisions and deaths as array ops) and
+    deduplicated with np.unique against the sorted array of visited states.
+    Returns a shortest path in the trace_back format, or None (unsolvable, or should_stop() said stop).
+    stats gets "layers", "layers_per_sec" and "states_per_sec" besides the usual counters.
+    progress: optional callback for ProgressReporter records, sent after every layer that took
+    the reporter's interval.
+    Falls back to bfs_states (stats["vectorized"] False) without NumPy or with more than
+    LAYER_MAX_GROUP enemies of one type.
+    """
+    explorer, mw, mr, sw, sr, closed = level.decode(start)
+    members = (mw, mr, sw, sr)
+    if np is None or max(map(len, members)) > LAYER_MAX_GROUP:
+        if stats is not None: stats["vectorized"] = False
+        return bfs_states(level, start, stats, should_stop, progress)
+
+    begin = time.perf_counter()
+    tables = LayerTables(level)
+    groups, column = [], 0
+    for group in members:
+        groups.append(slice(column, column + len(group)))
+        column += len(group)
+    slots = np.array([[r for group in members for r in sorted(level.room[c] for c in group)]],
+                     dtype=np.int64).reshape(1, column)
+    layer_explorer = np.array([level.room[explorer]], dtype=np.int64)
+    layer_closed = np.array([closed], dtype=np.int64)
+    key_type = np.dtype((np.void, 2 * (column + 2)))
+
+    def keys(explorer, closed, slots):
+        # One opaque fixed-size key per state (big-endian uint16 fields), so any number of enemies fits
+        rows = np.empty((len(explorer), column + 2), dtype=">u2")
+        rows[:, 0], rows[:, 1], rows[:, 2:] = closed, explorer, slots
+        return rows.view(key_type).ravel()
+
+    visited = keys(layer_explorer, layer_closed, slots)
+    layers = [(layer_explorer, None)]  # per depth: explorer rooms and parent indices into the previous depth
+    expanded = 0
+    cancelled = False
+    unsolvable = False
+    reporter = ProgressReporter(progress, "layers") if progress is not None else None
+    found = -1 if not tables.is_exit[layer_explorer[0]] else 0
+    try:
+        while found < 0 and len(layer_explorer):
+            if should_stop is not None and should_stop():
+                cancelled = True
+                return None
+            expanded += len(layer_explorer)
+            parent, layer_explorer, layer_closed, slots = _layer_successors(tables, layer_explorer, layer_closed,
+                                                                            slots, groups)
+            children, first = np.unique(keys(layer_explorer, layer_closed, slots), return_index=True)
+            seen = np.searchsorted(visited, children)
+            new = visited[np.minimum(seen, len(visited) - 1)] != children
+            children, first = children[new], first[new]
+            visited = np.insert(visited, seen[new], children)
+            layer_explorer, layer_closed, slots = layer_explorer[first], layer_closed[first], slots[first]
+            layers.append((layer_explorer, parent[first]))
+            exits = np.flatnonzero(tables.is_exit[layer_explorer])
+            if len(exits):
+                found = exits[0]
+            if reporter is not None and reporter.due():
+                reporter.report(len(layers) - 1, len(layer_explorer), len(visited), expanded)
+        if found < 0:
+            unsolvable = True
+            return None
+        path = []
+        for rooms, parent in reversed(layers):
+            path.append(level.position(int(tables.room_cell[rooms[found]])))
+            if parent is not None: found = parent[found]
+        return path
+    finally:
+        if stats is not None:
+            elapsed = time.perf_counter() - begin
+            stats["vectorized"] = True
+            stats["expanded"] = expanded
+            stats["generated"] = len(visited)
+            stats["layers"] = len(layers) - 1
+            stats["cancelled"] = cancelled
+            stats["layers_per_sec"] = stats["layers"] / elapsed if elapsed > 0 else 0.0
+            stats["states_per_sec"] = len(visited) / elapsed if elapsed > 0 else 0.0
+            stats["unsolvable"] = unsolvable
+        if reporter is not None:
+            reporter.report(len(layers) - 1, len(layer_explorer), len(visited), expanded, done=True)
+
+# Packed-state solvers by name, all called as solver(level, start, stats=..., should_stop=..., progress=...)
+SOLVERS = {"bfs": bfs_states, "astar": astar_states, "ida": idastar_states, "layers": bfs_layers}
+
+class SolveResult:
+    # What solve() returns: the path in the trace_back format (None if there is none) and the solver's stats.
+    # unsolvable is only True when the search proved there is no way out; a cancelled, budget- or
+    # depth-limited search leaves it False.
+    def __init__(self, path, stats):
+        self.path = path
+        self.stats = stats
+        self.unsolvable = bool(stats.get("unsolvable"))
+        self.cancelled = bool(stats.get("cancelled"))
+
+    @property
+    def solved(self):
+        return self.path is not None
+
+    def __repr__(self):
+        status = "solved" if self.solved else "unsolvable" if self.unsolvable else "unknown"
+        return "SolveResult({}, length={}, expanded={})".format(
+            status, len(self.path) - 1 if self.path else None, self.stats.get("expanded", 0))
+
+def solve(level, start, solver="bfs", progress=None, should_stop=None, **options):
+    """
+    Run SOLVERS[solver] on a PackedLevel and wrap the outcome in a SolveResult.
+    progress(record) gets ProgressReporter records while it runs; options go to the solver
+    (node_budget for astar, memory_mb / max_depth for ida).
+    """
+    stats = {}
+    path = SOLVERS[solver](level, start, stats=stats, should_stop=should_stop, progress=progress, **options)
+    return SolveResult(path, stats)
+
+def _cache_key(cache, explorer, mw, mr, sw, sr, gate, trap_position, key_position, maze, difficulty, patrol_seed):
+    def positions(group): return [(c.get_x(), c.get_y()) for c in group]
+    return cache.key(maze, (explorer.get_x(), explorer.get_y()), positions(mw), positions(mr), positions(sw),
+                     positions(sr), gate["isClosed"], trap_position, key_position, difficulty, patrol_seed)
+
+def BFS(explorer_character, mw_character, mr_character, sw_character, sr_character, gate, trap_position, key_position, maze,
+        stats=None, difficulty=1, patrol_seed=0, cache=None, progress=None):
+    # stats: optional dict, filled with the number of expanded / generated states
+    # progress: optional callback for ProgressReporter records while searching
+    # difficulty / patrol_seed: enemy AI to simulate, as set on the enemies by rungame
+    # cache: optional solution_cache.SolutionCache; a stored path is returned without searching
+    if cache is not None:
+        key = _cache_key(cache, explorer_character, mw_character, mr_character, sw_character, sr_character, gate,
+                         trap_position, key_position, maze, difficulty, patrol_seed)
+        hit, path = cache.get(key)
+        if hit:
+            if stats is not None:
+                stats.update(expanded=0, generated=0, unsolvable=path is None, cache_hit=True)
+            return path
+    level = PackedLevel(maze, key_position, trap_position, difficulty, patrol_seed)
+    start = level.pack(explorer_character, mw_character, mr_character, sw_character, sr_character, gate)
+    path = bfs_states(level, start, stats, progress=progress)
+    if cache is not None:
+        cache.put(key, path)
+    return path
+
+def astar(explorer_character, mw_character, mr_character, sw_character, sr_character, gate, trap_position, key_position,
+          maze, node_budget=None, stats=None, difficulty=1, patrol_seed=0, cache=None, progress=None,
+          should_stop=None):
+    """
+    A* counterpart of BFS (see astar_states); node_budget caps the number of expanded states
+    and should_stop() can abandon the search.
+    """
+    if cache is not None:
+        key = _cache_key(cache, explorer_character, mw_character, mr_character, sw_character, sr_character, gate,
+                         trap_position, key_position, maze, difficulty, patrol_seed)
+        hit, path = cache.get(key)
+        if hit:
+            if stats is not None:
+                stats.update(expanded=0, generated=0, budget_exceeded=False, unsolvable=path is None,
+                             cache_hit=True)
+            return path
+    level = PackedLevel(maze, key_position, trap_position, difficulty, patrol_seed)
+    start = level.pack(explorer_character, mw_character, mr_character, sw_character, sr_character, gate)
+    run_stats = {} if stats is None else stats
+    path = astar_states(level, start, node_budget, run_stats, should_stop, progress)
+    # Running out of budget or being cancelled proves nothing, so only definite answers are stored
+    if cache is not None and not run_stats["budget_exceeded"] and not run_stats["cancelled"]:
+        cache.put(key, path)
+    return path
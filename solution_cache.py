@@ -0,0 +1,194 @@
+import json
+import os
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+
+import engine
+import search
+
+# Số lời giải tối đa giữ trong file; vượt quá thì bỏ lời giải lâu nhất chưa được dùng (LRU)
+MAX_ENTRIES = 2000
+# autosave ghi file nhiều nhất 1 lần mỗi chừng này giây; phần còn lại được ghi khi thoát chương trình
+SAVE_INTERVAL = 5.0
+
+
+def level_key(maze, explorer, mw, mr, sw, sr, gate_closed, trap_position, key_position, difficulty=1, patrol_seed=0):
+    """
+    Hash của nội dung level: chữ trong maze + vị trí nhân vật như file agents + trạng thái cổng,
+    độ khó, seed đi tuần và engine.RULES_VERSION. Sửa file level hoặc đổi luật -> hash khác -> tự giải lại.
+    """
+    h = hashlib.blake2b("\n".join(map("".join, maze)).encode(), digest_size=16)
+    agents = ["E {} {}".format(*explorer)]
+    for tag, group in (("MW", mw), ("MR", mr), ("SW", sw), ("SR", sr)):
+        agents.extend("{} {} {}".format(tag, *p) for p in group)
+    h.update("|{}|{}|{}|{}|{}|{}|{}".format("\n".join(agents), int(bool(gate_closed)),
+                                            engine.positions_list(trap_position), tuple(key_position or ()),
+                                            difficulty, patrol_seed, engine.RULES_VERSION).encode())
+    return h.hexdigest()
+
+
+def level_dict_key(level, difficulty=1, patrol_seed=None):
+    """level_key của level đọc bằng engine.read_level / parse_level, ở trạng thái ban đầu (cổng đóng sẵn)."""
+    if patrol_seed is None:
+        patrol_seed = engine.level_patrol_seed(level["name"])
+    return level_key(level["maze"], level["explorer"], level["mw"], level["mr"], level["sw"], level["sr"],
+                     bool(level["gate_position"]), level["trap_position"], level["key_position"], difficulty,
+                     patrol_seed)
+
+
+def state_key(level, state):
+    """level_key của trạng thái packed `state` trên engine.PackedLevel `level` (vd. giữa ván, cho gợi ý)."""
+    explorer, mw, mr, sw, sr, closed = level.decode(state)
+    traps = sorted(level.position(c) for c in level.traps)
+    key_position = level.position(level.key) if level.key >= 0 else ()
+    return level_key(level.maze, level.position(explorer), *[[level.position(c) for c in group]
+                                                             for group in (mw, mr, sw, sr)],
+                     closed, traps, key_position, level.difficulty, level.patrol_seed)
+
+
+def _encode_path(path):
+    # [[x, y], ...] -> "x,y;x,y;..." cho file gọn
+    return None if path is None else ";".join("{},{}".format(x, y) for x, y in path)
+
+
+def _decode_path(text):
+    if text is None: return None
+    if not text: return []
+    return [[int(v) for v in step.split(",")] for step in text.split(";")]
+
+
+class SolutionCache:
+    """
+    Lời giải (đường đi của explorer, định dạng trace_back) lưu trên đĩa, khóa theo level_key.
+    Tra cứu chỉ là 1 lần hash + 1 lần đọc dict. Có thay đổi thì file được ghi lại khi gọi save() / flush(),
+    hoặc với autosave: sau put nếu lần ghi trước đã quá SAVE_INTERVAL giây, và khi thoát chương trình.
+    None = level được chứng minh là không giải được. Dùng được từ nhiều thread.
+    """
+    def __init__(self, path=None, max_entries=MAX_ENTRIES, autosave=True):
+        base_path = os.path.dirname(os.path.abspath(__file__))
+        self.path = path or os.path.join(base_path, "solution_cache.json")
+        self.max_entries = max_entries
+        self.autosave = autosave
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> [tên level, đường đi đã mã hóa]; cuối = dùng gần nhất
+        self._decoded = {}  # key -> đường đi đã giải mã (chỉ trong bộ nhớ)
+        self._dirty = False  # có thay đổi chưa ghi ra file
+        self._saved_at = time.monotonic()
+        self._lock = threading.RLock()
+        self.load()
+        if autosave: atexit.register(self.flush)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self):
+        self._entries.clear()
+        self._decoded.clear()
+        if not os.path.exists(self.path): return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return
+        # Luật đổi -> bỏ toàn bộ (key cũng đã chứa RULES_VERSION, đây chỉ để file không phình ra)
+        if data.get("rules_version") != engine.RULES_VERSION: return
+        for key, entry in data.get("entries", []):
+            self._entries[key] = entry
+
+    def save(self):
+        with self._lock:
+            data = {"rules_version": engine.RULES_VERSION, "entries": list(self._entries.items())}
+            self._dirty = False
+            self._saved_at = time.monotonic()
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except IOError as e:
+            print(f"Error saving solution cache: {e}")
+
+    def flush(self):
+        """Ghi file nếu có thay đổi chưa ghi."""
+        if self._dirty: self.save()
+
+    def _changed(self):
+        self._dirty = True
+        if self.autosave and time.monotonic() - self._saved_at >= SAVE_INTERVAL: self.save()
+
+    key = staticmethod(level_key)
+
+    def get(self, key):
+        """(True, đường đi hoặc None) nếu đã có lời giải, (False, None) nếu chưa. Đường đi trả về là bản sao."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            path = self._decoded.get(key)
+            if path is None and entry[1] is not None:
+                path = self._decoded[key] = _decode_path(entry[1])
+        return True, None if path is None else [step[:] for step in path]
+
+    def put(self, key, path, name=None):
+        """
+        Lưu lời giải (None = không giải được). `name`: tên file level, chỉ để invalidate_level dùng;
+        cùng 1 file ở độ khó / seed đi tuần khác có key khác nên được giữ song song.
+        """
+        with self._lock:
+            self._entries[key] = [name, _encode_path(path)]
+            self._entries.move_to_end(key)
+            self._decoded.pop(key, None)
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._decoded.pop(old_key, None)
+            self._changed()
+
+    def discard(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None: self._dirty = True
+            self._decoded.pop(key, None)
+
+    def invalidate_level(self, name):
+        """Bỏ mọi lời giải của level `name` (tên file)."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if e[0] == name]:
+                self.discard(key)
+            self._changed()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._decoded.clear()
+            self._changed()
+
+
+_default_cache = None
+
+
+def default_cache():
+    """Cache dùng chung cho cả chương trình (solution_cache.json trong thư mục project)."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = SolutionCache()
+    return _default_cache
+
+
+def solve_level_file(maze_file, agent_file=None, difficulty=1, solver="bfs", cache=None):
+    """Đường đi giải level trong file (None nếu không giải được), tra cache trước rồi mới giải."""
+    level = engine.read_level(maze_file, agent_file)
+    cache = cache if cache is not None else default_cache()
+    key = level_dict_key(level, difficulty)
+    hit, path = cache.get(key)
+    if hit: return path
+    packed, start = engine.compile_level(level, difficulty)
+    solve = search.astar_states if solver == "astar" else search.bfs_states
+    path = solve(packed, start)
+    cache.put(key, path, level["name"])
+    return path
@@ -0,0 +1,62 @@
+"""
+Bảng tra greedy của engine.PackedLevel (độ khó 1) phải khớp white_move / red_move của characters
+ở MỌI tổ hợp (ô quái, ô explorer, cổng đóng/mở, thứ tự ngang trước / dọc trước) trên các level trong map/maze.
+
+    python -m pytest -q tests/test_greedy_tables.py
+"""
+import os
+import sys
+
+import pytest
+
+project_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_path)
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+pytest.importorskip("pygame")  # characters import pygame
+import characters
+import engine
+
+maze_path = os.path.join(project_path, "map", "maze")
+object_path = os.path.join(project_path, "map", "agents")
+
+# (lớp quái, hàm di chuyển, ngang trước): trắng ưu tiên đi ngang, đỏ ưu tiên đi dọc
+ENEMY_CLASSES = ((characters.mummy_white, "white_move", True), (characters.scorpion_white, "white_move", True),
+                 (characters.mummy_red, "red_move", False), (characters.scorpion_red, "red_move", False))
+LEVELS = sorted(f for f in os.listdir(maze_path) if f.endswith(".txt")) if os.path.isdir(maze_path) else []
+
+
+def table_mismatches(maze, closed, cls, method, horizontal_first):
+    # [(ô quái, ô explorer, ô trong bảng, ô theo characters)] cho mọi cặp phòng lệch nhau
+    packed = engine.PackedLevel(maze, None, [], 1)
+    table = packed.greedy_tables[closed][horizontal_first]
+    gate = {"gate_position": (-100, -100), "isClosed": bool(closed), "cellIndex": 0}
+    rooms = [(2 * r + 1, 2 * c + 1) for r in range(packed.room_rows) for c in range(packed.room_cols)]
+    mismatches = []
+    for ex, ey in rooms:
+        explorer = characters.Explorer(ex, ey)
+        target = packed.room[packed.cell(ex, ey)]
+        for x, y in rooms:
+            enemy = cls(x, y)
+            enemy.set_difficulty(1)
+            getattr(enemy, method)(maze, gate, explorer)
+            got = packed.position(table[packed.room[packed.cell(x, y)] * packed.rooms + target])
+            expected = (enemy.get_x(), enemy.get_y())
+            if tuple(got) != expected:
+                mismatches.append(((x, y), (ex, ey), tuple(got), expected))
+    return mismatches
+
+
+def test_levels_found():
+    assert LEVELS, "không có level nào trong " + maze_path
+
+
+@pytest.mark.parametrize("name", LEVELS)
+@pytest.mark.parametrize("closed", (0, 1), ids=("open", "closed"))
+@pytest.mark.parametrize("cls, method, horizontal_first", ENEMY_CLASSES,
+                         ids=[cls.__name__ for cls, _, _ in ENEMY_CLASSES])
+def test_greedy_table_matches_characters(name, closed, cls, method, horizontal_first):
+    maze = engine.read_level(os.path.join(maze_path, name), os.path.join(object_path, name))["maze"]
+    mismatches = table_mismatches(maze, closed, cls, method, horizontal_first)
+    assert not mismatches, "{} lệch (quái, explorer, bảng, characters), vd. {}".format(
+        len(mismatches), mismatches[:5])